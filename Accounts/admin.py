@@ -1,11 +1,14 @@
 from django.contrib import admin
-from .models import UserProfile, KYC, Address, BankDetails
+from .models import AuthToken, UserProfile, KYC, KYCImageUpload, Address, BankDetails, BankDetailsFetchJob
 
 
 
+admin.site.register(AuthToken)
 admin.site.register(UserProfile)
 admin.site.register(KYC)
+admin.site.register(KYCImageUpload)
 admin.site.register(Address)
 admin.site.register(BankDetails)
+admin.site.register(BankDetailsFetchJob)
 
 
@@ -0,0 +1,458 @@
+import asyncio
+import json
+import logging
+import math
+from collections.abc import Mapping
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .models import AuthToken, UserProfile, KYC, Address, BankDetails, BankDetailsFetchJob
+from .decentro import get_client
+from .authentication import REVOKED, get_token_cache, invalidate_user, issue_token, revoke_token, rotate_token
+from .circuit import CircuitOpenError
+from .jobs import NO_BANK_DETAILS_MESSAGE, bank_details_payload, decentro_error_message, is_fresh, stored_bank_details
+from .idempotency import (
+    IDEMPOTENCY_HEADER, INVALID_KEY_MESSAGE, IdempotencyError, aclaim, arelease, asave, fingerprint,
+    idempotency_cache_key, is_valid_key
+)
+from .profile_cache import invalidate_me
+from .renderers import JSONResponse
+from .throttling import IPRateThrottle, PhoneNumberRateThrottle
+from .uploads import store_kyc_image
+from .verification import ais_user_verified, invalidate_verification
+from .otp import RESULT_MESSAGES, VERIFIED, averify_otp, issue_otp
+from .sms import SMSError
+from .views import (
+    MAX_AGE_MESSAGE, fetch_result, generate_reference_id, parse_max_age, send_otp, stale_bank_details,
+    stored_bank_details_body
+)
+from .pan import PAN_IN_USE_MESSAGE, ais_pan_taken, amark_pan_taken, is_pan_violation
+from .validators import PAN_MESSAGE, PAN_REGEX, PHONE_NUMBER_MESSAGE, normalize_phone_number
+from .serializers import UserProfileSerializer, OtpVerificationSerializer, KYCImageSerializer, PasswordSerializer, AddressSerializer
+from .serializers import invalid_data_errors, user_profile_data, kyc_image_data, address_data
+
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of the DRF APIView used by the Accounts endpoints, for
+    deployments served by an ASGI server. DRF views are sync-only, so these
+    views parse JSON, authenticate tokens and query the database with the
+    async ORM themselves; the DRF serializers are still used for field
+    validation, which does not touch the database. Work that has no async
+    API (password hashing, image processing, transactions) runs in a worker
+    thread.
+
+    Responses match the sync views so clients can switch between the two.
+    """
+
+    authentication_required = True
+    throttle_classes = []
+    throttle_scope = None
+    # Methods for which an Idempotency-Key header is honoured, as in
+    # IdempotentAPIMixin.
+    idempotent_methods = ()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API; exempt from CSRF like DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+
+        try:
+            self.data = self.parse_body(request)
+        except ValueError:
+            return JSONResponse({"detail": "JSON parse error."}, status=400)
+        if not isinstance(self.data, Mapping):
+            # None of the async endpoints take anything but a JSON object.
+            return JSONResponse(invalid_data_errors(self.data), status=400)
+
+        # Throttles read the parsed body the same way as on a DRF Request.
+        request.data = self.data
+        for throttle in [throttle_class() for throttle_class in self.throttle_classes]:
+            if not throttle.allow_request(request, self):
+                wait = math.ceil(throttle.wait())
+                return JSONResponse(
+                    {"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=429,
+                    headers={"Retry-After": str(wait)}
+                )
+
+        if self.authentication_required:
+            user = await self.authenticate(request)
+            if user is None:
+                return JSONResponse(
+                    {"detail": "Authentication credentials were not provided."}, status=401,
+                    headers={"WWW-Authenticate": "Token"}
+                )
+            request.user = user
+
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is not None and request.method in self.idempotent_methods:
+            return await self.dispatch_once(request, key, handler, *args, **kwargs)
+        return await handler(request, *args, **kwargs)
+
+    async def dispatch_once(self, request, key, handler, *args, **kwargs):
+        if not is_valid_key(key):
+            return JSONResponse({IDEMPOTENCY_HEADER: [INVALID_KEY_MESSAGE]}, status=400)
+        cache_key = idempotency_cache_key(request, key)
+        body_fingerprint = fingerprint(request.body)
+        try:
+            stored = await aclaim(cache_key, body_fingerprint)
+        except IdempotencyError as e:
+            return JSONResponse({"detail": e.detail}, status=e.status)
+        if stored is not None:
+            return stored
+
+        try:
+            response = await handler(request, *args, **kwargs)
+        except BaseException:
+            await arelease(cache_key)
+            raise
+        await asave(cache_key, body_fingerprint, response)
+        return response
+
+    def parse_body(self, request):
+        if request.method == "GET":
+            return {}
+        if request.content_type == "application/json":
+            return json.loads(request.body or b"{}")
+        return request.POST
+
+    async def authenticate(self, request):
+        """Resolve `Authorization: Token <key>` through the shared token cache."""
+        parts = request.headers.get("Authorization", "").split()
+        if len(parts) != 2 or parts[0] != "Token":
+            return None
+
+        key = parts[1]
+        token_cache = get_token_cache()
+        token = await sync_to_async(token_cache.get)(key)
+        if token == REVOKED:
+            return None
+        if token is None:
+            try:
+                token = await AuthToken.objects.select_related("user").aget(key=key)
+            except AuthToken.DoesNotExist:
+                return None
+            if not token.user.is_active:
+                return None
+            if not token.is_expired:
+                await sync_to_async(token_cache.set)(key, token)
+        if token.is_expired:
+            return None
+        request.auth = token
+        return token.user
+
+
+def create_account(validated_data, password_hash):
+    # The async ORM has no transaction API, so the user and profile rows are
+    # written together from a worker thread.
+    with transaction.atomic():
+        user = User.objects.create(
+            username=validated_data["username"],
+            email=validated_data["email"],
+            first_name=validated_data["first_name"],
+            password=password_hash
+        )
+        UserProfile.objects.create(user=user)
+    return user
+
+
+class AsyncUserProfileCreateAPIView(AsyncAPIView):
+    authentication_required = False
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'sign-up'
+    idempotent_methods = ("POST",)
+
+    async def post(self, request):
+        serializer = UserProfileSerializer(data=self.data)
+        if not serializer.is_valid():
+            return JSONResponse(serializer.errors, status=400)
+
+        validated_data = serializer.validated_data
+        password_hash = await sync_to_async(make_password, thread_sensitive=False)(validated_data["password"])
+        try:
+            user = await sync_to_async(create_account)(validated_data, password_hash)
+        except IntegrityError as e:
+            return JSONResponse(serializer.unique_violation(e).detail, status=400)
+        token = await sync_to_async(issue_token)(user)
+        await sync_to_async(send_otp)(user)
+
+        return JSONResponse({
+            "user_profile": user_profile_data(user),
+            "token": token.key
+        }, status=201)
+
+
+class AsyncLoginAPIView(AsyncAPIView):
+    authentication_required = False
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'login'
+
+    async def post(self, request):
+        phone_number = self.data.get('phone_number')
+        password = self.data.get('password')
+
+        if not phone_number or not password:
+            return JSONResponse({"detail": "Phone number and password are required."}, status=400)
+
+        phone_number = normalize_phone_number(phone_number)
+        if phone_number is None:
+            return JSONResponse({"detail": PHONE_NUMBER_MESSAGE}, status=400)
+
+        user = await User.objects.filter(username=phone_number).afirst()
+        hash_password = sync_to_async(make_password, thread_sensitive=False)
+
+        if user is None or not user.is_active:
+            # Hash anyway so unknown numbers take as long as wrong passwords.
+            await hash_password(password)
+            return JSONResponse({"detail": "Invalid credentials."}, status=401)
+
+        outdated = []
+        if not await sync_to_async(check_password, thread_sensitive=False)(password, user.password, outdated.append):
+            return JSONResponse({"detail": "Invalid credentials."}, status=401)
+        if outdated:
+            # Same upgrade check_password() performs in the sync view.
+            await User.objects.filter(pk=user.pk).aupdate(password=await hash_password(password))
+
+        if not await ais_user_verified(user):
+            return JSONResponse({"detail": "Phone number is not verified."}, status=401)
+
+        token = await sync_to_async(issue_token)(user)
+
+        return JSONResponse({'token': token.key}, status=200)
+
+
+class AsyncTokenRotateAPIView(AsyncAPIView):
+    async def post(self, request):
+        token = await sync_to_async(rotate_token)(request.auth)
+        return JSONResponse({'token': token.key, 'expires_at': token.expires_at}, status=200)
+
+
+class AsyncLogoutAPIView(AsyncAPIView):
+    async def post(self, request):
+        await sync_to_async(revoke_token)(request.auth)
+        return HttpResponse(status=204)
+
+
+class AsyncOtpRequestAPIView(AsyncAPIView):
+    async def post(self, request):
+        try:
+            wait = await sync_to_async(issue_otp)(request.user.pk, request.user.username)
+        except SMSError:
+            logger.exception("OTP not sent", extra={"user_id": request.user.pk})
+            return JSONResponse({"detail": "Could not send the OTP. Try again later."}, status=503)
+        if wait is not None:
+            return JSONResponse(
+                {"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=429,
+                headers={"Retry-After": str(wait)}
+            )
+
+        return JSONResponse({"message": "OTP sent.", "expires_in": settings.OTP["TIMEOUT"]}, status=200)
+
+
+class AsyncOtpVerificationAPIView(AsyncAPIView):
+    async def post(self, request):
+        serializer = OtpVerificationSerializer(data=self.data)
+        if not serializer.is_valid():
+            return JSONResponse(serializer.errors, status=400)
+
+        result = await averify_otp(request.user.pk, serializer.validated_data['otp'])
+        if result != VERIFIED:
+            return JSONResponse({"otp": [RESULT_MESSAGES[result]]}, status=400)
+
+        updated = await UserProfile.objects.filter(user=request.user).aupdate(is_verified=True)
+        if not updated:
+            return JSONResponse(["UserProfile profile not found for this user."], status=400)
+        await sync_to_async(invalidate_verification)(request.user.pk)
+        await sync_to_async(invalidate_me)(request.user.pk)
+
+        return JSONResponse({"userprofile": {"is_verified": True}}, status=201)
+
+
+class AsyncKYCPanAPIView(AsyncAPIView):
+    idempotent_methods = ("POST",)
+
+    async def post(self, request):
+        pan_number = self.data.get('pan_number')
+        if not isinstance(pan_number, str) or not PAN_REGEX.match(pan_number):
+            return JSONResponse({"pan_number": [PAN_MESSAGE]}, status=400)
+
+        if await ais_pan_taken(pan_number):
+            return JSONResponse({"pan_number": [PAN_IN_USE_MESSAGE]}, status=400)
+
+        # The unique index on pan_number decides races between requests.
+        try:
+            kyc_pan = await KYC.objects.acreate(user=request.user, pan_number=pan_number)
+        except IntegrityError as e:
+            if not is_pan_violation(e):
+                return JSONResponse({"non_field_errors": ["KYC details have already been submitted for this user."]}, status=400)
+            await amark_pan_taken(pan_number)
+            return JSONResponse({"pan_number": [PAN_IN_USE_MESSAGE]}, status=400)
+        await amark_pan_taken(pan_number)
+
+        return JSONResponse({"kyc_pan": {"pan_number": kyc_pan.pan_number}}, status=201)
+
+
+class AsyncKYCImageAPIView(AsyncAPIView):
+    async def post(self, request):
+        serializer = KYCImageSerializer(data=request.FILES)
+        if not serializer.is_valid():
+            return JSONResponse(serializer.errors, status=400)
+
+        try:
+            kyc = await KYC.objects.aget(user=request.user)
+        except KYC.DoesNotExist:
+            return JSONResponse(["KYC profile not found for this user."], status=400)
+
+        kyc = await sync_to_async(store_kyc_image, thread_sensitive=False)(kyc, serializer.validated_data['user_image'])
+        return JSONResponse({'kyc_img': kyc_image_data(kyc)}, status=201)
+
+
+class AsyncPhoneNumbrAPIView(AsyncAPIView):
+    authentication_required = False
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'forgot-password'
+
+    async def post(self, request):
+        phone_number = normalize_phone_number(self.data.get('phone_number'))
+        if phone_number is None:
+            return JSONResponse({"phone_number": [PHONE_NUMBER_MESSAGE]}, status=400)
+
+        user = await User.objects.filter(username=phone_number).afirst()
+        if user is None:
+            return JSONResponse({"phone_number": ["This phone number is not registered."]}, status=400)
+
+        token = await sync_to_async(issue_token)(user)
+        return JSONResponse({'token': token.key}, status=200)
+
+
+class AsyncPasswordAPIView(AsyncAPIView):
+    async def post(self, request):
+        serializer = PasswordSerializer(data=self.data)
+        if not serializer.is_valid():
+            return JSONResponse(serializer.errors, status=400)
+
+        user = request.user
+        logger.info("Password updated", extra={"user_id": user.pk})
+        password_hash = await sync_to_async(make_password, thread_sensitive=False)(serializer.validated_data['password'])
+        await User.objects.filter(pk=user.pk).aupdate(password=password_hash)
+        await sync_to_async(invalidate_user)(user)
+        return JSONResponse({"message": "Password has been updated successfully."}, status=200)
+
+
+class AsyncAddressAPIView(AsyncAPIView):
+    idempotent_methods = ("POST",)
+
+    async def post(self, request):
+        serializer = AddressSerializer(data=self.data)
+        if not serializer.is_valid():
+            return JSONResponse(serializer.errors, status=400)
+
+        address = await Address.objects.acreate(userprofile=request.user, **serializer.validated_data)
+        return JSONResponse({"address": address_data(address)}, status=201)
+
+
+REFRESH_LOCK_PREFIX = "bank-details:refresh:"
+# asyncio keeps only weak references to tasks; these must outlive the request.
+_refresh_tasks = set()
+
+
+async def refresh_bank_details(user, reference_id):
+    """Re-fetch `user`'s bank details from Decentro and store them."""
+    try:
+        accounts = await get_client().afetch_accounts(user.username, reference_id, use_cache=False)
+        if accounts:
+            await sync_to_async(BankDetails.objects.sync_accounts)(user, accounts)
+            await sync_to_async(invalidate_me)(user.pk)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Bank details refresh failed", extra={"reference_id": reference_id, "error": str(e)})
+    finally:
+        await cache.adelete(f"{REFRESH_LOCK_PREFIX}{user.pk}")
+
+
+async def schedule_refresh(user):
+    """
+    Start a background refresh for `user` unless one is already running, and
+    return its reference id. The lock expires on its own if the process dies
+    mid-refresh.
+    """
+    key = f"{REFRESH_LOCK_PREFIX}{user.pk}"
+    reference_id = generate_reference_id()
+    timeout = math.ceil(settings.DECENTRO_RETRY_DEADLINE + settings.DECENTRO_TIMEOUT)
+    if not await cache.aadd(key, reference_id, timeout):
+        return await cache.aget(key) or reference_id
+    task = asyncio.create_task(refresh_bank_details(user, reference_id))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+    return reference_id
+
+
+class AsyncFetchBankDetailsAPIView(AsyncAPIView):
+    """
+    Fetches bank details inline rather than through the job queue: the
+    Decentro call awaits on the event loop, so a slow upstream holds a
+    coroutine instead of a worker. Stored rows within max_age are served
+    as they are; older ones are served while a background task refreshes
+    them.
+    """
+
+    idempotent_methods = ("GET",)
+
+    async def get(self, request):
+        user = request.user
+        try:
+            max_age = parse_max_age(request.GET.get("max_age"))
+        except ValueError:
+            return JSONResponse({"max_age": [MAX_AGE_MESSAGE]}, status=400)
+
+        rows = [row async for row in stored_bank_details(user.pk)]
+        if is_fresh(rows, max_age):
+            return JSONResponse(stored_bank_details_body(rows, False, "Showing the stored bank details."), status=200)
+
+        if rows:
+            breaker = get_client().breaker
+            if await sync_to_async(breaker.is_open)():
+                body, code = stale_bank_details(rows)
+                return JSONResponse(body, status=code, headers={"Retry-After": str(breaker.recovery_timeout)})
+            body = stored_bank_details_body(rows, True, "Showing the last fetched bank details; a refresh has been queued.")
+            body.update(reference_id=await schedule_refresh(user), status=BankDetailsFetchJob.STATUS_RUNNING)
+            return JSONResponse(body, status=200)
+
+        reference_id = generate_reference_id()
+        try:
+            accounts = await get_client().afetch_accounts(user.username, reference_id)
+        except CircuitOpenError as e:
+            body, code = stale_bank_details(rows)
+            return JSONResponse(body, status=code, headers={"Retry-After": str(e.retry_after)})
+        except requests.exceptions.RequestException as e:
+            logger.warning("Decentro call failed", extra={"reference_id": reference_id, "error": str(e)})
+            body, code = fetch_result(reference_id, BankDetailsFetchJob.STATUS_FAILED, error=decentro_error_message(e))
+            return JSONResponse(body, status=code)
+
+        if not accounts:
+            body, code = fetch_result(reference_id, BankDetailsFetchJob.STATUS_FAILED, error=NO_BANK_DETAILS_MESSAGE)
+            return JSONResponse(body, status=code)
+
+        await sync_to_async(BankDetails.objects.sync_accounts)(user, accounts)
+        await sync_to_async(invalidate_me)(user.pk)
+        body, code = fetch_result(
+            reference_id, BankDetailsFetchJob.STATUS_SUCCEEDED, bank_details_payload(reference_id, accounts)
+        )
+        return JSONResponse(body, status=code)
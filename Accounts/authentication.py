@@ -0,0 +1,223 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from .models import AuthToken
+
+
+
+# Cached in place of a token whose key was revoked, so requests still carrying
+# it are refused without a query.
+REVOKED = "revoked"
+
+
+class LocMemTokenCache:
+    """
+    Per-process LRU of authenticated tokens. Entries expire after `timeout`
+    seconds and the least recently used entry is evicted past `max_entries`.
+    Values are pickled so concurrent requests never share a User instance.
+    """
+
+    def __init__(self, timeout=300, max_entries=10000, **kwargs):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user_id, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        return pickle.loads(value) if value is not None else REVOKED
+
+    def set(self, key, token):
+        value = pickle.dumps(token, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.timeout, token.user_id, value)
+            self._user_keys.setdefault(token.user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def revoke(self, key):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.timeout, None, None)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._user_keys.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[entry[1]]
+
+
+class DjangoTokenCache:
+    """
+    Token cache stored in a Django cache alias, shared by every process that
+    uses the same cache server. A hit is a single cache read; delete_user
+    looks the user's token keys up in the database and deletes them in one
+    call, since it only runs when the user is changed.
+    """
+
+    prefix = "tokenauth:"
+
+    def __init__(self, timeout=300, cache_alias="default", **kwargs):
+        self.timeout = timeout
+        self.cache = caches[cache_alias]
+
+    def get(self, key):
+        return self.cache.get(f"{self.prefix}token:{key}")
+
+    def set(self, key, token):
+        self.cache.set(f"{self.prefix}token:{key}", token, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(f"{self.prefix}token:{key}")
+
+    def revoke(self, key):
+        self.cache.set(f"{self.prefix}token:{key}", REVOKED, self.timeout)
+
+    def delete_user(self, user_id):
+        keys = AuthToken.objects.filter(user_id=user_id).values_list("key", flat=True)
+        self.cache.delete_many([f"{self.prefix}token:{key}" for key in keys])
+
+    def clear(self):
+        pass
+
+
+TOKEN_CACHE_BACKENDS = {
+    "locmem": LocMemTokenCache,
+    "django": DjangoTokenCache,
+}
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                options = {key.lower(): value for key, value in settings.TOKEN_AUTH_CACHE.items()}
+                backend = TOKEN_CACHE_BACKENDS[options.pop("backend", "django")]
+                _token_cache = backend(**options)
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == "TOKEN_AUTH_CACHE":
+        _token_cache = None
+
+
+def invalidate_token(key):
+    get_token_cache().delete(key)
+
+
+def invalidate_user(user):
+    get_token_cache().delete_user(user.pk)
+
+
+def revoke_token(token):
+    """
+    Delete `token` and mark its key revoked in the token cache. Deleting the
+    row is enough on its own; the marker also turns away requests that
+    still carry the key without a query, for as long as a copy of the token
+    could still be cached.
+    """
+    key = token.key
+    token.delete()
+    get_token_cache().revoke(key)
+
+
+def issue_token(user):
+    """
+    Create a token for `user`, then delete their expired tokens and, past
+    AUTH_TOKEN_MAX_PER_USER, their oldest, so logins do not pile up rows.
+    """
+    token = AuthToken.objects.create(user=user)
+    now = timezone.now()
+    live = 1
+    stale = []
+    for key, expires_at in (
+        AuthToken.objects.filter(user=user).exclude(key=token.key)
+        .order_by("-created_at").values_list("key", "expires_at")
+    ):
+        if expires_at > now and live < settings.AUTH_TOKEN_MAX_PER_USER:
+            live += 1
+        else:
+            stale.append(key)
+    if stale:
+        AuthToken.objects.filter(key__in=stale).delete()
+        token_cache = get_token_cache()
+        for key in stale:
+            token_cache.revoke(key)
+    return token
+
+
+def rotate_token(token):
+    """Replace `token` with a new one for the same user and a fresh expiry."""
+    key = token.key
+    with transaction.atomic():
+        new_token = AuthToken.objects.create(user_id=token.user_id)
+        token.delete()
+    get_token_cache().revoke(key)
+    return new_token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication over AuthToken that remembers successful lookups, so
+    a cache hit authenticates a request without the token/user query.
+    Expired and revoked tokens are rejected.
+    """
+
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        token = token_cache.get(key)
+        if token == REVOKED:
+            raise AuthenticationFailed("Invalid token.")
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            if not token.is_expired:
+                token_cache.set(key, token)
+        if token.is_expired:
+            raise AuthenticationFailed("Token has expired.")
+        return (token.user, token)
@@ -0,0 +1,167 @@
+import io
+import json
+import string
+import subprocess
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from .models import AuthToken, UserProfile, KYC
+
+
+
+BENCH_PASSWORD = "bench-password-123"
+BENCH_PHONE_PREFIX = "+7770"
+
+
+def bench_phone(n):
+    return f"{BENCH_PHONE_PREFIX}{n:09d}"
+
+
+def bench_pan(n):
+    letters = ""
+    for _ in range(5):
+        n, remainder = divmod(n, 26)
+        letters += string.ascii_uppercase[remainder]
+    return f"{letters}{n % 10000:04d}Z"
+
+
+def seed_users(start, count, verified=True, with_kyc=False):
+    """
+    Bulk-create `count` users with profiles and tokens, all sharing one
+    precomputed password hash. Returns one fixture dict per user.
+    """
+    password = make_password(BENCH_PASSWORD)
+    users = User.objects.bulk_create([
+        User(
+            username=bench_phone(start + i),
+            email=f"bench{start + i}@example.com",
+            first_name="Bench",
+            password=password
+        )
+        for i in range(count)
+    ])
+    UserProfile.objects.bulk_create([UserProfile(user=user, is_verified=verified) for user in users])
+    tokens = AuthToken.objects.bulk_create([AuthToken(user=user) for user in users])
+    if with_kyc:
+        KYC.objects.bulk_create([
+            KYC(user=user, pan_number=bench_pan(start + i)) for i, user in enumerate(users)
+        ])
+
+    return [
+        {"user_id": user.pk, "phone_number": user.username, "token": token.key, "index": start + i}
+        for i, (user, token) in enumerate(zip(users, tokens))
+    ]
+
+
+def delete_seeded_users():
+    User.objects.filter(username__startswith=BENCH_PHONE_PREFIX).delete()
+
+
+def sample_jpeg(width=1200, height=900):
+    output = io.BytesIO()
+    Image.effect_noise((width, height), 40).convert("RGB").save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+class InProcessTarget:
+    """Sends requests through the Django test client and counts queries."""
+
+    name = "inprocess"
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, json_body=None, files=None, token=None):
+        headers = {"Authorization": f"Token {token}"} if token else {}
+        kwargs = {"headers": headers}
+        if files is not None:
+            kwargs["data"] = {
+                key: SimpleUploadedFile("upload.jpg", value, content_type="image/jpeg")
+                for key, value in files.items()
+            }
+        elif json_body is not None:
+            kwargs["data"] = json.dumps(json_body)
+            kwargs["content_type"] = "application/json"
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method.lower())(path, **kwargs)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(queries.captured_queries), len(response.content)
+
+
+class LiveTarget:
+    """Sends requests to a running server over a keep-alive session."""
+
+    name = "live"
+
+    def __init__(self, base_url, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+
+    def request(self, method, path, json_body=None, files=None, token=None):
+        headers = {"Authorization": f"Token {token}"} if token else {}
+        if files is not None:
+            files = {key: ("upload.jpg", value, "image/jpeg") for key, value in files.items()}
+
+        started = time.perf_counter()
+        response = self.session.request(
+            method, f"{self.base_url}{path}", json=json_body, files=files, headers=headers, timeout=60
+        )
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, None, len(response.content)
+
+
+def start_server(command, port, env, timeout=30):
+    """Start a server subprocess and wait until it accepts connections."""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}: {' '.join(command)}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not start within {timeout}s: {' '.join(command)}")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, wall_time):
+    """
+    Reduce (status, elapsed, queries, size) samples to throughput, latency
+    percentiles in milliseconds, query counts and status codes.
+    """
+    latencies = sorted(sample[1] for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample[0])] = statuses.get(str(sample[0]), 0) + 1
+
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / wall_time, 2) if wall_time else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_queries": round(sum(queries) / len(queries), 2) if queries else None,
+        "max_queries": max(queries) if queries else None,
+        "mean_response_bytes": round(sum(sample[3] for sample in samples) / len(samples), 1),
+        "status_codes": statuses,
+    }
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+from .sms import SMS_BACKENDS
+
+
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+# Backends whose incr() is a single atomic operation. The others read the value
+# and write it back, so concurrent increments can be lost.
+ATOMIC_INCR_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+}
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """
+    OTP codes, idempotency records, the circuit breaker and token revocation
+    only work across worker processes when their cache is shared by all of
+    them.
+    """
+    aliases = {
+        "OTP": settings.OTP["CACHE_ALIAS"],
+        "IDEMPOTENCY": settings.IDEMPOTENCY["CACHE_ALIAS"],
+        "DECENTRO_CIRCUIT_BREAKER": settings.DECENTRO_CIRCUIT_BREAKER["CACHE_ALIAS"],
+    }
+    warnings = []
+    for setting, alias in aliases.items():
+        backend = settings.CACHES.get(alias, {}).get("BACKEND")
+        if backend in PROCESS_LOCAL_CACHES:
+            warnings.append(Warning(
+                f"{setting} uses the {alias!r} cache, which is local to each process.",
+                hint="Set REDIS_URL, or point it at another cache shared by every worker, before running more than one.",
+                id="Accounts.W001",
+            ))
+    if settings.TOKEN_AUTH_CACHE.get("BACKEND") == "locmem":
+        warnings.append(Warning(
+            "TOKEN_AUTH_CACHE uses the locmem backend; other processes keep accepting a revoked token "
+            "until their cached copy expires.",
+            hint='Use the "django" backend with a cache shared by every worker before running more than one.',
+            id="Accounts.W001",
+        ))
+    return warnings
+
+
+@register()
+def check_otp_settings(app_configs, **kwargs):
+    """
+    OTP attempts are counted with cache.incr, which only enforces
+    MAX_ATTEMPTS when it is atomic, and codes must actually be texted rather
+    than logged outside development: with DEBUG off there is no default SMS
+    backend.
+    """
+    errors = []
+    alias = settings.OTP["CACHE_ALIAS"]
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend not in ATOMIC_INCR_CACHES:
+        errors.append(Error(
+            f"OTP uses the {alias!r} cache ({backend}), whose incr() is not atomic; concurrent wrong "
+            "guesses could get past MAX_ATTEMPTS.",
+            hint="Use Redis, memcached or LocMemCache for OTP[\"CACHE_ALIAS\"].",
+            id="Accounts.E001",
+        ))
+    sms_backend = settings.SMS.get("BACKEND")
+    if sms_backend not in SMS_BACKENDS:
+        errors.append(Error(
+            f"SMS backend {sms_backend!r} is not one of {', '.join(map(repr, SMS_BACKENDS))}; OTP codes cannot be sent.",
+            hint='Set SMS_BACKEND, normally to "http" along with SMS_URL and SMS_API_KEY.',
+            id="Accounts.E002",
+        ))
+    return errors
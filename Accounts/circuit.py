@@ -0,0 +1,135 @@
+import logging
+import random
+import time
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from .metrics import CIRCUIT_REJECTED, CIRCUIT_TRANSITIONS
+
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of calling an upstream whose circuit is open. A
+    RequestException, so callers that already handle connection errors
+    treat it as one.
+    """
+
+    def __init__(self, service, retry_after):
+        super().__init__(f"{service} is unavailable; retry in {retry_after} seconds.")
+        self.service = service
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an upstream service, with its state kept in a Django
+    cache alias so every process sharing that cache trips and recovers
+    together.
+
+    Closed: calls go through, and failures are counted in a fixed window of
+    `failure_window` seconds. `failure_threshold` failures open the circuit.
+    Open: calls fail fast with CircuitOpenError for `recovery_timeout`
+    seconds. Half-open: after that, a single probe call is let through
+    (claimed with cache.add); its success closes the circuit and its failure
+    opens it again.
+    """
+
+    def __init__(self, service, failure_threshold=5, failure_window=60, recovery_timeout=30,
+                 cache_alias="default", **kwargs):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.recovery_timeout = recovery_timeout
+        self.cache = caches[cache_alias]
+        self.state_key = f"circuit:{service}:state"
+        self.failures_key = f"circuit:{service}:failures"
+        self.probe_key = f"circuit:{service}:probe"
+
+    def state(self):
+        """Return (state, seconds the circuit has been open)."""
+        entry = self.cache.get(self.state_key)
+        if entry is None:
+            return CLOSED, 0
+        state, opened_at = entry
+        return state, time.time() - opened_at
+
+    def is_open(self):
+        """True while calls are being refused without a probe."""
+        state, open_for = self.state()
+        return state != CLOSED and open_for < self.recovery_timeout
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may be sent now."""
+        state, open_for = self.state()
+        if state == CLOSED:
+            return
+        if open_for >= self.recovery_timeout and self.cache.add(self.probe_key, True, self.recovery_timeout):
+            self._transition(state, HALF_OPEN, time.time() - open_for)
+            return
+        CIRCUIT_REJECTED.inc(service=self.service)
+        raise CircuitOpenError(self.service, max(1, round(self.recovery_timeout - open_for)))
+
+    def record_success(self):
+        state, open_for = self.state()
+        if state != CLOSED:
+            self.cache.delete_many([self.state_key, self.failures_key, self.probe_key])
+            self._log(state, CLOSED)
+
+    def record_failure(self):
+        state, open_for = self.state()
+        if state != CLOSED:
+            # A failed probe restarts the recovery timeout.
+            self._transition(state, OPEN, time.time())
+            self.cache.delete(self.probe_key)
+            return
+        if not self.cache.add(self.failures_key, 1, self.failure_window):
+            try:
+                failures = self.cache.incr(self.failures_key)
+            except ValueError:
+                failures = 1
+                self.cache.set(self.failures_key, failures, self.failure_window)
+        else:
+            failures = 1
+        if failures >= self.failure_threshold:
+            self._transition(CLOSED, OPEN, time.time())
+            self.cache.delete(self.failures_key)
+
+    def reset(self):
+        self.cache.delete_many([self.state_key, self.failures_key, self.probe_key])
+
+    def _transition(self, from_state, to_state, opened_at):
+        # Kept a little past the recovery timeout so an abandoned half-open
+        # circuit falls back to closed rather than staying stuck.
+        self.cache.set(self.state_key, (to_state, opened_at), self.recovery_timeout * 4)
+        self._log(from_state, to_state)
+
+    def _log(self, from_state, to_state):
+        if from_state == to_state:
+            return
+        CIRCUIT_TRANSITIONS.inc(service=self.service, from_state=from_state, to_state=to_state)
+        log = logger.info if to_state == CLOSED else logger.warning
+        log("Circuit breaker state changed", extra={"service": self.service, "from_state": from_state, "to_state": to_state})
+
+
+def backoff_delays(retries, base, cap):
+    """
+    Sleep times before each of `retries` retries: exponential backoff with
+    full jitter, so clients that failed together do not retry together.
+    """
+    return [random.uniform(0, min(cap, base * 2 ** attempt)) for attempt in range(retries)]
+
+
+def is_retryable(error):
+    """Connection errors, timeouts and 5xx/429 answers are worth retrying; other 4xx are not."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return not isinstance(error, CircuitOpenError)
+    return response.status_code >= 500 or response.status_code == 429
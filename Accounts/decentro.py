@@ -0,0 +1,295 @@
+import asyncio
+import threading
+import time
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .circuit import CircuitBreaker, backoff_delays, is_retryable
+from .metrics import EXTERNAL_CALL_RETRIES, track_external
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+
+CACHE_KEY_PREFIX = "decentro:vpa:"
+
+
+def http_error_message(response):
+    """The message requests' raise_for_status() gives for an httpx response."""
+    kind = "Client" if response.status_code < 500 else "Server"
+    return f"{response.status_code} {kind} Error: {response.reason_phrase} for url: {response.url}"
+
+
+class DecentroClient:
+    """
+    Client for the Decentro mobile_to_vpa API.
+
+    A single keep-alive session is shared by every request made through the
+    client, so repeated lookups reuse pooled TCP/TLS connections instead of
+    handshaking each time. Non-empty results are cached per phone number.
+    When httpx is installed the async path uses a pooled httpx.AsyncClient per
+    event loop instead of a worker thread.
+
+    Every attempt goes through a circuit breaker shared by all processes
+    using the same cache. Connection errors, timeouts and 5xx answers are
+    retried up to `max_retries` times with jittered backoff, as long as the
+    retry can start within `retry_deadline` seconds of the first attempt.
+    The async path can also hedge: when an attempt has not answered after
+    `hedge_delay` seconds, a second one is sent with the same reference_id
+    and the first answer wins.
+    """
+
+    def __init__(self, base_url=None, client_id=None, client_secret=None, module_secret=None,
+                 timeout=None, pool_size=None, cache_ttl=None, max_retries=None, retry_backoff=None,
+                 retry_backoff_max=None, retry_deadline=None, hedge_delay=None, breaker=None):
+        self.base_url = base_url or settings.DECENTRO_BASE_URL
+        self.client_id = client_id or settings.DECENTRO_CLIENT_ID
+        self.client_secret = client_secret or settings.DECENTRO_CLIENT_SECRET
+        self.module_secret = module_secret or settings.DECENTRO_MODULE_SECRET
+        self.timeout = timeout if timeout is not None else settings.DECENTRO_TIMEOUT
+        self.pool_size = pool_size or settings.DECENTRO_POOL_SIZE
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.DECENTRO_CACHE_TTL
+        self.max_retries = max_retries if max_retries is not None else settings.DECENTRO_MAX_RETRIES
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.DECENTRO_RETRY_BACKOFF
+        self.retry_backoff_max = retry_backoff_max if retry_backoff_max is not None else settings.DECENTRO_RETRY_BACKOFF_MAX
+        self.retry_deadline = retry_deadline if retry_deadline is not None else settings.DECENTRO_RETRY_DEADLINE
+        self.hedge_delay = hedge_delay if hedge_delay is not None else settings.DECENTRO_HEDGE_DELAY
+        self.breaker = breaker or CircuitBreaker(
+            "decentro", **{key.lower(): value for key, value in settings.DECENTRO_CIRCUIT_BREAKER.items()}
+        )
+        self._session = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def headers(self):
+        return {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "module_secret": self.module_secret,
+            "Content-Type": "application/json"
+        }
+
+    def payload(self, phone_number, reference_id):
+        return {
+            "reference_id": reference_id,
+            "consent": True,
+            "purpose": "Fetch user VPA from mobile number",
+            "mobile": phone_number
+        }
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update(self.headers())
+                    self._session = session
+        return self._session
+
+    def cache_key(self, phone_number):
+        return f"{CACHE_KEY_PREFIX}{phone_number}"
+
+    def record_outcome(self, error):
+        # A 4xx other than 429 means the upstream is up and answering.
+        if error is not None and is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def should_retry(self, error, attempt, delays, started):
+        return (
+            attempt < self.max_retries
+            and is_retryable(error)
+            and time.monotonic() + delays[attempt] - started < self.retry_deadline
+        )
+
+    def send(self, phone_number, reference_id):
+        """One attempt through the circuit breaker; returns the decoded body."""
+        self.breaker.before_call()
+        try:
+            with track_external("decentro"):
+                response = self.session.post(
+                    self.base_url, json=self.payload(phone_number, reference_id), timeout=self.timeout
+                )
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            self.record_outcome(e)
+            raise
+        self.record_outcome(None)
+        return data
+
+    def fetch_accounts(self, phone_number, reference_id, use_cache=True):
+        """
+        Return the list of VPA accounts linked to `phone_number`.
+
+        Raises `requests.exceptions.RequestException` when the API cannot be
+        reached or answers with an error status once retries are exhausted,
+        and its subclass CircuitOpenError without calling the API while the
+        circuit is open.
+        """
+        key = self.cache_key(phone_number)
+        if use_cache and self.cache_ttl:
+            accounts = cache.get(key)
+            if accounts is not None:
+                return accounts
+
+        started = time.monotonic()
+        delays = backoff_delays(self.max_retries, self.retry_backoff, self.retry_backoff_max)
+        for attempt in range(self.max_retries + 1):
+            try:
+                data = self.send(phone_number, reference_id)
+                break
+            except requests.exceptions.RequestException as e:
+                if not self.should_retry(e, attempt, delays, started):
+                    raise
+                EXTERNAL_CALL_RETRIES.inc(service="decentro", reason="error")
+                time.sleep(delays[attempt])
+
+        accounts = data.get("data", {}).get("results", [])
+
+        if accounts and self.cache_ttl:
+            cache.set(key, accounts, self.cache_ttl)
+        return accounts
+
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=self.headers(),
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def afetch_accounts(self, phone_number, reference_id, use_cache=True):
+        """
+        Async variant of `fetch_accounts` for use from async views. Without
+        httpx the blocking call runs in a worker thread instead. Errors are
+        raised as `requests.exceptions.RequestException` in both cases.
+        """
+        if httpx is None:
+            return await sync_to_async(self.fetch_accounts, thread_sensitive=False)(
+                phone_number, reference_id, use_cache=use_cache
+            )
+
+        key = self.cache_key(phone_number)
+        if use_cache and self.cache_ttl:
+            accounts = await cache.aget(key)
+            if accounts is not None:
+                return accounts
+
+        started = time.monotonic()
+        delays = backoff_delays(self.max_retries, self.retry_backoff, self.retry_backoff_max)
+        for attempt in range(self.max_retries + 1):
+            try:
+                data = await self.asend(phone_number, reference_id)
+                break
+            except requests.exceptions.RequestException as e:
+                if not self.should_retry(e, attempt, delays, started):
+                    raise
+                EXTERNAL_CALL_RETRIES.inc(service="decentro", reason="error")
+                await asyncio.sleep(delays[attempt])
+
+        accounts = data.get("data", {}).get("results", [])
+        if accounts and self.cache_ttl:
+            await cache.aset(key, accounts, self.cache_ttl)
+        return accounts
+
+    async def asend(self, phone_number, reference_id):
+        """
+        One call through the circuit breaker; returns the decoded body. With
+        `hedge_delay` set it may send a second request, but the breaker still
+        records a single outcome for the call.
+        """
+        await sync_to_async(self.breaker.before_call)()
+        try:
+            if self.hedge_delay:
+                data = await self.ahedged_post(phone_number, reference_id)
+            else:
+                data = await self.apost(phone_number, reference_id)
+        except requests.exceptions.RequestException as e:
+            await sync_to_async(self.record_outcome)(e)
+            raise
+        await sync_to_async(self.record_outcome)(None)
+        return data
+
+    async def apost(self, phone_number, reference_id):
+        """Send one request, raising `requests.exceptions.RequestException` on failure."""
+        try:
+            with track_external("decentro"):
+                response = await self.async_client().post(
+                    self.base_url, json=self.payload(phone_number, reference_id)
+                )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise requests.exceptions.HTTPError(http_error_message(e.response), response=e.response) from e
+        except (httpx.HTTPError, ValueError) as e:
+            raise requests.exceptions.RequestException(str(e)) from e
+
+    async def ahedged_post(self, phone_number, reference_id):
+        """
+        Send a request, and a second one when the first has not answered
+        after `hedge_delay` seconds. The first success wins and the other
+        request is cancelled; the last error is raised if both fail.
+        """
+        first = asyncio.ensure_future(self.apost(phone_number, reference_id))
+        done, pending = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if not done:
+            EXTERNAL_CALL_RETRIES.inc(service="decentro", reason="hedge")
+            pending.add(asyncio.ensure_future(self.apost(phone_number, reference_id)))
+
+        error = None
+        while pending or done:
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        raise error
+
+    def invalidate(self, phone_number):
+        cache.delete(self.cache_key(phone_number))
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DecentroClient()
+    return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting, **kwargs):
+    global _client
+    if setting.startswith("DECENTRO_"):
+        _client = None
@@ -0,0 +1,120 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+
+def default_accounts(mobile):
+    suffix = mobile[-4:] if mobile else "0000"
+    return [
+        {
+            "name": "Stub User",
+            "vpa": f"{mobile}@stubbank",
+            "merchantIfsc": f"STUB000{suffix}",
+            "tpap": ["stubpay"]
+        }
+    ]
+
+
+class DecentroStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+
+        server = self.server
+        server.requests_received += 1
+        server.peers.add(self.client_address)
+        delay = server.delay
+        if server.slow_rate and server.random.random() < server.slow_rate:
+            delay += server.slow_delay
+        if delay:
+            time.sleep(delay)
+
+        if server.failure_rate and server.random.random() < server.failure_rate:
+            server.failures_sent += 1
+            status = server.error_status
+            body = json.dumps({"status": "FAILURE", "message": "Injected fault"}).encode()
+        else:
+            status = 200
+            mobile = payload.get("mobile", "")
+            body = json.dumps({
+                "status": "SUCCESS",
+                "decentroTxnId": payload.get("reference_id", ""),
+                "data": {"results": server.accounts_for(mobile)}
+            }).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up, e.g. a hedged request that lost the race.
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DecentroStubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Decentro mobile_to_vpa endpoint.
+
+    Point `DECENTRO_BASE_URL` at `server.url` to exercise the client and the
+    bank-details views without network access:
+
+        with DecentroStubServer() as server:
+            with override_settings(DECENTRO_BASE_URL=server.url):
+                ...
+
+    Faults can be injected to exercise retries, hedging and the circuit
+    breaker: `failure_rate` of responses are `error_status` errors, and
+    `slow_rate` of responses take `slow_delay` seconds longer. All of them
+    can be changed while the server runs. `peers` holds the client address of
+    every connection that sent a request, to check that connections are reused.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, accounts_for=default_accounts, delay=0,
+                 failure_rate=0.0, error_status=503, slow_rate=0.0, slow_delay=0.0, seed=None):
+        super().__init__((host, port), DecentroStubHandler)
+        self.accounts_for = accounts_for
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.random = random.Random(seed)
+        self.requests_received = 0
+        self.failures_sent = 0
+        self.peers = set()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v2/financial_services/mobile_to_vpa/advance"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .throttling import IPRateThrottle
+
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+KEY_MAX_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+INVALID_KEY_MESSAGE = f"{IDEMPOTENCY_HEADER} must be 1-{KEY_MAX_LENGTH} characters."
+KEY_REUSED_MESSAGE = f"This {IDEMPOTENCY_HEADER} was already used for a different request."
+IN_PROGRESS_MESSAGE = f"A request with this {IDEMPOTENCY_HEADER} is still being processed."
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def idempotency_store():
+    return caches[settings.IDEMPOTENCY["CACHE_ALIAS"]]
+
+
+def idempotency_cache_key(request, key):
+    """
+    Keys are scoped to the endpoint and the caller: the user when the request
+    is authenticated, otherwise the client IP as the throttles resolve it, so
+    a spoofed X-Forwarded-For cannot reach another client's keys.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        caller = f"user:{user.pk}"
+    else:
+        caller = f"ip:{IPRateThrottle().get_client_ip(request)}"
+    digest = hashlib.sha256(f"{request.method}:{request.path}:{caller}:{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def lock_key(cache_key):
+    return f"{cache_key}:lock"
+
+
+def fingerprint(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def is_valid_key(key):
+    return 0 < len(key) <= KEY_MAX_LENGTH
+
+
+def replay(entry, body_fingerprint):
+    stored_fingerprint, status, content_type, content = entry
+    if stored_fingerprint != body_fingerprint:
+        raise IdempotencyError(422, KEY_REUSED_MESSAGE)
+    response = HttpResponse(content, status=status, content_type=content_type)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def entry_for(body_fingerprint, response):
+    if isinstance(response, SimpleTemplateResponse):
+        response.render()
+    return (body_fingerprint, response.status_code, response["Content-Type"], response.content)
+
+
+def claim(cache_key, body_fingerprint):
+    """
+    Return the stored response for `cache_key`, or None once the caller holds
+    its lock and should run the request. While another request holds the
+    lock this polls for its response for up to IDEMPOTENCY["WAIT"] seconds,
+    then gives up with a 409.
+    """
+    store = idempotency_store()
+    deadline = time.monotonic() + settings.IDEMPOTENCY["WAIT"]
+    while True:
+        entry = store.get(cache_key)
+        if entry is not None:
+            return replay(entry, body_fingerprint)
+        if store.add(lock_key(cache_key), body_fingerprint, settings.IDEMPOTENCY["LOCK_TIMEOUT"]):
+            # The holder may have stored its response and let go in between.
+            entry = store.get(cache_key)
+            if entry is None:
+                return None
+            store.delete(lock_key(cache_key))
+            return replay(entry, body_fingerprint)
+
+        holder = store.get(lock_key(cache_key))
+        if holder is not None and holder != body_fingerprint:
+            raise IdempotencyError(422, KEY_REUSED_MESSAGE)
+        if time.monotonic() >= deadline:
+            raise IdempotencyError(409, IN_PROGRESS_MESSAGE)
+        time.sleep(POLL_INTERVAL)
+
+
+def save(cache_key, body_fingerprint, response):
+    """
+    Store `response` for replay and release the lock. Server errors are not
+    stored, so retrying them runs the request again.
+    """
+    store = idempotency_store()
+    if response.status_code < 500:
+        store.set(cache_key, entry_for(body_fingerprint, response), settings.IDEMPOTENCY["TIMEOUT"])
+    store.delete(lock_key(cache_key))
+
+
+def release(cache_key):
+    idempotency_store().delete(lock_key(cache_key))
+
+
+async def aclaim(cache_key, body_fingerprint):
+    store = idempotency_store()
+    deadline = time.monotonic() + settings.IDEMPOTENCY["WAIT"]
+    while True:
+        entry = await store.aget(cache_key)
+        if entry is not None:
+            return replay(entry, body_fingerprint)
+        if await store.aadd(lock_key(cache_key), body_fingerprint, settings.IDEMPOTENCY["LOCK_TIMEOUT"]):
+            entry = await store.aget(cache_key)
+            if entry is None:
+                return None
+            await store.adelete(lock_key(cache_key))
+            return replay(entry, body_fingerprint)
+
+        holder = await store.aget(lock_key(cache_key))
+        if holder is not None and holder != body_fingerprint:
+            raise IdempotencyError(422, KEY_REUSED_MESSAGE)
+        if time.monotonic() >= deadline:
+            raise IdempotencyError(409, IN_PROGRESS_MESSAGE)
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def asave(cache_key, body_fingerprint, response):
+    store = idempotency_store()
+    if response.status_code < 500:
+        await store.aset(cache_key, entry_for(body_fingerprint, response), settings.IDEMPOTENCY["TIMEOUT"])
+    await store.adelete(lock_key(cache_key))
+
+
+async def arelease(cache_key):
+    await idempotency_store().adelete(lock_key(cache_key))
+
+
+class ReplayResponse(Exception):
+    """Raised from `initial` to answer with a stored response."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class IdempotentAPIMixin:
+    """
+    APIView mixin that runs a request carrying an Idempotency-Key header at
+    most once. The first response is stored for IDEMPOTENCY["TIMEOUT"]
+    seconds and replayed for retries with the same key and body; a retry
+    arriving while the first is still running waits for its response.
+    Authentication, permissions and throttles still apply to every retry.
+    """
+
+    idempotent_methods = ("POST",)
+
+    def initial(self, request, *args, **kwargs):
+        self.idempotency = None
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None or request.method not in self.idempotent_methods:
+            return super().initial(request, *args, **kwargs)
+
+        # Fingerprint the raw body before the parsers consume the stream.
+        body_fingerprint = fingerprint(request.body)
+        super().initial(request, *args, **kwargs)
+        if not is_valid_key(key):
+            raise ValidationError({IDEMPOTENCY_HEADER: [INVALID_KEY_MESSAGE]})
+
+        cache_key = idempotency_cache_key(request, key)
+        stored = claim(cache_key, body_fingerprint)
+        if stored is not None:
+            raise ReplayResponse(stored)
+        self.idempotency = (cache_key, body_fingerprint)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ReplayResponse):
+            return exc.response
+        if isinstance(exc, IdempotencyError):
+            return Response({"detail": exc.detail}, status=exc.status)
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            if getattr(self, "idempotency", None) is not None:
+                release(self.idempotency[0])
+                self.idempotency = None
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "idempotency", None) is not None:
+            cache_key, body_fingerprint = self.idempotency
+            self.idempotency = None
+            save(cache_key, body_fingerprint, response)
+        return response
@@ -0,0 +1,234 @@
+import codecs
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from .models import AuthToken, UserProfile
+from .validators import EMAIL_REGEX, PHONE_NUMBER_MESSAGE, EMAIL_MESSAGE, normalize_phone_number
+
+
+
+MAX_REPORTED_ERRORS = 100
+
+NAME_MAX_LENGTH = User._meta.get_field("first_name").max_length
+EMAIL_MAX_LENGTH = User._meta.get_field("email").max_length
+
+
+def max_length_message(max_length):
+    return f"Ensure this field has no more than {max_length} characters."
+
+
+def read_rows(stream, format="csv"):
+    """
+    Yield (line_number, row) pairs from a binary CSV or JSONL stream without
+    loading it into memory. CSV files need a header row with the field names.
+    """
+    text = codecs.getreader("utf-8")(stream)
+    if format == "jsonl":
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        for line_number, row in enumerate(csv.DictReader(text), start=2):
+            yield line_number, row
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def validate_rows(rows):
+    """
+    Validate and normalize a batch of (line_number, row) pairs in one pass.
+    Returns (valid, errors), where valid rows are dicts with phone_number,
+    name, email and password, and rows repeating a phone number or email
+    seen earlier in the batch, or longer than the User columns, are reported
+    as errors.
+    """
+    phones = [normalize_phone_number(str((row or {}).get("phone_number") or "")) for _, row in rows]
+    emails = [str((row or {}).get("email") or "").strip().lower() for _, row in rows]
+    names = [str((row or {}).get("name") or "").strip() for _, row in rows]
+    phone_ok = [phone is not None for phone in phones]
+    email_ok = [EMAIL_REGEX.match(email) is not None for email in emails]
+
+    valid, errors = [], []
+    seen_phones, seen_emails = set(), set()
+    for (line_number, row), phone, email, name, phone_valid, email_valid in zip(rows, phones, emails, names, phone_ok, email_ok):
+        if row is None:
+            errors.append({"line": line_number, "errors": ["Row is not a JSON object."]})
+            continue
+        row_errors = {}
+        if not phone_valid:
+            row_errors["phone_number"] = [PHONE_NUMBER_MESSAGE]
+        elif phone in seen_phones:
+            row_errors["phone_number"] = ["Duplicate phone number in this file."]
+        if len(email) > EMAIL_MAX_LENGTH:
+            row_errors["email"] = [max_length_message(EMAIL_MAX_LENGTH)]
+        elif not email_valid:
+            row_errors["email"] = [EMAIL_MESSAGE]
+        elif email in seen_emails:
+            row_errors["email"] = ["Duplicate email in this file."]
+        if len(name) > NAME_MAX_LENGTH:
+            row_errors["name"] = [max_length_message(NAME_MAX_LENGTH)]
+        if row_errors:
+            errors.append({"line": line_number, "errors": row_errors})
+            continue
+
+        seen_phones.add(phone)
+        seen_emails.add(email)
+        valid.append({
+            "line": line_number,
+            "phone_number": phone,
+            "email": email,
+            "name": name,
+            "password": row.get("password") or None,
+        })
+    return valid, errors
+
+
+def existing_accounts(rows):
+    """Phone numbers and emails among `rows` that already belong to a user, in one query."""
+    phones = [row["phone_number"] for row in rows]
+    emails = [row["email"] for row in rows]
+    phone_set, email_set = set(), set()
+    for username, email in User.objects.filter(Q(username__in=phones) | Q(email__in=emails)).values_list('username', 'email'):
+        phone_set.add(username)
+        email_set.add(email.lower())
+    return phone_set, email_set
+
+
+def init_hashing_worker():
+    django.setup()
+
+
+def hash_passwords(passwords, executor=None):
+    """
+    Hash a batch of passwords, in `executor`'s worker processes when given.
+    Rows without a password get an unusable one and skip the hasher.
+    """
+    hashes = [make_password(None) for _ in passwords]
+    to_hash = [(i, password) for i, password in enumerate(passwords) if password]
+    if to_hash:
+        raw = [password for _, password in to_hash]
+        if executor is None:
+            hashed = map(make_password, raw)
+        else:
+            hashed = executor.map(make_password, raw, chunksize=max(1, len(raw) // 32))
+        for (i, _), encoded in zip(to_hash, hashed):
+            hashes[i] = encoded
+    return hashes
+
+
+class ImportResult:
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return round(self.processed / elapsed, 1) if elapsed else 0.0
+
+    def add_errors(self, errors):
+        self.invalid += len(errors)
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+    def as_dict(self):
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "rows_per_second": self.rows_per_second,
+            "errors": self.errors,
+        }
+
+
+def create_accounts(rows, hashes, verified):
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=row["phone_number"], email=row["email"], first_name=row["name"], password=password)
+            for row, password in zip(rows, hashes)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user, is_verified=verified) for user in users])
+        AuthToken.objects.bulk_create([AuthToken(user=user) for user in users])
+    return users
+
+
+def import_users(stream, format="csv", batch_size=1000, workers=0, verified=False, progress=None):
+    """
+    Create users, profiles and tokens from a CSV/JSONL stream, `batch_size`
+    rows at a time: each batch is validated in one pass, checked against
+    existing accounts with one query and inserted with one bulk_create per
+    table. Passwords are hashed in a pool of `workers` processes (inline when
+    0). Rows that clash with existing accounts are counted as duplicates.
+    `progress(result)` is called after every batch.
+    """
+    result = ImportResult()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_hashing_worker) if workers else None
+    try:
+        for batch in batches(read_rows(stream, format), batch_size):
+            result.processed += len(batch)
+            valid, errors = validate_rows(batch)
+            result.add_errors(errors)
+            if valid:
+                phones, emails = existing_accounts(valid)
+                fresh = [row for row in valid if row["phone_number"] not in phones and row["email"] not in emails]
+                result.duplicates += len(valid) - len(fresh)
+                hashes = dict(zip(
+                    (row["line"] for row in fresh), hash_passwords([row["password"] for row in fresh], executor)
+                ))
+                # A concurrent sign-up can take a phone number or email between
+                # the duplicate check and the insert; recheck and retry then.
+                for attempt in range(3):
+                    if not fresh:
+                        break
+                    try:
+                        create_accounts(fresh, [hashes[row["line"]] for row in fresh], verified)
+                    except IntegrityError:
+                        if attempt == 2:
+                            raise
+                        phones, emails = existing_accounts(fresh)
+                        remaining = [row for row in fresh if row["phone_number"] not in phones and row["email"] not in emails]
+                        result.duplicates += len(fresh) - len(remaining)
+                        fresh = remaining
+                        continue
+                    result.created += len(fresh)
+                    break
+            if progress is not None:
+                progress(result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return result
+
+
+def count_lines(stream):
+    """
+    Count the lines in a binary stream and rewind it. A CSV row with quoted
+    newlines counts more than once, so this is an upper bound on the rows.
+    """
+    lines = sum(1 for _ in stream)
+    stream.seek(0)
+    return lines
+
+
+def file_format(name):
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+import requests
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from .circuit import CircuitOpenError
+from .decentro import get_client
+from .models import BankDetails, BankDetailsFetchJob
+from .profile_cache import invalidate_me
+
+
+
+logger = logging.getLogger(__name__)
+
+NO_BANK_DETAILS_MESSAGE = "No bank details found for this phone number."
+
+
+def decentro_error_message(error):
+    return f"Failed to connect to Decentro API: {str(error)}"
+
+
+def enqueue_fetch_job(user, reference_id):
+    """
+    Queue a Decentro fetch for `user`. A user has at most one pending or
+    running job, so when one is already queued it is returned instead and
+    repeated refreshes cost a single upstream call.
+    """
+    try:
+        with transaction.atomic():
+            return BankDetailsFetchJob.objects.create(user=user, reference_id=reference_id)
+    except IntegrityError:
+        job = BankDetailsFetchJob.objects.filter(user=user, status__in=BankDetailsFetchJob.ACTIVE_STATUSES).first()
+        if job is None:
+            # The queued job finished in between.
+            return BankDetailsFetchJob.objects.create(user=user, reference_id=reference_id)
+        return job
+
+
+def claim_jobs(limit):
+    """
+    Claim up to `limit` pending jobs, oldest first. Each job is claimed with a
+    conditional UPDATE so several workers can poll the same table without
+    running a job twice, on any database backend.
+    """
+    candidates = (
+        BankDetailsFetchJob.objects
+        .filter(status=BankDetailsFetchJob.STATUS_PENDING)
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in list(candidates):
+        updated = BankDetailsFetchJob.objects.filter(
+            pk=pk, status=BankDetailsFetchJob.STATUS_PENDING
+        ).update(status=BankDetailsFetchJob.STATUS_RUNNING, updated_at=timezone.now())
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs(older_than):
+    """Return jobs left `running` by a crashed worker to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return BankDetailsFetchJob.objects.filter(
+        status=BankDetailsFetchJob.STATUS_RUNNING, updated_at__lt=cutoff
+    ).update(status=BankDetailsFetchJob.STATUS_PENDING, updated_at=timezone.now())
+
+
+def bank_details_payload(reference_id, accounts):
+    return [
+        {
+            "reference_id": reference_id,
+            "name": account_info.get("name", ""),
+            "vpa": account_info.get("vpa", ""),
+            "merchant_ifsc": account_info.get("merchantIfsc", ""),
+            "tpap": account_info.get("tpap", [])
+        }
+        for account_info in accounts
+    ]
+
+
+STORED_BANK_DETAILS_FIELDS = ("name", "vpa", "merchant_ifsc", "tpap", "updated_at")
+
+
+def stored_bank_details(user_id):
+    """The user's last fetched bank details, read with one query on bankdetails_user_updated_idx."""
+    return BankDetails.objects.filter(user_profile_id=user_id).order_by("vpa").values(*STORED_BANK_DETAILS_FIELDS)
+
+
+def fetched_at(rows):
+    """When the stored rows were last refreshed; the oldest row decides."""
+    return min(row["updated_at"] for row in rows) if rows else None
+
+
+def is_fresh(rows, max_age):
+    """Whether `rows` were all fetched within the last `max_age` seconds."""
+    return bool(rows) and timezone.now() - fetched_at(rows) <= timedelta(seconds=max_age)
+
+
+def run_fetch_job(pk, max_attempts=3):
+    """
+    Call Decentro for a claimed job and persist the outcome. Connection errors
+    put the job back in the queue until `max_attempts` is reached.
+    """
+    close_old_connections()
+    try:
+        job = BankDetailsFetchJob.objects.select_related('user').get(pk=pk)
+        job.attempts += 1
+        try:
+            # Jobs refresh stored rows, so a cached answer would only restamp stale data.
+            accounts = get_client().fetch_accounts(job.user.username, job.reference_id, use_cache=False)
+        except CircuitOpenError as e:
+            # Not sent, so it does not use up an attempt.
+            job.status = BankDetailsFetchJob.STATUS_PENDING
+            job.error = str(e)
+            job.save(update_fields=['error', 'status', 'updated_at'])
+            return job
+        except requests.exceptions.RequestException as e:
+            job.error = decentro_error_message(e)
+            logger.warning("Decentro call failed", extra={"reference_id": job.reference_id, "attempt": job.attempts, "error": str(e)})
+            if job.attempts < max_attempts:
+                job.status = BankDetailsFetchJob.STATUS_PENDING
+            else:
+                job.status = BankDetailsFetchJob.STATUS_FAILED
+            job.save(update_fields=['attempts', 'error', 'status', 'updated_at'])
+            return job
+
+        if not accounts:
+            job.status = BankDetailsFetchJob.STATUS_FAILED
+            job.error = NO_BANK_DETAILS_MESSAGE
+        else:
+            BankDetails.objects.sync_accounts(job.user, accounts)
+            invalidate_me(job.user_id)
+            job.status = BankDetailsFetchJob.STATUS_SUCCEEDED
+            job.result = bank_details_payload(job.reference_id, accounts)
+            logger.info("Decentro accounts fetched", extra={"reference_id": job.reference_id, "accounts": len(accounts)})
+            job.error = ""
+        job.save(update_fields=['attempts', 'error', 'status', 'result', 'updated_at'])
+        return job
+    finally:
+        close_old_connections()
+
+
+class RateLimiter:
+    """
+    Spaces calls at least `1 / rate` seconds apart across all worker threads,
+    so outbound Decentro traffic is throttled in one place.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
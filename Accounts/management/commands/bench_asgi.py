@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from Accounts.benchmarks import LiveTarget, delete_seeded_users, seed_users, start_server, summarize
+from Accounts.decentro_stub import DecentroStubServer
+from .bench_endpoints import VERIFIED_OFFSET, build_request
+
+
+
+ENDPOINTS = ["login", "forgot-password", "address", "fetch-bank-details"]
+
+# What each server's fetch-bank-details numbers measure; they are not the same
+# work, so the report says so next to them.
+MEASURES = {
+    "fetch-bank-details": {
+        "wsgi": "enqueue latency (the Decentro call runs later in process_bank_details_jobs)",
+        "asgi": "end-to-end latency including the Decentro call",
+    },
+}
+
+
+def server_command(interface, port, workers):
+    """Gunicorn sync workers for WSGI, uvicorn workers for ASGI."""
+    if interface == "wsgi":
+        return [
+            shutil.which("gunicorn") or "gunicorn", "bitfiat.wsgi:application",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning",
+        ]
+    return [
+        shutil.which("uvicorn") or "uvicorn", "bitfiat.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the sync endpoints under gunicorn (WSGI) with the async "
+        "endpoints under uvicorn (ASGI), using the same worker count and a Decentro stub "
+        "that answers after --upstream-delay seconds. Both servers run with throttling disabled. "
+        "The sync fetch-bank-details endpoint only queues a job, so its numbers are enqueue "
+        "latency, while the async one calls the stub inline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500, help="Requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients.")
+        parser.add_argument("--workers", type=int, default=2, help="Server processes for both servers.")
+        parser.add_argument("--upstream-delay", type=float, default=0.1)
+        parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+        parser.add_argument("--port", type=int, default=8012)
+        parser.add_argument("--output", default="bench_asgi.json")
+
+    def handle(self, *args, **options):
+        for interface in ("wsgi", "asgi"):
+            executable = server_command(interface, options["port"], 1)[0]
+            if not os.path.isabs(executable):
+                raise CommandError(f"{executable} is not installed.")
+
+        self.stderr.write(
+            "Seeds and removes fixture users in the configured database "
+            f"({settings.DATABASES['default']['NAME']}); point DB_NAME at a scratch database."
+        )
+        delete_seeded_users()
+        fixtures = {"verified": seed_users(VERIFIED_OFFSET, options["iterations"])}
+        fixtures["kyc"] = fixtures["verified"]
+
+        results = {}
+        try:
+            with DecentroStubServer(delay=options["upstream_delay"]) as stub:
+                for interface, prefix in (("wsgi", ""), ("asgi", "/async")):
+                    results[interface] = self.run(interface, prefix, options, fixtures, stub)
+        finally:
+            delete_seeded_users()
+
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "iterations": options["iterations"],
+            "concurrency": options["concurrency"],
+            "workers": options["workers"],
+            "upstream_delay": options["upstream_delay"],
+            "measures": {endpoint: MEASURES[endpoint] for endpoint in options["endpoints"] if endpoint in MEASURES},
+            "results": results,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+
+        for endpoint in options["endpoints"]:
+            wsgi, asgi = results["wsgi"][endpoint], results["asgi"][endpoint]
+            self.stdout.write(
+                f"{endpoint:<20} wsgi {wsgi['throughput_rps']:>9} req/s p95={wsgi['p95_ms']}ms  "
+                f"asgi {asgi['throughput_rps']:>9} req/s p95={asgi['p95_ms']}ms"
+            )
+            for interface, measure in MEASURES.get(endpoint, {}).items():
+                self.stdout.write(f"{'':<20} {interface}: {measure}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def run(self, interface, prefix, options, fixtures, stub):
+        # One client sends every request, so the per-IP budgets would answer most with 429.
+        env = dict(os.environ, DECENTRO_BASE_URL=stub.url, THROTTLE_DISABLED="1")
+        command = server_command(interface, options["port"], options["workers"])
+        server = start_server(command, options["port"], env)
+        try:
+            target = LiveTarget(f"http://127.0.0.1:{options['port']}{prefix}", pool_size=options["concurrency"])
+            results = {}
+            for endpoint in options["endpoints"]:
+                def call(i):
+                    method, path, json_body, files, token = build_request(endpoint, i, fixtures)
+                    return target.request(method, path, json_body=json_body, files=files, token=token)
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                    samples = list(executor.map(call, range(options["iterations"])))
+                results[endpoint] = summarize(samples, time.perf_counter() - started)
+            return results
+        finally:
+            server.terminate()
+            server.wait()
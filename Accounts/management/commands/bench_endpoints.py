@@ -0,0 +1,235 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from Accounts.benchmarks import (
+    BENCH_PASSWORD, InProcessTarget, LiveTarget, bench_pan, bench_phone, delete_seeded_users,
+    sample_jpeg, seed_users, start_server, summarize
+)
+from Accounts.decentro import get_client
+from Accounts.decentro_stub import DecentroStubServer
+from Accounts.jobs import claim_jobs, run_fetch_job
+from Accounts.otp import store_otp
+
+
+
+ENDPOINTS = [
+    "sign-up",
+    "login",
+    "otp-verification",
+    "kyc-pan",
+    "kyc-img",
+    "forgot-password",
+    "update-password",
+    "address",
+    "fetch-bank-details",
+]
+
+# Fixture offsets keep every pool of generated phone numbers disjoint.
+VERIFIED_OFFSET = 0
+KYC_OFFSET = 1_000_000
+SIGNUP_OFFSET = 2_000_000
+
+BENCH_OTP = "246810"
+
+# The sync fetch-bank-details endpoint only queues a job; its latency is the
+# enqueue. The queued jobs are then run through the worker and reported as
+# FETCH_JOBS, one sample per Decentro call.
+FETCH_JOBS = "fetch-bank-details-job"
+
+# Every request comes from one client, so the per-IP budgets would turn most
+# of them into 429s.
+UNTHROTTLED = {**settings.THROTTLING, "RATES": {}}
+
+
+def build_request(endpoint, i, fixtures):
+    """Return (method, path, json_body, files, token) for iteration `i`."""
+    user = fixtures["verified"][i]
+    kyc_user = fixtures["kyc"][i]
+
+    if endpoint == "sign-up":
+        n = SIGNUP_OFFSET + i
+        return "POST", "/sign-up/", {
+            "phone_number": bench_phone(n),
+            "name": "Bench",
+            "email": f"bench{n}@example.com",
+            "password": BENCH_PASSWORD,
+        }, None, None
+    if endpoint == "login":
+        return "POST", "/login/", {"phone_number": user["phone_number"], "password": BENCH_PASSWORD}, None, None
+    if endpoint == "otp-verification":
+        return "POST", "/otp-verification/", {"otp": BENCH_OTP}, None, user["token"]
+    if endpoint == "kyc-pan":
+        return "POST", "/kyc-pan/", {"pan_number": bench_pan(kyc_user["index"])}, None, kyc_user["token"]
+    if endpoint == "kyc-img":
+        return "POST", "/kyc-img/", None, {"user_image": fixtures["image"]}, kyc_user["token"]
+    if endpoint == "forgot-password":
+        return "POST", "/forgot-password/", {"phone_number": user["phone_number"]}, None, None
+    if endpoint == "update-password":
+        return "POST", "/update-password/", {
+            "password": BENCH_PASSWORD, "confirm_password": BENCH_PASSWORD
+        }, None, user["token"]
+    if endpoint == "address":
+        return "POST", "/address/", {
+            "house_flat_apartment": f"Flat {i}",
+            "road_street": "MG Road",
+            "landmark": "Near Metro",
+            "city": "Bengaluru",
+            "pincode": "560001",
+            "state": "karnataka",
+            "address_type": "home",
+        }, None, user["token"]
+    if endpoint == "fetch-bank-details":
+        return "GET", "/fetch-bank-details/", None, None, user["token"]
+    raise ValueError(endpoint)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every Accounts endpoint and write throughput, p50/p95/p99 latency and "
+        "query counts to a JSON file. The Decentro API is replaced by a local stub. Throttling "
+        "is disabled; fetch-bank-details measures the enqueue and fetch-bank-details-job the "
+        "worker that runs the queued jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=["inprocess", "live"], default="inprocess")
+        parser.add_argument("--iterations", type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=1, help="Concurrent clients (live mode).")
+        parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+        parser.add_argument("--base-url", help="Benchmark an already running server (live mode).")
+        parser.add_argument("--port", type=int, default=8011, help="Port for the server started in live mode.")
+        parser.add_argument("--output", default="bench_endpoints.json")
+
+    def handle(self, *args, **options):
+        if options["mode"] == "inprocess" and options["concurrency"] != 1:
+            raise CommandError("In-process mode runs requests sequentially; use --mode live for concurrency.")
+
+        with DecentroStubServer() as stub:
+            if options["mode"] == "inprocess":
+                results = self.run_inprocess(options, stub)
+            else:
+                results = self.run_live(options, stub)
+
+        report = {
+            "mode": options["mode"],
+            "commit": self.git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "iterations": options["iterations"],
+            "concurrency": options["concurrency"],
+            "database": connection.vendor,
+            "results": results,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+
+        for endpoint, stats in results.items():
+            queries = stats["mean_queries"] if stats["mean_queries"] is not None else "-"
+            self.stdout.write(
+                f"{endpoint:<24} {stats['throughput_rps']:>9} req/s  p50={stats['p50_ms']}ms "
+                f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms queries={queries} {stats['status_codes']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def run_inprocess(self, options, stub):
+        # Run against a throwaway test database, like the test runner does.
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(DECENTRO_BASE_URL=stub.url, DEBUG=False, THROTTLING=UNTHROTTLED):
+                fixtures = self.seed(options["iterations"])
+                return self.run(InProcessTarget(), options, fixtures)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run_live(self, options, stub):
+        self.stderr.write(
+            "Live mode seeds and removes fixture users in the configured database "
+            f"({settings.DATABASES['default']['NAME']}); point DB_NAME at a scratch database."
+        )
+        delete_seeded_users()
+        fixtures = self.seed(options["iterations"])
+        server = None
+        try:
+            base_url = options["base_url"]
+            if not base_url:
+                env = dict(os.environ, DECENTRO_BASE_URL=stub.url, THROTTLE_DISABLED="1")
+                command = [sys.executable, "manage.py", "runserver", f"127.0.0.1:{options['port']}", "--noreload"]
+                server = start_server(command, options["port"], env)
+                base_url = f"http://127.0.0.1:{options['port']}"
+            else:
+                self.stderr.write("Start the server with THROTTLE_DISABLED=1, or most auth requests will be throttled.")
+            with override_settings(DECENTRO_BASE_URL=stub.url):
+                return self.run(LiveTarget(base_url), options, fixtures)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            delete_seeded_users()
+
+    def seed(self, iterations):
+        started = time.perf_counter()
+        fixtures = {
+            "verified": seed_users(VERIFIED_OFFSET, iterations),
+            "kyc": seed_users(KYC_OFFSET, iterations),
+            "image": sample_jpeg(),
+        }
+        # Pending codes live in the OTP cache; in live mode the server only
+        # sees them when that cache is shared between processes.
+        for user in fixtures["verified"]:
+            store_otp(user["user_id"], BENCH_OTP)
+        self.stdout.write(f"Seeded {2 * iterations} users in {time.perf_counter() - started:.1f}s")
+        return fixtures
+
+    def run(self, target, options, fixtures):
+        results = {}
+        for endpoint in options["endpoints"]:
+            def call(i):
+                method, path, json_body, files, token = build_request(endpoint, i, fixtures)
+                return target.request(method, path, json_body=json_body, files=files, token=token)
+
+            started = time.perf_counter()
+            if options["concurrency"] > 1:
+                with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                    samples = list(executor.map(call, range(options["iterations"])))
+            else:
+                samples = [call(i) for i in range(options["iterations"])]
+            results[endpoint] = summarize(samples, time.perf_counter() - started)
+            if endpoint == "fetch-bank-details":
+                results[FETCH_JOBS] = self.run_fetch_jobs()
+        return results
+
+    def run_fetch_jobs(self):
+        """Run the queued fetch jobs one at a time, as a single worker thread would."""
+        samples = []
+        started = time.perf_counter()
+        while not get_client().breaker.is_open():
+            claimed = claim_jobs(100)
+            if not claimed:
+                break
+            for pk in claimed:
+                with CaptureQueriesContext(connection) as queries:
+                    job_started = time.perf_counter()
+                    job = run_fetch_job(pk)
+                    elapsed = time.perf_counter() - job_started
+                samples.append((job.status, elapsed, len(queries.captured_queries), len(json.dumps(job.result))))
+        if not samples:
+            raise CommandError("fetch-bank-details queued no jobs.")
+        return summarize(samples, time.perf_counter() - started)
+
+    def git_revision(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,72 @@
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image
+from Accounts.uploads import append_chunk, process_kyc_image
+
+
+
+def make_photo(width, height):
+    image = Image.effect_noise((width, height), 60).convert("RGB")
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+
+def run_stage(stage, data, iterations, chunk_size, conn):
+    """Runs in a fresh process so ru_maxrss reflects this stage only."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as temp_dir, override_settings(KYC_UPLOAD_TEMP_DIR=temp_dir):
+        for i in range(iterations):
+            if stage == "upload":
+                upload = SimpleNamespace(upload_id=i, received=0, total_size=len(data))
+                for offset in range(0, len(data), chunk_size):
+                    stream = io.BytesIO(data[offset:offset + chunk_size])
+                    append_chunk(upload, stream, offset, chunk_size)
+            else:
+                process_kyc_image(io.BytesIO(data))
+
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((elapsed, baseline, peak))
+    conn.close()
+
+
+class Command(BaseCommand):
+    help = "Measure throughput and peak RSS of the KYC chunked upload and image post-processing stages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--width", type=int, default=4000)
+        parser.add_argument("--height", type=int, default=3000)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--chunk-size", type=int, default=1024 * 1024)
+
+    def handle(self, *args, **options):
+        data = make_photo(options["width"], options["height"])
+        size_mb = len(data) / (1024 * 1024)
+        self.stdout.write(f"Source image: {options['width']}x{options['height']}, {size_mb:.1f} MB")
+
+        context = multiprocessing.get_context("fork")
+        for stage in ("upload", "process"):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=run_stage,
+                args=(stage, data, options["iterations"], options["chunk_size"], child),
+            )
+            process.start()
+            elapsed, baseline, peak = parent.recv()
+            process.join()
+
+            per_second = options["iterations"] / elapsed
+            self.stdout.write(
+                f"{stage:<8} {per_second:7.2f} images/s  {size_mb * per_second:8.1f} MB/s  "
+                f"peak RSS {peak / 1024:.1f} MB (+{(peak - baseline) / 1024:.1f} MB)"
+            )
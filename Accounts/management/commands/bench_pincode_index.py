@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from Accounts.pincodes import STATES, PincodeIndex, write_index
+
+
+
+def synthetic_entries(count, seed=0):
+    generator = random.Random(seed)
+    pincodes = generator.sample(range(110001, 855118), count)
+    cities = [f"District {i}" for i in range(750)]
+    return {pincode: (generator.choice(STATES), generator.choice(cities)) for pincode in pincodes}
+
+
+def run_stage(stage, path, probes, conn):
+    """Runs in a fresh process so ru_maxrss reflects this stage only."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if stage == "mmap index":
+        index = PincodeIndex(path)
+        lookup = index.lookup
+    else:
+        # The alternative: every row decoded into a dict up front.
+        source = PincodeIndex(path)
+        table = {
+            f"{code:06d}": (STATES[state], source.city_names[city])
+            for code, state, city in zip(source._pincodes, source._states, source._cities)
+        }
+        del source
+        lookup = table.get
+    load_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for pincode in probes:
+        lookup(pincode)
+    lookup_time = time.perf_counter() - started
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((load_time, lookup_time, baseline, peak))
+    conn.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure load time, lookup throughput and memory of the pincode index against a "
+        "plain dict. Uses PINCODE_INDEX_PATH, or a synthetic index with --synthetic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, metavar="PINCODES", help="Benchmark a generated index of this size.")
+        parser.add_argument("--lookups", type=int, default=200_000)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if options["synthetic"]:
+                path = os.path.join(temp_dir, "pincodes.idx")
+                write_index(path, synthetic_entries(options["synthetic"]))
+            else:
+                path = settings.PINCODE_INDEX_PATH
+
+            index = PincodeIndex(path)
+            known = [f"{code:06d}" for code in index._pincodes]
+            generator = random.Random(1)
+            # Half known pincodes, half random ones that mostly miss.
+            probes = [
+                generator.choice(known) if i % 2 else f"{generator.randint(100000, 999999)}"
+                for i in range(options["lookups"])
+            ]
+            self.stdout.write(f"{len(index)} pincodes, {os.path.getsize(path) / 1024:.1f} KB on disk")
+            del index
+
+            context = multiprocessing.get_context("fork")
+            for stage in ("mmap index", "dict"):
+                parent, child = context.Pipe()
+                process = context.Process(target=run_stage, args=(stage, path, probes, child))
+                process.start()
+                load_time, lookup_time, baseline, peak = parent.recv()
+                process.join()
+
+                self.stdout.write(
+                    f"{stage:<11} load {load_time * 1000:8.2f} ms  "
+                    f"{options['lookups'] / lookup_time:12,.0f} lookups/s  "
+                    f"peak RSS {peak / 1024:.1f} MB (+{(peak - baseline) / 1024:.2f} MB)"
+                )
@@ -0,0 +1,99 @@
+import datetime
+import io
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from Accounts.models import Address
+from Accounts.renderers import FastJSONParser, FastJSONRenderer
+from Accounts.serializers import AddressSerializer, UserProfileSerializer, address_data, user_profile_data
+
+
+
+def sample_user():
+    return User(pk=1, username="+919876543210", first_name="Asha Rao", email="asha@example.com", password="pbkdf2_sha256$...")
+
+
+def sample_addresses(count):
+    created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    return [
+        Address(
+            pk=i,
+            house_flat_apartment=f"Flat {i}, Sunrise Apartments",
+            road_street="MG Road",
+            landmark="Near the metro station",
+            city="Bengaluru",
+            pincode="560001",
+            state="karnataka",
+            address_type="home",
+            created_at=created_at + datetime.timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+def cpu_per_call(func, number):
+    """CPU seconds per call, so time spent waiting on other processes is not counted."""
+    started = time.process_time()
+    for _ in range(number):
+        func()
+    return (time.process_time() - started) / number
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-response CPU for the JSON renderer and parser and for building response "
+        "bodies with ModelSerializer(...).data versus the plain representation functions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=2000, help="Calls per measurement.")
+        parser.add_argument("--addresses", type=int, default=20, help="Addresses in the list payload.")
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        user = sample_user()
+        addresses = sample_addresses(options["addresses"])
+
+        payloads = {
+            "sign-up": (
+                lambda: {"user_profile": UserProfileSerializer(user).data, "token": "0" * 40},
+                lambda: {"user_profile": user_profile_data(user), "token": "0" * 40},
+            ),
+            "address list": (
+                lambda: {"results": AddressSerializer(addresses, many=True).data, "next_cursor": None},
+                lambda: {"results": [address_data(address) for address in addresses], "next_cursor": None},
+            ),
+        }
+
+        self.stdout.write(f"{'payload':<14}{'stage':<12}{'stdlib/DRF':>14}{'fast':>14}{'speedup':>10}")
+        for name, (serializer_body, plain_body) in payloads.items():
+            stdlib_data = serializer_body()
+            fast_data = plain_body()
+            stdlib_json = JSONRenderer().render(stdlib_data)
+            fast_json = FastJSONRenderer().render(fast_data)
+            if JSONParser().parse(io.BytesIO(stdlib_json)) != FastJSONParser().parse(io.BytesIO(fast_json)):
+                self.stderr.write(f"{name}: fast output differs from the stdlib output")
+
+            stages = {
+                "build": (serializer_body, plain_body),
+                "render": (lambda: JSONRenderer().render(stdlib_data), lambda: FastJSONRenderer().render(fast_data)),
+                "parse": (
+                    lambda: JSONParser().parse(io.BytesIO(stdlib_json)),
+                    lambda: FastJSONParser().parse(io.BytesIO(fast_json)),
+                ),
+            }
+            totals = [0.0, 0.0]
+            for stage, (slow, fast) in stages.items():
+                slow_time, fast_time = cpu_per_call(slow, number), cpu_per_call(fast, number)
+                totals[0] += slow_time
+                totals[1] += fast_time
+                self.stdout.write(self.format_row(name, stage, slow_time, fast_time))
+            self.stdout.write(self.format_row(name, "total", *totals))
+
+    def format_row(self, name, stage, slow_time, fast_time):
+        return (
+            f"{name:<14}{stage:<12}{slow_time * 1e6:11.1f} us{fast_time * 1e6:11.1f} us"
+            f"{slow_time / fast_time:9.1f}x"
+        )
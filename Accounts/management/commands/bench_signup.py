@@ -0,0 +1,99 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework import serializers
+from Accounts.serializers import UserProfileSerializer
+
+
+
+SEED_PREFIX = "+999"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large user table and time sign-up validation and insertion. "
+        "Run it against a scratch database (e.g. DB_NAME=/tmp/bench.sqlite3)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000, help="Number of users to seed.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--samples", type=int, default=500, help="Sign-ups to time.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the seeded users afterwards.")
+
+    def handle(self, *args, **options):
+        existing = User.objects.filter(username__startswith=SEED_PREFIX).count()
+        if existing < options["users"]:
+            self.seed(existing, options["users"], options["batch_size"])
+
+        # Hashing would dominate the timings; measure the database work only.
+        with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]):
+            self.time("validate", options["samples"], self.validate)
+            self.time("create", options["samples"], self.create)
+            self.time("create duplicate email", options["samples"], self.create_duplicate)
+
+        if options["cleanup"]:
+            User.objects.filter(username__startswith=SEED_PREFIX).delete()
+
+    def seed(self, start, total, batch_size):
+        self.stdout.write(f"Seeding users {start}..{total}")
+        started = time.perf_counter()
+        for offset in range(start, total, batch_size):
+            User.objects.bulk_create([
+                User(
+                    username=f"{SEED_PREFIX}{i:010d}",
+                    email=f"seed{i}@example.com",
+                    first_name="Seed",
+                    password="!"
+                )
+                for i in range(offset, min(offset + batch_size, total))
+            ])
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    def payload(self, i):
+        return {
+            "phone_number": f"+888{i:010d}",
+            "name": "Bench",
+            "email": f"bench{i}@example.com",
+            "password": "bench-password",
+        }
+
+    def validate(self, i):
+        serializer = UserProfileSerializer(data=self.payload(i))
+        serializer.is_valid()
+
+    def create(self, i):
+        try:
+            with transaction.atomic():
+                serializer = UserProfileSerializer(data=self.payload(i))
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_duplicate(self, i):
+        data = dict(self.payload(i), email=f"SEED{i}@example.com")
+        serializer = UserProfileSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save()
+        except serializers.ValidationError:
+            pass
+
+    def time(self, label, samples, fn):
+        timings = []
+        for i in range(samples):
+            started = time.perf_counter()
+            fn(i)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1000
+        p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+        self.stdout.write(f"{label:<24} p50={p50:.3f}ms p99={p99:.3f}ms n={samples}")
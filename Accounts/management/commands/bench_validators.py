@@ -0,0 +1,68 @@
+import re
+import timeit
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from Accounts import validators
+
+
+
+# The inline patterns the serializers and views used before Accounts.validators.
+INLINE_PATTERNS = {
+    "phone": r'^\+?\d{10,15}$',
+    "email": r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$',
+    "pan": r"^[A-Z]{5}[0-9]{4}[A-Z]{1}$",
+    "pincode": r'^\d{6}$',
+}
+
+SAMPLES = {
+    "phone": ["+919876543210", "9876543210", "098765 43210", "12345", "+1 (415) 555-0100"],
+    "email": ["user@example.com", "First.Last+tag@sub.example.co.in", "not-an-email"],
+    "pan": ["ABCDE1234F", "abcde1234f", "ABCDE12345"],
+    "pincode": ["560001", "5600", "56000A"],
+}
+
+VALIDATORS = {
+    "phone": validators.validate_phone_number,
+    "email": validators.validate_email,
+    "pan": validators.validate_pan_number,
+    "pincode": validators.validate_pincode,
+}
+
+
+def inline_validator(pattern):
+    """The old per-call style: match a pattern string and raise on failure."""
+    def validate(value):
+        if not re.match(pattern, value):
+            raise ValidationError("invalid")
+        return value
+    return validate
+
+
+def call_all(validator, values):
+    for value in values:
+        try:
+            validator(value)
+        except ValidationError:
+            pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark the shared validators against the inline re.match() calls they "
+        "replaced. Both raise ValidationError on invalid input; the phone validator also "
+        "normalizes to E.164."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=100_000, help="Passes over each sample list.")
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        for name, values in SAMPLES.items():
+            inline_validate = inline_validator(INLINE_PATTERNS[name])
+            inline = timeit.timeit(lambda: call_all(inline_validate, values), number=number)
+            shared = timeit.timeit(lambda: call_all(VALIDATORS[name], values), number=number)
+            calls = number * len(values)
+            self.stdout.write(
+                f"{name:<8} inline {calls / inline:12,.0f}/s   validators {calls / shared:12,.0f}/s"
+            )
@@ -0,0 +1,59 @@
+import csv
+import os
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from Accounts.pincodes import normalize_state, write_index
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the pincode index from the India Post pincode directory CSV "
+        "(columns pincode, statename and districtname, any case). Post offices "
+        "sharing a pincode resolve to their most common district and state."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Pincode directory CSV.")
+        parser.add_argument("--output", help="Defaults to PINCODE_INDEX_PATH.")
+        parser.add_argument("--encoding", default="utf-8")
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.PINCODE_INDEX_PATH
+        if not output:
+            raise CommandError("Set PINCODE_INDEX_PATH or pass --output.")
+
+        votes = defaultdict(Counter)
+        unknown_states = Counter()
+        skipped = 0
+        with open(options["path"], newline="", encoding=options["encoding"], errors="replace") as source:
+            reader = csv.DictReader(source)
+            columns = {name.lower().strip(): name for name in reader.fieldnames or []}
+            missing = {"pincode", "statename", "districtname"} - set(columns)
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            for row in reader:
+                pincode = row[columns["pincode"]].strip()
+                state = normalize_state(row[columns["statename"]])
+                city = " ".join(row[columns["districtname"]].split()).title()
+                if not (len(pincode) == 6 and pincode.isdigit()) or not city:
+                    skipped += 1
+                    continue
+                if state is None:
+                    unknown_states[row[columns["statename"]].strip()] += 1
+                    continue
+                votes[int(pincode)][(state, city)] += 1
+
+        entries = {pincode: counter.most_common(1)[0][0] for pincode, counter in votes.items()}
+        if not entries:
+            raise CommandError("No usable rows found.")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        write_index(output, entries)
+
+        for name, count in unknown_states.most_common():
+            self.stderr.write(f"Unknown state {name!r}: {count} rows skipped")
+        if skipped:
+            self.stderr.write(f"{skipped} rows with a malformed pincode or district skipped")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(entries)} pincodes to {output}"))
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from Accounts.imports import file_format, import_users
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV (phone_number,name,email[,password] header) or JSONL file, "
+        "creating User, UserProfile and Token rows in bulk. Existing phone numbers and emails "
+        "are skipped. Use - to read from stdin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Password hashing processes; 0 hashes in this process."
+        )
+        parser.add_argument("--verified", action="store_true", help="Mark imported phone numbers as verified.")
+        parser.add_argument("--errors", help="Write rejected rows to this JSON file.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or file_format(path)
+
+        def progress(result):
+            self.stdout.write(
+                f"{result.processed} rows: {result.created} created, {result.duplicates} duplicates, "
+                f"{result.invalid} invalid ({result.rows_per_second} rows/s)"
+            )
+
+        try:
+            stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+        except OSError as e:
+            raise CommandError(str(e))
+        with stream:
+            result = import_users(
+                stream,
+                format=format,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                verified=options["verified"],
+                progress=progress,
+            )
+
+        if options["errors"] and result.errors:
+            with open(options["errors"], "w") as output:
+                json.dump(result.errors, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} of {result.processed} rows at {result.rows_per_second} rows/s"
+        ))
@@ -0,0 +1,88 @@
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+from Accounts.models import KYC
+from Accounts.storage import kyc_image_storage
+
+
+
+IMAGE_FIELDS = ["user_image", "user_thumbnail"]
+
+
+class Command(BaseCommand):
+    help = "Move existing KYC images into content-addressed storage and remove the duplicates left behind."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+        parser.add_argument("--keep-originals", action="store_true", help="Do not delete the old files.")
+        parser.add_argument(
+            "--prune-orphans", action="store_true",
+            help="Also delete files in the old flat upload directories that no KYC record references."
+        )
+
+    def handle(self, *args, **options):
+        storage = kyc_image_storage()
+        # The old files were written by the default storage under the same root.
+        legacy_storage = storages["default"]
+        dry_run = options["dry_run"]
+
+        migrated = 0
+        missing = 0
+        old_names = set()
+        new_names = set()
+
+        queryset = KYC.objects.order_by("pk").only("pk", *IMAGE_FIELDS)
+        for kyc in queryset.iterator(chunk_size=options["batch_size"]):
+            updates = {}
+            for field in IMAGE_FIELDS:
+                name = getattr(kyc, field).name
+                if not name or storage.is_hashed_name(name):
+                    continue
+                if not legacy_storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"KYC {kyc.pk}: {name} is missing, skipped")
+                    continue
+
+                if dry_run:
+                    with legacy_storage.open(name) as source:
+                        new_name = storage.hashed_name(name, source)
+                else:
+                    with legacy_storage.open(name) as source:
+                        new_name = storage.save(name, source)
+                    updates[field] = new_name
+                old_names.add(name)
+                new_names.add(new_name)
+                self.stdout.write(f"KYC {kyc.pk}: {name} -> {new_name}")
+
+            if updates:
+                KYC.objects.filter(pk=kyc.pk).update(**updates)
+                migrated += 1
+
+        removed = 0
+        if not dry_run and not options["keep_originals"]:
+            for name in old_names - new_names:
+                legacy_storage.delete(name)
+                removed += 1
+
+        if options["prune_orphans"] and not dry_run:
+            removed += self.prune_orphans(legacy_storage)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Migrated {migrated} KYC record(s) onto {len(new_names)} stored file(s); "
+            f"removed {removed} old file(s), {missing} missing."
+        ))
+
+    def prune_orphans(self, legacy_storage):
+        removed = 0
+        for field in IMAGE_FIELDS:
+            directory = KYC._meta.get_field(field).upload_to.rstrip("/")
+            if not legacy_storage.exists(directory):
+                continue
+            _, files = legacy_storage.listdir(directory)
+            for filename in files:
+                name = f"{directory}/{filename}"
+                if not KYC.objects.filter(**{field: name}).exists():
+                    legacy_storage.delete(name)
+                    removed += 1
+                    self.stdout.write(f"Removed orphan {name}")
+        return removed
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.core.management.base import BaseCommand
+from Accounts.decentro import get_client
+from Accounts.jobs import RateLimiter, claim_jobs, requeue_stale_jobs, run_fetch_job
+
+
+
+class Command(BaseCommand):
+    help = "Process queued bank-details fetch jobs with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Number of worker threads.")
+        parser.add_argument("--rate", type=float, default=0, help="Maximum Decentro calls per second (0 = unlimited).")
+        parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before a job is marked failed.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=300, help="Requeue jobs running for longer than this many seconds.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        limiter = RateLimiter(options["rate"])
+        max_attempts = options["max_attempts"]
+
+        def work(pk):
+            limiter.wait()
+            return run_fetch_job(pk, max_attempts=max_attempts)
+
+        processed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                requeue_stale_jobs(options["stale_after"])
+                if get_client().breaker.is_open():
+                    # Leave the queue alone until Decentro gets a probe call.
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                claimed = claim_jobs(workers * 2)
+                if not claimed:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                done, _ = wait([executor.submit(work, pk) for pk in claimed])
+                for future in done:
+                    try:
+                        job = future.result()
+                    except Exception as e:
+                        self.stderr.write(f"Job crashed: {e}")
+                        continue
+                    processed += 1
+                    self.stdout.write(f"{job.reference_id}: {job.status}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
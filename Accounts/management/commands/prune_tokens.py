@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from Accounts.models import AuthToken
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired API tokens, a batch at a time so no transaction holds locks on the "
+        "token table for long. Meant to run on a schedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Tokens deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # Uses the expires_at index; each delete is its own short transaction.
+            keys = list(
+                AuthToken.objects.filter(expires_at__lte=now).values_list("key", flat=True)[:options["batch_size"]]
+            )
+            if not keys:
+                break
+            count, _ = AuthToken.objects.filter(key__in=keys).delete()
+            deleted += count
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired token(s)."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from Accounts.decentro_stub import DecentroStubServer
+
+
+
+class Command(BaseCommand):
+    help = "Run a local stub of the Decentro mobile_to_vpa API for development and testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--delay", type=float, default=0, help="Seconds to wait before each response.")
+        parser.add_argument("--failure-rate", type=float, default=0, help="Fraction of requests answered with --error-status.")
+        parser.add_argument("--error-status", type=int, default=503)
+        parser.add_argument("--slow-rate", type=float, default=0, help="Fraction of requests delayed by --slow-delay.")
+        parser.add_argument("--slow-delay", type=float, default=0, help="Extra seconds taken by slow requests.")
+        parser.add_argument("--seed", type=int, help="Seed for choosing which requests get a fault.")
+
+    def handle(self, *args, **options):
+        server = DecentroStubServer(
+            host=options["host"], port=options["port"], delay=options["delay"],
+            failure_rate=options["failure_rate"], error_status=options["error_status"],
+            slow_rate=options["slow_rate"], slow_delay=options["slow_delay"], seed=options["seed"]
+        )
+        self.stdout.write(f"Decentro stub listening on {server.url}")
+        self.stdout.write("Set DECENTRO_BASE_URL to this URL to use it.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,160 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+SIZE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def format_labels(labels, bound):
+    return ",".join(labels + [f'le="{bound}"'])
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values, Prometheus style."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{{{format_labels(labels, bound)}}} {bucket_count}")
+            lines.append(f"{self.name}_bucket{{{format_labels(labels, '+Inf')}}} {count}")
+            label_text = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonically increasing count keyed by label values, Prometheus style."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labelnames, key))
+            label_text = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{label_text} {value}")
+        return lines
+
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_DURATION = register(Histogram(
+    "http_request_duration_seconds", "Wall time spent handling a request.", ["view", "method", "status"]
+))
+REQUEST_DB_QUERIES = register(Histogram(
+    "http_request_db_queries", "Database queries issued per request.", ["view"], buckets=COUNT_BUCKETS
+))
+REQUEST_DB_DURATION = register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries per request.", ["view"]
+))
+REQUEST_EXTERNAL_DURATION = register(Histogram(
+    "http_request_external_duration_seconds", "Time spent in outbound HTTP calls per request.", ["view"]
+))
+RESPONSE_SIZE = register(Histogram(
+    "http_response_size_bytes", "Response body size.", ["view"], buckets=SIZE_BUCKETS
+))
+EXTERNAL_CALL_DURATION = register(Histogram(
+    "external_call_duration_seconds", "Duration of outbound HTTP calls.", ["service"]
+))
+EXTERNAL_CALL_RETRIES = register(Counter(
+    "external_call_retries_total", "Outbound calls retried or hedged after a slow or failed attempt.", ["service", "reason"]
+))
+CIRCUIT_TRANSITIONS = register(Counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes seen by this process.", ["service", "from_state", "to_state"]
+))
+CIRCUIT_REJECTED = register(Counter(
+    "circuit_breaker_rejected_total", "Outbound calls refused without being sent because the circuit was open.", ["service"]
+))
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_time", "external_time")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.external_time = 0.0
+
+
+current_request_stats = ContextVar("current_request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper that charges query time to the current request."""
+    stats = current_request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def track_external(service):
+    """Time an outbound call, both globally and against the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        EXTERNAL_CALL_DURATION.observe(elapsed, service=service)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.external_time += elapsed
@@ -0,0 +1,98 @@
+import cProfile
+import logging
+import os
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .metrics import (
+    REQUEST_DB_DURATION, REQUEST_DB_QUERIES, REQUEST_DURATION, REQUEST_EXTERNAL_DURATION,
+    RESPONSE_SIZE, RequestStats, current_request_stats
+)
+
+
+
+logger = logging.getLogger("Accounts.requests")
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, database query count and time, outbound HTTP time and
+    response size for every request, labelled by URL name, and expose them as
+    histograms on /metrics. A PROFILING_SAMPLE_RATE fraction of synchronous
+    requests is also run under cProfile and dumped to PROFILING_DUMP_DIR.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+                response = self.profile(request)
+            else:
+                response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            os.makedirs(settings.PROFILING_DUMP_DIR, exist_ok=True)
+            name = f"{self.view_name(request)}-{time.time_ns()}.prof"
+            profiler.dump_stats(os.path.join(settings.PROFILING_DUMP_DIR, name))
+
+    def view_name(self, request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unmatched"
+        return match.view_name or match._func_path
+
+    def record(self, request, response, stats, elapsed):
+        view = self.view_name(request)
+        size = len(response.content) if not response.streaming else 0
+
+        REQUEST_DURATION.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        REQUEST_DB_QUERIES.observe(stats.db_queries, view=view)
+        REQUEST_DB_DURATION.observe(stats.db_time, view=view)
+        REQUEST_EXTERNAL_DURATION.observe(stats.external_time, view=view)
+        RESPONSE_SIZE.observe(size, view=view)
+
+        logger.info("request", extra={
+            "view": view,
+            "method": request.method,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 3),
+            "db_queries": stats.db_queries,
+            "db_ms": round(stats.db_time * 1000, 3),
+            "external_ms": round(stats.external_time * 1000, 3),
+            "response_bytes": size,
+        })
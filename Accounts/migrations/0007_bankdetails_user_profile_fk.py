@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Accounts", "0006_alter_address_state_bankdetails"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bankdetails",
+            name="user_profile",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="bank_details",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
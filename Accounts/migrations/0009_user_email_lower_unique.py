@@ -0,0 +1,66 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+# Conflicting accounts listed in the error, per email.
+MAX_REPORTED = 50
+
+
+def check_case_duplicate_emails(apps, schema_editor):
+    """
+    Stop before lowercasing when accounts share an email that differs only in
+    case (e.g. Foo@x.com and foo@x.com): the unique index below cannot be
+    built over them. Which account keeps the address is not something a
+    migration can decide, so they are listed for merging by hand.
+    """
+    User = apps.get_model("auth", "User")
+    emails = list(
+        User.objects.exclude(email="")
+        .annotate(email_lower=Lower("email"))
+        .values("email_lower")
+        .annotate(accounts=Count("pk"))
+        .filter(accounts__gt=1)
+        .order_by("email_lower")
+        .values_list("email_lower", flat=True)[:MAX_REPORTED]
+    )
+    if not emails:
+        return
+
+    conflicts = (
+        User.objects.annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=emails)
+        .order_by("email_lower", "pk")
+        .values_list("pk", "username", "email")
+    )
+    rows = "\n".join(f"  user {pk} ({username}): {email}" for pk, username, email in conflicts)
+    raise RuntimeError(
+        "Cannot add a case-insensitive unique index on auth_user.email: these "
+        "accounts share an email that differs only in case. Merge them or "
+        "change their emails, then run the migration again.\n" + rows
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("Accounts", "0008_bankdetailsfetchjob"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql="UPDATE auth_user SET email = LOWER(email) WHERE email <> LOWER(email);",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Case-insensitive uniqueness for sign-up emails. Blank emails are
+        # excluded so accounts created without one (e.g. via createsuperuser)
+        # do not collide.
+        migrations.RunSQL(
+            sql=(
+                "CREATE UNIQUE INDEX accounts_user_email_lower_uniq "
+                "ON auth_user (LOWER(email)) WHERE email <> '';"
+            ),
+            reverse_sql="DROP INDEX accounts_user_email_lower_uniq;",
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:00
+
+import Accounts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Accounts", "0010_kyc_thumbnail_kycimageupload"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="kyc",
+            name="user_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=Accounts.storage.kyc_image_storage,
+                upload_to="user_images/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="kyc",
+            name="user_thumbnail",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=Accounts.storage.kyc_image_storage,
+                upload_to="user_thumbnails/",
+            ),
+        ),
+    ]
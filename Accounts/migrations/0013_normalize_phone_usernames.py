@@ -0,0 +1,67 @@
+import re
+from django.conf import settings
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+PHONE_SEPARATORS = re.compile(r"[\s\-.()]")
+PHONE_REGEX = re.compile(r"^\+?\d{10,15}$")
+
+
+# A frozen copy of Accounts.validators.normalize_phone_number, so later
+# changes to the validator do not change what this migration did.
+def normalize_phone_number(value, country_code):
+    number = PHONE_SEPARATORS.sub("", value)
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    if not PHONE_REGEX.match(number):
+        return None
+    if number.startswith("+"):
+        return number
+    if len(number) == 11 and number.startswith("0"):
+        number = number[1:]
+    if len(number) == 10:
+        return f"+{country_code}{number}"
+    return f"+{number}"
+
+
+def normalize_usernames(apps, schema_editor):
+    """
+    Rewrite phone-number usernames to E.164. A user is left alone when the
+    normalized number already belongs to another account; those duplicates
+    need merging by hand.
+    """
+    User = apps.get_model("auth", "User")
+    country_code = getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "91")
+
+    renames = {}
+    for pk, username in User.objects.filter(username__regex=r"^[0-9+(]").values_list("pk", "username").iterator():
+        number = normalize_phone_number(username, country_code)
+        if number is not None and number != username:
+            renames[pk] = number
+
+    targets = list(set(renames.values()))
+    taken = set()
+    for start in range(0, len(targets), BATCH_SIZE):
+        taken.update(
+            User.objects.filter(username__in=targets[start:start + BATCH_SIZE]).values_list("username", flat=True)
+        )
+
+    updates = []
+    for pk, number in sorted(renames.items()):
+        if number in taken:
+            continue
+        taken.add(number)
+        updates.append(User(pk=pk, username=number))
+    User.objects.bulk_update(updates, ["username"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("Accounts", "0012_address_user_created_idx"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_usernames, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+
+def copy_tokens(apps, schema_editor):
+    """
+    Carry every DRF token over with its key, so signed-in clients keep
+    working until the new expiry.
+    """
+    Token = apps.get_model("authtoken", "Token")
+    AuthToken = apps.get_model("Accounts", "AuthToken")
+    expires_at = timezone.now() + timedelta(seconds=getattr(settings, "AUTH_TOKEN_TTL", 30 * 86400))
+
+    batch = []
+    for key, user_id in Token.objects.values_list("key", "user_id").iterator():
+        batch.append(AuthToken(key=key, user_id=user_id, expires_at=expires_at))
+        if len(batch) == BATCH_SIZE:
+            AuthToken.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    AuthToken.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("Accounts", "0014_authtoken"),
+        ("authtoken", "0003_tokenproxy"),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """
+    Keep only the newest pending or running fetch job per user, so the
+    one-active-job constraint can be added. The rest are marked failed.
+    """
+    BankDetailsFetchJob = apps.get_model("Accounts", "BankDetailsFetchJob")
+    active = BankDetailsFetchJob.objects.filter(status__in=["pending", "running"])
+    seen = set()
+    duplicates = []
+    for pk, user_id in active.order_by("user_id", "-created_at", "-pk").values_list("pk", "user_id").iterator():
+        if user_id in seen:
+            duplicates.append(pk)
+        seen.add(user_id)
+    BankDetailsFetchJob.objects.filter(pk__in=duplicates).update(
+        status="failed", error="Superseded by a newer fetch job."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Accounts", "0015_copy_drf_tokens"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bankdetails",
+            index=models.Index(
+                fields=["user_profile", "updated_at"],
+                name="bankdetails_user_updated_idx",
+            ),
+        ),
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="bankdetailsfetchjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "running"])),
+                fields=("user",),
+                name="fetchjob_one_active_per_user",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def split_tpap(apps, schema_editor):
+    """sync_accounts used to store tpap as one comma-separated string; store the list instead."""
+    BankDetails = apps.get_model("Accounts", "BankDetails")
+    rows = []
+    for row in BankDetails.objects.only("pk", "tpap").iterator():
+        if isinstance(row.tpap, str):
+            row.tpap = row.tpap.split(", ") if row.tpap else []
+            rows.append(row)
+    BankDetails.objects.bulk_update(rows, ["tpap"], batch_size=1000)
+
+
+def join_tpap(apps, schema_editor):
+    BankDetails = apps.get_model("Accounts", "BankDetails")
+    rows = []
+    for row in BankDetails.objects.only("pk", "tpap").iterator():
+        if isinstance(row.tpap, list):
+            row.tpap = ", ".join(row.tpap)
+            rows.append(row)
+    BankDetails.objects.bulk_update(rows, ["tpap"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Accounts", "0016_bank_details_freshness"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bankdetails",
+            name="vpa",
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name="bankdetails",
+            constraint=models.UniqueConstraint(
+                fields=("user_profile", "vpa"), name="bankdetails_user_vpa_uniq"
+            ),
+        ),
+        migrations.RunPython(split_tpap, join_tpap),
+    ]
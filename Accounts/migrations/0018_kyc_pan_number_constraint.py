@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Accounts", "0017_bank_details_per_user_vpa"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="kyc",
+            name="pan_number",
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name="kyc",
+            constraint=models.UniqueConstraint(
+                fields=("pan_number",), name="kyc_pan_number_uniq"
+            ),
+        ),
+    ]
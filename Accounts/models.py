@@ -1,5 +1,11 @@
-from django.db import models
+import secrets
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .storage import kyc_image_storage
 
 
 
@@ -14,10 +20,44 @@ class UserProfile(models.Model):
         return self.user.username
     
 
+def generate_token_key():
+    return secrets.token_hex(20)
+
+
+def token_expiry():
+    return timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+
+class AuthToken(models.Model):
+    """
+    API token that stops working at `expires_at`. A user may hold several,
+    one per login, up to AUTH_TOKEN_MAX_PER_USER; expired rows are deleted
+    when the user is issued a new token and by `manage.py prune_tokens`.
+    """
+    key = models.CharField(max_length=40, primary_key=True, default=generate_token_key)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=token_expiry, db_index=True)
+
+    def __str__(self):
+        return f"Token for {self.user_id} until {self.expires_at}"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
 class KYC(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="kyc_details")
-    pan_number = models.CharField(max_length=10, unique=True)
-    user_image = models.ImageField(upload_to='user_images/', null=True, blank=True)
+    pan_number = models.CharField(max_length=10)
+    user_image = models.ImageField(upload_to='user_images/', storage=kyc_image_storage, null=True, blank=True)
+    user_thumbnail = models.ImageField(upload_to='user_thumbnails/', storage=kyc_image_storage, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Named so pan.is_pan_violation can recognise it in an IntegrityError.
+            models.UniqueConstraint(fields=['pan_number'], name='kyc_pan_number_uniq'),
+        ]
     
     def __str__(self):
         return f"KYC details for {self.user.username}"
@@ -25,6 +65,22 @@ class KYC(models.Model):
     def get_document_name(self):
         return f"kyc_{self.user.username}.jpg"
 
+    def get_thumbnail_name(self):
+        return f"kyc_{self.user.username}_thumb.jpg"
+
+
+class KYCImageUpload(models.Model):
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kyc_image_uploads')
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.upload_id} - {self.received}/{self.total_size}"
+
 
 STATE_CHOICES = [
     ('andhra pradesh', 'Andhra Pradesh'),
@@ -82,18 +138,102 @@ class Address(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['userprofile', 'created_at'], name='address_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.house_flat_apartment}-{self.address_type}"
 
 
+class BankDetailsManager(models.Manager):
+    def sync_accounts(self, user, accounts):
+        """
+        Reconcile the VPA accounts returned by Decentro with the rows stored
+        for `user` in a single transaction: accounts no longer returned are
+        removed and the rest are upserted with one INSERT ... ON CONFLICT, so
+        the query count does not grow with the number of accounts. The
+        conflict target is (user_profile, vpa), so the upsert only ever
+        touches `user`'s own rows.
+        """
+        rows = {}
+        for account_info in accounts:
+            vpa = account_info.get("vpa", "")
+            rows[vpa] = self.model(
+                user_profile=user,
+                name=account_info.get("name", ""),
+                vpa=vpa,
+                merchant_ifsc=account_info.get("merchantIfsc", ""),
+                tpap=list(account_info.get("tpap", []))
+            )
+
+        with transaction.atomic():
+            self.filter(user_profile=user).exclude(vpa__in=rows.keys()).delete()
+            if rows:
+                self.bulk_create(
+                    rows.values(),
+                    update_conflicts=True,
+                    unique_fields=["user_profile", "vpa"],
+                    update_fields=["name", "merchant_ifsc", "tpap", "updated_at"],
+                )
+        return list(rows.values())
+
+
 class BankDetails(models.Model):
-    user_profile = models.OneToOneField(User, on_delete=models.CASCADE, related_name='bank_details')
+    user_profile = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bank_details')
     name = models.CharField(max_length=255) 
-    vpa = models.CharField(max_length=255, unique=True)  
+    vpa = models.CharField(max_length=255)
     merchant_ifsc = models.CharField(max_length=20) 
     tpap = models.JSONField() 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BankDetailsManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_profile', 'updated_at'], name='bankdetails_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user_profile', 'vpa'], name='bankdetails_user_vpa_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.vpa}"
+
+class BankDetailsFetchJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    reference_id = models.CharField(max_length=36, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bank_details_fetch_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='fetchjob_status_created_idx'),
+        ]
+        constraints = [
+            # At most one queued or running fetch per user.
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(status__in=['pending', 'running']), name='fetchjob_one_active_per_user'
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.name} - {self.vpa}"
\ No newline at end of file
+        return f"{self.reference_id} - {self.status}"
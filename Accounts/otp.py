@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare, get_random_string, salted_hmac
+from .sms import get_sms_sender
+
+
+
+OTP_MESSAGE = "{code} is your BitFiat verification code. It expires in {minutes} minutes."
+OTP_INVALID_MESSAGE = "Invalid OTP."
+OTP_EXPIRED_MESSAGE = "OTP has expired. Request a new one."
+OTP_LOCKED_MESSAGE = "Too many incorrect attempts. Request a new OTP."
+
+# Outcomes of verify_otp.
+VERIFIED = "verified"
+INVALID = "invalid"
+EXPIRED = "expired"
+LOCKED = "locked"
+
+RESULT_MESSAGES = {
+    INVALID: OTP_INVALID_MESSAGE,
+    EXPIRED: OTP_EXPIRED_MESSAGE,
+    LOCKED: OTP_LOCKED_MESSAGE,
+}
+
+
+def otp_store():
+    return caches[settings.OTP["CACHE_ALIAS"]]
+
+
+def otp_cache_key(user_id):
+    return f"otp:{user_id}"
+
+
+def otp_attempts_key(user_id):
+    return f"otp:attempts:{user_id}"
+
+
+def otp_resend_key(user_id):
+    return f"otp:resend:{user_id}"
+
+
+def hash_otp(user_id, code):
+    # Keyed with SECRET_KEY, so a dump of the cache does not reveal codes.
+    return salted_hmac("Accounts.otp", f"{user_id}:{code}", algorithm="sha256").hexdigest()
+
+
+def generate_otp():
+    return get_random_string(settings.OTP["LENGTH"], allowed_chars="0123456789")
+
+
+def store_otp(user_id, code):
+    """
+    Replace the user's pending code with `code`. The hash and its attempt
+    counter expire together after OTP["TIMEOUT"] seconds, so nothing needs
+    cleaning up.
+    """
+    otp_store().set_many(
+        {otp_cache_key(user_id): hash_otp(user_id, code), otp_attempts_key(user_id): 0},
+        settings.OTP["TIMEOUT"],
+    )
+
+
+def issue_otp(user_id, phone_number):
+    """
+    Generate a code for the user and text it to `phone_number`. Returns None
+    once sent, or the seconds to wait when the last code was sent less than
+    OTP["RESEND_INTERVAL"] seconds ago. Raises SMSError when the message
+    could not be sent.
+    """
+    interval = settings.OTP["RESEND_INTERVAL"]
+    if interval and not otp_store().add(otp_resend_key(user_id), True, interval):
+        return interval
+
+    code = generate_otp()
+    store_otp(user_id, code)
+    get_sms_sender().send(phone_number, OTP_MESSAGE.format(code=code, minutes=settings.OTP["TIMEOUT"] // 60))
+    return None
+
+
+def verify_otp(user_id, code):
+    """
+    Check `code` against the user's pending code and return VERIFIED,
+    INVALID, EXPIRED or LOCKED. Every check counts as an attempt; after
+    OTP["MAX_ATTEMPTS"] wrong codes the pending code is discarded. A
+    verified code is discarded too, so it works once.
+    """
+    store = otp_store()
+    key = otp_cache_key(user_id)
+    digest = store.get(key)
+    if digest is None:
+        return EXPIRED
+
+    attempts = _count_attempt(store, user_id)
+    if attempts > settings.OTP["MAX_ATTEMPTS"]:
+        store.delete(key)
+        return LOCKED
+    if not constant_time_compare(digest, hash_otp(user_id, code)):
+        if attempts == settings.OTP["MAX_ATTEMPTS"]:
+            store.delete(key)
+            return LOCKED
+        return INVALID
+
+    store.delete_many([key, otp_attempts_key(user_id), otp_resend_key(user_id)])
+    return VERIFIED
+
+
+def _count_attempt(store, user_id):
+    # incr is atomic on the caches OTP may use (see checks.check_otp_settings),
+    # so concurrent guesses cannot share an attempt.
+    try:
+        return store.incr(otp_attempts_key(user_id))
+    except ValueError:
+        store.add(otp_attempts_key(user_id), 0, settings.OTP["TIMEOUT"])
+        return store.incr(otp_attempts_key(user_id))
+
+
+async def averify_otp(user_id, code):
+    store = otp_store()
+    key = otp_cache_key(user_id)
+    digest = await store.aget(key)
+    if digest is None:
+        return EXPIRED
+
+    attempts = await _acount_attempt(store, user_id)
+    if attempts > settings.OTP["MAX_ATTEMPTS"]:
+        await store.adelete(key)
+        return LOCKED
+    if not constant_time_compare(digest, hash_otp(user_id, code)):
+        if attempts == settings.OTP["MAX_ATTEMPTS"]:
+            await store.adelete(key)
+            return LOCKED
+        return INVALID
+
+    await store.adelete_many([key, otp_attempts_key(user_id), otp_resend_key(user_id)])
+    return VERIFIED
+
+
+async def _acount_attempt(store, user_id):
+    try:
+        return await store.aincr(otp_attempts_key(user_id))
+    except ValueError:
+        await store.aadd(otp_attempts_key(user_id), 0, settings.OTP["TIMEOUT"])
+        return await store.aincr(otp_attempts_key(user_id))
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import KYC
+
+
+
+PAN_IN_USE_MESSAGE = "This PAN Number is already in use."
+PAN_CONSTRAINT = "kyc_pan_number_uniq"
+
+
+def pan_cache_key(pan_number):
+    return f"pan:taken:{pan_number}"
+
+
+def is_pan_taken(pan_number):
+    """
+    True when `pan_number` is known to belong to a KYC record. A miss proves
+    nothing; the unique index on KYC.pan_number has the final say.
+    """
+    return cache.get(pan_cache_key(pan_number)) is not None
+
+
+def mark_pan_taken(pan_number):
+    cache.set(pan_cache_key(pan_number), True, settings.KYC_PAN_CACHE_TIMEOUT)
+
+
+def forget_pan(pan_number):
+    cache.delete(pan_cache_key(pan_number))
+
+
+def is_pan_violation(error):
+    """
+    Whether an IntegrityError from inserting a KYC row came from the
+    pan_number constraint rather than the one-KYC-per-user constraint.
+    PostgreSQL names the violated constraint in the driver error's diag and
+    MySQL in its message; SQLite only names the columns, as table.column.
+    """
+    diag = getattr(error.__cause__, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint is not None:
+        return constraint == PAN_CONSTRAINT
+    message = str(error)
+    # SQLite: "UNIQUE constraint failed: Accounts_kyc.pan_number"
+    columns = message.rpartition(": ")[2].split(", ")
+    return PAN_CONSTRAINT in message or columns == [f"{KYC._meta.db_table}.pan_number"]
+
+
+async def ais_pan_taken(pan_number):
+    return await cache.aget(pan_cache_key(pan_number)) is not None
+
+
+async def amark_pan_taken(pan_number):
+    await cache.aset(pan_cache_key(pan_number), True, settings.KYC_PAN_CACHE_TIMEOUT)
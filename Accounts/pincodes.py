@@ -0,0 +1,141 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .models import STATE_CHOICES
+
+
+
+MAGIC = b"PINIDX01"
+# magic, row count, city name count, city table size in bytes
+HEADER = struct.Struct("<8sIII")
+
+STATES = [value for value, label in STATE_CHOICES]
+STATE_INDEX = {value: i for i, value in enumerate(STATES)}
+
+# Spellings used by the India Post pincode directory that differ from
+# STATE_CHOICES, after lower-casing.
+STATE_ALIASES = {
+    "jammu and kashmir": "jammu & kashmir",
+    "chattisgarh": "chhattisgarh",
+    "orissa": "odisha",
+    "pondicherry": "puducherry",
+    "uttaranchal": "uttarakhand",
+    "andaman & nicobar islands": "andaman and nicobar islands",
+    "dadra & nagar haveli": "dadra and nagar haveli and daman and diu",
+    "dadra and nagar haveli": "dadra and nagar haveli and daman and diu",
+    "daman & diu": "dadra and nagar haveli and daman and diu",
+    "daman and diu": "dadra and nagar haveli and daman and diu",
+    "the dadra and nagar haveli and daman and diu": "dadra and nagar haveli and daman and diu",
+}
+
+
+def normalize_state(name):
+    """Map a dataset state name to its STATE_CHOICES value, or None."""
+    name = " ".join(name.lower().split())
+    name = STATE_ALIASES.get(name, name)
+    return name if name in STATE_INDEX else None
+
+
+def write_index(path, entries):
+    """
+    Write {pincode: (state, city)} as a compact binary index:
+
+        header | pincodes (uint32, sorted) | state ids (uint8) | city ids (uint16)
+               | city names (UTF-8, newline separated)
+
+    Written to a temporary file and renamed, so readers never map a partial
+    index.
+    """
+    cities = sorted({city for state, city in entries.values()})
+    if len(cities) > 0xFFFF:
+        raise ValueError("Too many distinct city names for a 16-bit city id.")
+    city_ids = {city: i for i, city in enumerate(cities)}
+    pincodes = sorted(entries)
+
+    codes = array("I", pincodes)
+    states = array("B", (STATE_INDEX[entries[pincode][0]] for pincode in pincodes))
+    city_refs = array("H", (city_ids[entries[pincode][1]] for pincode in pincodes))
+    city_table = "\n".join(cities).encode()
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, len(pincodes), len(cities), len(city_table)))
+        codes.tofile(output)
+        states.tofile(output)
+        city_refs.tofile(output)
+        output.write(city_table)
+    os.replace(temp_path, path)
+
+
+class PincodeIndex:
+    """
+    Read-only view of an index written by `write_index`. The file is
+    memory-mapped, so the pincode column is shared between processes and
+    paged in by the OS; lookups are a binary search over it. Only the city
+    name table is decoded into Python strings.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, city_count, city_table_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a pincode index.")
+
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        self._pincodes = view[offset:offset + 4 * count].cast("I")
+        offset += 4 * count
+        self._states = view[offset:offset + count]
+        offset += count
+        self._cities = view[offset:offset + 2 * count].cast("H")
+        offset += 2 * count
+        table = bytes(view[offset:offset + city_table_size]).decode()
+        self.city_names = table.split("\n") if city_count else []
+
+    def __len__(self):
+        return len(self._pincodes)
+
+    def lookup(self, pincode):
+        """Return (state, city) for a six-digit pincode string, or None."""
+        try:
+            code = int(pincode)
+        except (TypeError, ValueError):
+            return None
+        i = bisect_left(self._pincodes, code)
+        if i == len(self._pincodes) or self._pincodes[i] != code:
+            return None
+        return STATES[self._states[i]], self.city_names[self._cities[i]]
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+def get_pincode_index():
+    """
+    The index at PINCODE_INDEX_PATH, loaded on first use. Returns None when
+    no index has been built, in which case only the pincode format is checked.
+    """
+    global _index, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                path = settings.PINCODE_INDEX_PATH
+                _index = PincodeIndex(path) if path and os.path.exists(path) else None
+                _index_loaded = True
+    return _index
+
+
+@receiver(setting_changed)
+def reset_pincode_index(setting, **kwargs):
+    global _index, _index_loaded
+    if setting == "PINCODE_INDEX_PATH":
+        _index = None
+        _index_loaded = False
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import uuid
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+
+def me_version_key(user_id):
+    return f"me:version:{user_id}"
+
+
+def me_cache_key(user_id, version):
+    return f"me:{user_id}:{version}"
+
+
+def image_url(field):
+    return field.url if field else None
+
+
+def build_me_payload(user_id):
+    """
+    Everything the app shows about a user, in three queries: the user with
+    profile and KYC joined, then addresses and bank details prefetched.
+    """
+    user = (
+        User.objects
+        .select_related('userprofile', 'kyc_details')
+        .prefetch_related('addresses', 'bank_details')
+        .get(pk=user_id)
+    )
+    profile = getattr(user, 'userprofile', None)
+    kyc = getattr(user, 'kyc_details', None)
+
+    return {
+        "user_profile": {
+            "phone_number": user.username,
+            "name": user.first_name,
+            "email": user.email,
+        },
+        "is_verified": profile.is_verified if profile is not None else False,
+        "kyc": {
+            "pan_number": kyc.pan_number,
+            "user_image": image_url(kyc.user_image),
+            "user_thumbnail": image_url(kyc.user_thumbnail),
+        } if kyc is not None else None,
+        "addresses": [
+            {
+                "id": address.pk,
+                "house_flat_apartment": address.house_flat_apartment,
+                "road_street": address.road_street,
+                "landmark": address.landmark,
+                "city": address.city,
+                "pincode": address.pincode,
+                "state": address.state,
+                "address_type": address.address_type,
+                "created_at": address.created_at,
+            }
+            for address in sorted(user.addresses.all(), key=lambda address: (address.created_at, address.pk), reverse=True)
+        ],
+        "bank_details": [
+            {
+                "name": account.name,
+                "vpa": account.vpa,
+                "merchant_ifsc": account.merchant_ifsc,
+                "tpap": account.tpap,
+                "updated_at": account.updated_at,
+            }
+            for account in sorted(user.bank_details.all(), key=lambda account: account.vpa)
+        ],
+    }
+
+
+def get_me(user_id):
+    """
+    Return (etag, body) for the user's aggregate, where body is the encoded
+    JSON. Entries are stored under the user's current version, read before
+    the rows are, so a payload built from rows that changed meanwhile lands
+    under a version nobody reads any more.
+    """
+    version_key = me_version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, settings.ME_CACHE_TIMEOUT):
+            version = cache.get(version_key, version)
+
+    key = me_cache_key(user_id, version)
+    entry = cache.get(key)
+    if entry is None:
+        body = json.dumps(build_me_payload(user_id), cls=DjangoJSONEncoder, sort_keys=True).encode()
+        entry = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        cache.set(key, entry, settings.ME_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_me(user_id):
+    """
+    Move the user to a new version once the current transaction commits, so
+    a rebuild cannot read the rows before the change is visible.
+    """
+    transaction.on_commit(
+        lambda: cache.set(me_version_key(user_id), uuid.uuid4().hex, settings.ME_CACHE_TIMEOUT)
+    )
@@ -0,0 +1,65 @@
+from django.http import HttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. Datetimes and types
+    orjson does not know (Decimal, lazy translation strings, querysets) go
+    through DRF's encoder, and U+2028 and U+2029 are escaped as DRF does,
+    so the output matches the stdlib renderer's in compact mode with one
+    exception: NaN and infinite numbers are written as null where DRF
+    raises ValueError. No field this API serves can hold one, and finding
+    them would mean walking every response.
+    Without orjson, when a client asks for indented output, or with
+    UNICODE_JSON or STRICT_JSON turned off, this is DRF's JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.strict
+            or self.get_indent(accepted_media_type or "", renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Line and paragraph separators are valid JSON but not valid JavaScript.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class JSONResponse(HttpResponse):
+    """
+    HttpResponse rendered with FastJSONRenderer, for the async views, so their
+    bodies are byte for byte those of the DRF views they mirror.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(FastJSONRenderer().render(data), **kwargs)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson when it is installed."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
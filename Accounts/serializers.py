@@ -1,9 +1,20 @@
-import re
 from rest_framework import serializers
-from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.contrib.auth.models import User
-from .models import UserProfile, KYC, Address, BankDetails
+from .models import UserProfile, KYC, KYCImageUpload, STATE_CHOICES, Address, BankDetails
+from .pincodes import get_pincode_index
+from .uploads import store_kyc_image
+from .verification import invalidate_verification
+from .profile_cache import image_url, invalidate_me
+from .validators import validate_email, validate_pan_number, validate_phone_number, validate_pincode
+from .pan import PAN_IN_USE_MESSAGE, is_pan_taken, is_pan_violation, mark_pan_taken
+from .otp import OTP_INVALID_MESSAGE, RESULT_MESSAGES, VERIFIED, verify_otp
+
+
+EMAIL_UNIQUE_INDEX = 'accounts_user_email_lower_uniq'
 
 
 
@@ -14,25 +25,23 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['phone_number', 'name', 'email', 'password']
+        extra_kwargs = {'password': {'write_only': True}}
 
+    # Phone numbers are stored in E.164 form, so "9876543210" and
+    # "+919876543210" are the same account.
     def validate_phone_number(self, value):
-        phone_regex = r'^\+?\d{10,15}$'  
-        if not re.match(phone_regex, value):
-            raise serializers.ValidationError("Invalid phone number format. It should be 10-15 digits.")
-
-        if User.objects.filter(username=value).exclude(pk=self.instance.pk if self.instance else None).exists():
-            raise serializers.ValidationError("This phone number is already registered.")
-        
-        return value
+        return validate_phone_number(value)
 
     def validate_email(self, value):
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', value):
-            raise serializers.ValidationError("Invalid email format.")
-        
-        if User.objects.filter(email=value).exclude(pk=self.instance.pk if self.instance else None).exists():
-            raise serializers.ValidationError("This email is already in use.")
-        return value
-        
+        return validate_email(value)
+
+    # Phone number and email uniqueness are enforced by the unique index on
+    # auth_user.username and accounts_user_email_lower_uniq rather than by
+    # pre-check queries; a violation is mapped back to a field error here.
+    def unique_violation(self, error):
+        if EMAIL_UNIQUE_INDEX in str(error):
+            return serializers.ValidationError({'email': ["This email is already in use."]})
+        return serializers.ValidationError({'phone_number': ["This phone number is already registered."]})
 
     def create(self, validated_data):
         phone_number = validated_data.pop('username')  
@@ -40,13 +49,17 @@ class UserProfileSerializer(serializers.ModelSerializer):
         email = validated_data.pop('email')
         password = validated_data.pop('password')
 
-        user = User.objects.create_user(
-            username=phone_number,  
-            email=email,
-            first_name=name,
-            password=password
-        )
-        user_profile = UserProfile.objects.create(user=user)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=phone_number,  
+                    email=email,
+                    first_name=name,
+                    password=password
+                )
+                user_profile = UserProfile.objects.create(user=user)
+        except IntegrityError as e:
+            raise self.unique_violation(e)
         return user
     
     def update(self, instance, validated_data):
@@ -60,30 +73,36 @@ class UserProfileSerializer(serializers.ModelSerializer):
         instance.first_name = validated_data.get('first_name', instance.first_name)
         instance.email = validated_data.get('email', instance.email)
 
-        instance.save()
-        user_profile.save()
+        try:
+            with transaction.atomic():
+                instance.save()
+                user_profile.save()
+        except IntegrityError as e:
+            raise self.unique_violation(e)
 
         return instance
 
 
-class OtpVerificationSerializer(serializers.ModelSerializer):
-    is_verified = serializers.BooleanField()
-
-    class Meta:
-        model = UserProfile
-        fields = ['is_verified']
+class OtpVerificationSerializer(serializers.Serializer):
+    otp = serializers.RegexField(r'^\d{4,10}$', error_messages={'invalid': OTP_INVALID_MESSAGE})
 
+    # The code is checked against the OTP store; only a correct code reaches
+    # the database, to mark the profile verified.
     def create(self, validated_data):
-        is_verified = validated_data.get('is_verified')
         request = self.context.get('request')
         user = request.user
+        result = verify_otp(user.pk, validated_data['otp'])
+        if result != VERIFIED:
+            raise serializers.ValidationError({'otp': [RESULT_MESSAGES[result]]})
         try:
             userprofile = UserProfile.objects.get(user = user)
         except UserProfile.DoesNotExist:
             raise serializers.ValidationError("UserProfile profile not found for this user.")
-        
-        userprofile.is_verified = is_verified
-        userprofile.save()
+
+        if not userprofile.is_verified:
+            userprofile.is_verified = True
+            userprofile.save()
+        invalidate_verification(user.pk)
 
         return userprofile
 
@@ -97,23 +116,32 @@ class KYCPanSerializer(serializers.ModelSerializer):
 
     def validate_pan_number(self, value):
         # PAN number validation (simple pattern: 5 letters, 4 digits, 1 letter)
-        pan_pattern = r"^[A-Z]{5}[0-9]{4}[A-Z]{1}$"
-        if not re.match(pan_pattern, value):
-            raise serializers.ValidationError("Invalid PAN number format. It should be in the format: ABCDE1234F")
-        if KYC.objects.filter(pan_number=value).exists():
-            raise serializers.ValidationError("This PAN Number is already in use.")
+        validate_pan_number(value)
+        if is_pan_taken(value):
+            raise serializers.ValidationError(PAN_IN_USE_MESSAGE)
         return value
     
+    # Uniqueness is decided by the insert itself, so concurrent submissions
+    # of one PAN cannot both pass a pre-check; PANs seen taken are cached so
+    # repeats are rejected without a query.
     def create(self, validated_data):
         pan_number = validated_data.get('pan_number')
         request = self.context.get('request')
         user = request.user
 
-        kyc_pan = KYC.objects.create(
-            user = user,
-            pan_number = pan_number
-        )
-
+        try:
+            with transaction.atomic():
+                kyc_pan = KYC.objects.create(
+                    user = user,
+                    pan_number = pan_number
+                )
+        except IntegrityError as e:
+            if is_pan_violation(e):
+                mark_pan_taken(pan_number)
+                raise serializers.ValidationError({'pan_number': [PAN_IN_USE_MESSAGE]})
+            raise serializers.ValidationError({'non_field_errors': ["KYC details have already been submitted for this user."]})
+
+        mark_pan_taken(pan_number)
         return kyc_pan
     
 
@@ -133,19 +161,36 @@ class KYCImageSerializer(serializers.ModelSerializer):
         except KYC.DoesNotExist:
             raise serializers.ValidationError("KYC profile not found for this user.")
         
-        kyc.user_image = user_image
-        kyc.save()
+        return store_kyc_image(kyc, user_image)
+
+
+class KYCImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = KYCImageUpload
+        fields = ['upload_id', 'total_size', 'received', 'completed']
+        read_only_fields = ['upload_id', 'received', 'completed']
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Upload size must be greater than zero.")
+        if value > settings.KYC_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Upload size must not exceed {settings.KYC_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        user = request.user
+        if not KYC.objects.filter(user=user).exists():
+            raise serializers.ValidationError("KYC profile not found for this user.")
 
-        return kyc
+        return KYCImageUpload.objects.create(user=user, total_size=validated_data['total_size'])
 
 
 class PhoneNumberSerializer(serializers.Serializer):
     phone_number = serializers.CharField(max_length=15)
 
     def validate_phone_number(self, value):
-        phone_regex = r'^\+?\d{10,15}$'  
-        if not re.match(phone_regex, value):
-            raise ValidationError("Invalid phone number format. It should be 10-15 digits.")
+        value = validate_phone_number(value)
 
         if not  User.objects.filter(username=value).exists():
             raise ValidationError("This phone number is not registered.")
@@ -163,15 +208,45 @@ class PasswordSerializer(serializers.Serializer):
         return data
     
 
+class AddressListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        request = self.context.get('request')
+        user = request.user
+        addresses = Address.objects.bulk_create([Address(userprofile=user, **item) for item in validated_data])
+        invalidate_me(user.pk)
+        return addresses
+
+
 class AddressSerializer(serializers.ModelSerializer):
+    # City and state may be left out when the pincode index can fill them in.
+    city = serializers.CharField(max_length=100, required=False)
+    state = serializers.ChoiceField(choices=STATE_CHOICES, required=False)
+
     class Meta:
         model = Address
         fields = ['house_flat_apartment','road_street','landmark','city','pincode', 'state', 'address_type']
+        list_serializer_class = AddressListSerializer
 
     def validate_pincode(self, value):
-        if not re.match(r'^\d{6}$', value): 
-            raise serializers.ValidationError("Pincode must be exactly 6 digits.")
-        return value
+        return validate_pincode(value)
+
+    def validate(self, data):
+        index = get_pincode_index()
+        match = index.lookup(data['pincode']) if index is not None else None
+        if index is not None and match is None:
+            raise serializers.ValidationError({'pincode': ["Unknown pincode."]})
+
+        if match is not None:
+            state, city = match
+            if data.get('state', state) != state:
+                raise serializers.ValidationError({'state': ["State does not match the pincode."]})
+            data['state'] = state
+            data.setdefault('city', city)
+
+        missing = {field: ["This field is required."] for field in ('city', 'state') if not data.get(field)}
+        if missing:
+            raise serializers.ValidationError(missing)
+        return data
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -183,4 +258,43 @@ class AddressSerializer(serializers.ModelSerializer):
 class BankDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = BankDetails
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+# Read-only representations used to echo saved objects back in responses.
+# They build the same dicts as the serializers above without instantiating
+# a serializer and its fields per response.
+
+def invalid_data_errors(data):
+    """The errors a serializer reports for a request body that is not a JSON object."""
+    message = serializers.Serializer.default_error_messages['invalid'].format(datatype=type(data).__name__)
+    return {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+
+
+def user_profile_data(user):
+    return {'phone_number': user.username, 'name': user.first_name, 'email': user.email}
+
+
+def verification_data(userprofile):
+    return {'is_verified': userprofile.is_verified}
+
+
+def kyc_pan_data(kyc):
+    return {'pan_number': kyc.pan_number}
+
+
+def kyc_image_data(kyc):
+    return {'user_image': image_url(kyc.user_image)}
+
+
+def kyc_image_upload_data(upload):
+    return {
+        'upload_id': str(upload.upload_id),
+        'total_size': upload.total_size,
+        'received': upload.received,
+        'completed': upload.completed,
+    }
+
+
+def address_data(address):
+    return {field: getattr(address, field) for field in AddressSerializer.Meta.fields}
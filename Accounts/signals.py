@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_token, invalidate_user
+from .metrics import record_query
+from .models import AuthToken, UserProfile, KYC, Address, BankDetails
+from .profile_cache import invalidate_me
+from .pan import forget_pan
+from .verification import invalidate_verification
+
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, **kwargs):
+    invalidate_user(instance)
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_cached_verification(sender, instance, **kwargs):
+    invalidate_verification(instance.user_id)
+
+
+@receiver(post_delete, sender=KYC)
+def forget_released_pan(sender, instance, **kwargs):
+    forget_pan(instance.pan_number)
+
+
+# Bulk writes (bulk_create, update()) send no signals; their callers call
+# invalidate_me themselves.
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_me(sender, instance, **kwargs):
+    invalidate_me(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=KYC)
+def invalidate_cached_me_for_profile(sender, instance, **kwargs):
+    invalidate_me(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Address)
+def invalidate_cached_me_for_address(sender, instance, **kwargs):
+    invalidate_me(instance.userprofile_id)
+
+
+@receiver([post_save, post_delete], sender=BankDetails)
+def invalidate_cached_me_for_bank_details(sender, instance, **kwargs):
+    invalidate_me(instance.user_profile_id)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
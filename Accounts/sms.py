@@ -0,0 +1,98 @@
+import logging
+import threading
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+
+logger = logging.getLogger(__name__)
+
+
+class SMSError(Exception):
+    """A message could not be handed to the SMS provider."""
+
+
+class ConsoleSMSSender:
+    """Logs messages instead of sending them; for local development."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def send(self, phone_number, message):
+        logger.info("SMS", extra={"to": phone_number, "sms": message})
+
+
+class LocMemSMSSender:
+    """
+    Keeps sent messages in `outbox` as (phone_number, message) pairs, so a
+    local run or benchmark can read the codes back. The newest `max_entries`
+    messages are kept.
+    """
+
+    def __init__(self, max_entries=10000, **kwargs):
+        self.max_entries = max_entries
+        self.outbox = []
+        self._lock = threading.Lock()
+
+    def send(self, phone_number, message):
+        with self._lock:
+            self.outbox.append((phone_number, message))
+            del self.outbox[:-self.max_entries]
+
+    def clear(self):
+        with self._lock:
+            self.outbox.clear()
+
+
+class HTTPSMSSender:
+    """
+    Posts {"to", "message"} as JSON to an SMS gateway at `url`, sending
+    `api_key` as a bearer token. Connections are pooled per process.
+    """
+
+    def __init__(self, url, api_key="", timeout=5, **kwargs):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, phone_number, message):
+        try:
+            response = self.session.post(
+                self.url,
+                json={"to": phone_number, "message": message},
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise SMSError(str(e)) from e
+
+
+SMS_BACKENDS = {
+    "console": ConsoleSMSSender,
+    "locmem": LocMemSMSSender,
+    "http": HTTPSMSSender,
+}
+
+_sms_sender = None
+_sms_sender_lock = threading.Lock()
+
+def get_sms_sender():
+    global _sms_sender
+    if _sms_sender is None:
+        with _sms_sender_lock:
+            if _sms_sender is None:
+                options = {key.lower(): value for key, value in settings.SMS.items()}
+                backend = SMS_BACKENDS[options.pop("backend", "console")]
+                _sms_sender = backend(**options)
+    return _sms_sender
+
+
+@receiver(setting_changed)
+def reset_sms_sender(setting, **kwargs):
+    global _sms_sender
+    if setting == "SMS":
+        _sms_sender = None
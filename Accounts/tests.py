@@ -1,3 +1,1581 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from decimal import Decimal
+import threading
+from unittest import mock
+import requests
+from asgiref.sync import sync_to_async
+import PIL.Image
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.conf import settings
+from django.db import IntegrityError, transaction, connections
+from django.db.utils import ConnectionHandler
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from bitfiat.routers import PrimaryReplicaRouter
+from . import async_views
+from .authentication import DjangoTokenCache
+from .checks import check_otp_settings
+from .circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from .decentro import DecentroClient
+from .decentro_stub import DecentroStubServer
+from .imports import import_users
+from .idempotency import (
+    IN_PROGRESS_MESSAGE, INVALID_KEY_MESSAGE, KEY_REUSED_MESSAGE, fingerprint, idempotency_cache_key, idempotency_store,
+    lock_key
+)
+from .jobs import RateLimiter, claim_jobs, enqueue_fetch_job, requeue_stale_jobs, run_fetch_job
+from .metrics import Histogram
+from .models import KYC, Address, AuthToken, BankDetails, BankDetailsFetchJob, KYCImageUpload, UserProfile
+from .otp import INVALID, LOCKED, OTP_EXPIRED_MESSAGE, OTP_INVALID_MESSAGE, OTP_LOCKED_MESSAGE, store_otp, verify_otp
+from .pan import PAN_IN_USE_MESSAGE, is_pan_violation
+from .pincodes import PincodeIndex, get_pincode_index, write_index
+from .profile_cache import build_me_payload, get_me, invalidate_me
+from .renderers import FastJSONRenderer
+from .sms import get_sms_sender
+from .storage import kyc_image_storage
+from . import uploads
+from .validators import normalize_phone_number
+from .verification import is_user_verified
 
-# Create your tests here.
+
+def decentro_accounts(count, prefix="user"):
+    return [
+        {"name": f"Account {i}", "vpa": f"{prefix}{i}@bank", "merchantIfsc": f"BANK000{i:04d}", "tpap": ["paytm", "gpay"]}
+        for i in range(count)
+    ]
+
+
+class BankDetailsFreshnessTests(TransactionTestCase):
+    """Stored bank details within max_age are served as they are; older ones while a refresh runs."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+        self.headers = {"Authorization": f"Token {AuthToken.objects.create(user=self.user).key}"}
+        BankDetails.objects.sync_accounts(self.user, decentro_accounts(2))
+
+    def age(self, seconds):
+        BankDetails.objects.update(updated_at=timezone.now() - datetime.timedelta(seconds=seconds))
+
+    def fetch(self, url="/fetch-bank-details/", **params):
+        return self.client.get(url, params, headers=self.headers)
+
+    def test_fresh_rows_are_served_without_a_fetch(self):
+        for url in ("/fetch-bank-details/", "/async/fetch-bank-details/"):
+            with self.subTest(url=url):
+                response = self.fetch(url)
+                self.assertEqual(response.status_code, 200)
+                body = response.json()
+                self.assertEqual((body["stale"], len(body["bank_details"])), (False, 2))
+                self.assertNotIn("reference_id", body)
+        self.assertFalse(BankDetailsFetchJob.objects.exists())
+
+    def test_stale_rows_are_served_while_one_refresh_is_queued(self):
+        self.age(7200)
+        first, second = self.fetch().json(), self.fetch().json()
+        self.assertEqual((first["stale"], first["status"]), (True, "pending"))
+        self.assertEqual(second["reference_id"], first["reference_id"])
+        self.assertEqual(BankDetailsFetchJob.objects.count(), 1)
+
+        with DecentroStubServer() as server, override_settings(DECENTRO_BASE_URL=server.url):
+            run_fetch_job(BankDetailsFetchJob.objects.get().pk)
+        body = self.fetch().json()
+        self.assertFalse(body["stale"])
+        self.assertEqual([account["vpa"] for account in body["bank_details"]], ["+919876543210@stubbank"])
+
+    def test_max_age(self):
+        self.age(60)
+        self.assertFalse(self.fetch(max_age=120).json()["stale"])
+        self.assertTrue(self.fetch(max_age=30).json()["stale"])
+        for url in ("/fetch-bank-details/", "/async/fetch-bank-details/"):
+            for value in ("-1", "soon"):
+                with self.subTest(url=url, max_age=value):
+                    response = self.fetch(url, max_age=value)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("max_age", response.json())
+
+    def test_max_age_zero_always_refreshes(self):
+        body = self.fetch(max_age=0).json()
+        self.assertTrue(body["stale"])
+        self.assertEqual(BankDetailsFetchJob.objects.get().reference_id, body["reference_id"])
+
+    def test_open_circuit_serves_stored_rows(self):
+        self.age(7200)
+        breaker = CircuitBreaker("decentro", **{key.lower(): value for key, value in settings.DECENTRO_CIRCUIT_BREAKER.items()})
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        for url in ("/fetch-bank-details/", "/async/fetch-bank-details/"):
+            with self.subTest(url=url):
+                response = self.fetch(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Retry-After"], str(breaker.recovery_timeout))
+                self.assertTrue(response.json()["stale"])
+        BankDetails.objects.all().delete()
+        self.assertEqual(self.fetch().status_code, 503)
+        self.assertFalse(BankDetailsFetchJob.objects.exists())
+
+    async def test_async_refresh_runs_once_in_the_background(self):
+        await sync_to_async(self.age)(7200)
+        with DecentroStubServer(delay=0.2) as server, override_settings(DECENTRO_BASE_URL=server.url):
+            first = await self.async_client.get("/async/fetch-bank-details/", headers=self.headers)
+            second = await self.async_client.get("/async/fetch-bank-details/", headers=self.headers)
+            await asyncio.gather(*async_views._refresh_tasks)
+        self.assertEqual((first.json()["stale"], first.json()["status"]), (True, "running"))
+        self.assertEqual(second.json()["reference_id"], first.json()["reference_id"])
+        self.assertEqual(server.requests_received, 1)
+
+        body = (await self.async_client.get("/async/fetch-bank-details/", headers=self.headers)).json()
+        self.assertFalse(body["stale"])
+        self.assertEqual([account["vpa"] for account in body["bank_details"]], ["+919876543210@stubbank"])
+
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def throttling(**rates):
+    return override_settings(THROTTLING={**settings.THROTTLING, "BACKEND": "locmem", "RATES": rates})
+
+
+def user_rows(count, start=0):
+    return [
+        {"phone_number": f"+9198765{i:05d}", "name": f"User {i}", "email": f"user{i}@example.com", "password": "s3cret-pass"}
+        for i in range(start, start + count)
+    ]
+
+
+def csv_file(rows):
+    lines = ["phone_number,name,email,password"] + [",".join(row.values()) for row in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+class BankDetailsJobWorkerTests(TransactionTestCase):
+    """Claiming, retrying and pacing the jobs behind /fetch-bank-details/."""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create(username=f"+91987654321{i}") for i in range(3)]
+
+    def enqueue(self):
+        return [enqueue_fetch_job(user, f"ref-{i}") for i, user in enumerate(self.users)]
+
+    def test_each_job_is_claimed_once(self):
+        jobs = self.enqueue()
+        self.assertEqual(claim_jobs(2), [jobs[0].pk, jobs[1].pk])
+        self.assertEqual(claim_jobs(10), [jobs[2].pk])
+        self.assertEqual(claim_jobs(10), [])
+        self.assertEqual(
+            set(BankDetailsFetchJob.objects.values_list("status", flat=True)), {BankDetailsFetchJob.STATUS_RUNNING}
+        )
+
+    def test_concurrent_workers_never_share_a_job(self):
+        self.enqueue()
+        barrier = threading.Barrier(4)
+        claimed = []
+
+        def claim():
+            try:
+                barrier.wait()
+                claimed.extend(claim_jobs(10))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), sorted(BankDetailsFetchJob.objects.values_list("pk", flat=True)))
+
+    def test_stale_running_jobs_are_requeued(self):
+        jobs = self.enqueue()
+        claim_jobs(10)
+        BankDetailsFetchJob.objects.filter(pk=jobs[0].pk).update(updated_at=timezone.now() - datetime.timedelta(seconds=600))
+        self.assertEqual(requeue_stale_jobs(300), 1)
+        self.assertEqual(claim_jobs(10), [jobs[0].pk])
+
+    def process_jobs(self, server, *args):
+        stdout = io.StringIO()
+        with override_settings(DECENTRO_BASE_URL=server.url, DECENTRO_MAX_RETRIES=0):
+            call_command("process_bank_details_jobs", "--once", "--workers", "2", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_failed_calls_are_retried_until_max_attempts(self):
+        job = enqueue_fetch_job(self.users[0], "ref-0")
+        with DecentroStubServer(failure_rate=1, error_status=500) as server:
+            output = self.process_jobs(server, "--max-attempts", "3")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, server.requests_received), (BankDetailsFetchJob.STATUS_FAILED, 3, 3))
+        self.assertIn("500 Server Error", job.error)
+        self.assertEqual(output.count("ref-0: pending"), 2)
+        self.assertIn("ref-0: failed", output)
+
+    def test_job_succeeds_on_a_retry(self):
+        job = enqueue_fetch_job(self.users[0], "ref-0")
+        with DecentroStubServer(failure_rate=1, error_status=500) as server:
+
+            def fail_once(pk, **kwargs):
+                # Let the retry through once the first attempt has failed.
+                result = run_fetch_job(pk, **kwargs)
+                server.failure_rate = 0
+                return result
+
+            with mock.patch("Accounts.management.commands.process_bank_details_jobs.run_fetch_job", side_effect=fail_once):
+                output = self.process_jobs(server)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (BankDetailsFetchJob.STATUS_SUCCEEDED, 2, ""))
+        self.assertEqual(BankDetails.objects.get(user_profile=self.users[0]).vpa, "+919876543210@stubbank")
+        self.assertIn("Processed 2 job(s).", output)
+
+    def test_rate_limiter_spaces_calls_out(self):
+        now = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(round(seconds, 6))
+            now[0] += seconds
+
+        with mock.patch("Accounts.jobs.time.monotonic", side_effect=lambda: now[0]), \
+                mock.patch("Accounts.jobs.time.sleep", side_effect=sleep):
+            limiter = RateLimiter(4)
+            for _ in range(3):
+                limiter.wait()
+            now[0] += 2
+            limiter.wait()
+            RateLimiter(0).wait()
+        # The first call goes at once, the next two 0.25s apart, and the one
+        # after an idle gap does not wait for the slots it missed.
+        self.assertEqual(sleeps, [0.25, 0.25])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportUsersTests(TestCase):
+    def test_creates_users_profiles_and_tokens(self):
+        result = import_users(csv_file(user_rows(5)), batch_size=2, verified=True)
+        self.assertEqual((result.processed, result.created, result.duplicates, result.invalid), (5, 5, 0, 0))
+        user = User.objects.get(username="+919876500003")
+        self.assertEqual((user.first_name, user.email), ("User 3", "user3@example.com"))
+        self.assertTrue(user.check_password("s3cret-pass"))
+        self.assertTrue(user.userprofile.is_verified)
+        self.assertEqual(AuthToken.objects.count(), 5)
+
+    def test_queries_per_batch_do_not_grow_with_its_size(self):
+        # Existing accounts, SAVEPOINT, one insert per table, RELEASE.
+        for start, count in ((0, 2), (100, 20)):
+            with self.subTest(count=count), self.assertNumQueries(6):
+                import_users(csv_file(user_rows(count, start)), batch_size=count)
+
+    def test_reports_invalid_rows_and_skips_existing_accounts(self):
+        import_users(csv_file(user_rows(1)))
+        rows = user_rows(3)
+        rows[1]["phone_number"] = "12345"
+        rows[2]["email"] = rows[0]["email"].upper()
+        stream = io.BytesIO(
+            b"\n".join(json.dumps(row).encode() for row in rows) + b"\n[]\n" + json.dumps(user_rows(1, 10)[0]).encode()
+        )
+
+        result = import_users(stream, format="jsonl")
+        self.assertEqual((result.processed, result.created, result.duplicates, result.invalid), (5, 1, 1, 3))
+        self.assertEqual([error["line"] for error in result.errors], [2, 3, 4])
+        self.assertEqual(result.errors[1]["errors"], {"email": ["Duplicate email in this file."]})
+        self.assertEqual(result.errors[2]["errors"], ["Row is not a JSON object."])
+        self.assertTrue(User.objects.filter(username="+919876500010").exists())
+
+    def test_rejects_values_longer_than_the_user_columns(self):
+        rows = user_rows(3)
+        rows[0]["name"] = "N" * 151
+        rows[1]["email"] = "e" * 243 + "@example.com"
+        result = import_users(csv_file(rows))
+        self.assertEqual((result.created, result.invalid), (1, 2))
+        self.assertEqual(result.errors, [
+            {"line": 2, "errors": {"name": ["Ensure this field has no more than 150 characters."]}},
+            {"line": 3, "errors": {"email": ["Ensure this field has no more than 254 characters."]}},
+        ])
+
+    @override_settings(USER_IMPORT_MAX_REQUEST_ROWS=3)
+    def test_endpoint_refuses_files_meant_for_the_command(self):
+        user = User.objects.create(username="+919999999999", is_staff=True)
+        headers = {"Authorization": f"Token {AuthToken.objects.create(user=user).key}"}
+        upload = csv_file(user_rows(3))
+        upload.name = "users.csv"
+        response = self.client.post("/users/import/", {"file": upload}, headers=headers)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("manage.py import_users", response.json()["file"][0])
+        self.assertFalse(User.objects.filter(username__startswith="+9198765").exists())
+
+    def test_endpoint_is_for_staff_only(self):
+        user = User.objects.create(username="+919999999999")
+        headers = {"Authorization": f"Token {AuthToken.objects.create(user=user).key}"}
+        upload = csv_file(user_rows(2))
+        upload.name = "users.csv"
+        response = self.client.post("/users/import/", {"file": upload}, headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        upload.seek(0)
+        response = self.client.post("/users/import/", {"file": upload, "verified": "true"}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 2)
+        self.assertTrue(UserProfile.objects.get(user__username="+919876500001").is_verified)
+
+
+class NormalizePhoneNumberTests(SimpleTestCase):
+    def test_spellings_of_a_number_normalize_to_e164(self):
+        for value in ("9876543210", "09876543210", "+919876543210", "919876543210", "0091 98765-43210", "(98765) 43210"):
+            with self.subTest(value=value):
+                self.assertEqual(normalize_phone_number(value), "+919876543210")
+
+    def test_default_country_code(self):
+        self.assertEqual(normalize_phone_number("2025550123", country_code="1"), "+12025550123")
+        with override_settings(PHONE_DEFAULT_COUNTRY_CODE="44"):
+            self.assertEqual(normalize_phone_number("7700900123"), "+447700900123")
+
+    def test_non_numbers_are_rejected(self):
+        for value in (None, 9876543210, "", "12345", "98765abcde", "+1234567890123456", "++919876543210"):
+            with self.subTest(value=value):
+                self.assertIsNone(normalize_phone_number(value))
+
+
+class NormalizePhoneUsernamesMigrationTests(TestCase):
+    migration = importlib.import_module("Accounts.migrations.0013_normalize_phone_usernames")
+
+    def migrate(self):
+        self.migration.normalize_usernames(django_apps, None)
+
+    def usernames(self):
+        return dict(User.objects.values_list("email", "username"))
+
+    def test_usernames_are_rewritten_to_e164(self):
+        for i, username in enumerate(("9876543210", "+91 98765 43211", "0091-9876543212", "+919876543213", "admin")):
+            User.objects.create(username=username, email=f"user{i}@example.com")
+        self.migrate()
+        self.assertEqual(self.usernames(), {
+            "user0@example.com": "+919876543210",
+            "user1@example.com": "+919876543211",
+            "user2@example.com": "+919876543212",
+            "user3@example.com": "+919876543213",
+            "user4@example.com": "admin",
+        })
+
+    def test_collisions_leave_the_later_accounts_alone(self):
+        User.objects.create(username="+919876543210", email="e164@example.com")
+        User.objects.create(username="9876543210", email="national@example.com")
+        User.objects.create(username="09876543211", email="trunk@example.com")
+        User.objects.create(username="98765 43211", email="spaced@example.com")
+        self.migrate()
+        self.assertEqual(self.usernames(), {
+            # Already taken by the E.164 account.
+            "e164@example.com": "+919876543210",
+            "national@example.com": "9876543210",
+            # Both map to one number; the older account gets it.
+            "trunk@example.com": "+919876543211",
+            "spaced@example.com": "98765 43211",
+        })
+
+
+class SyncAccountsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="+919876543210")
+
+    def test_query_count_does_not_grow_with_accounts(self):
+        # SAVEPOINT, the lookup of accounts to drop, one upsert, RELEASE.
+        for count in (1, 5, 50):
+            user = User.objects.create(username=f"+91900000{count:04d}")
+            with self.subTest(count=count), self.assertNumQueries(4):
+                BankDetails.objects.sync_accounts(user, decentro_accounts(count, prefix=f"sync{count}-"))
+            self.assertEqual(BankDetails.objects.filter(user_profile=user).count(), count)
+
+    def test_removes_accounts_no_longer_returned(self):
+        BankDetails.objects.sync_accounts(self.user, decentro_accounts(3))
+        BankDetails.objects.sync_accounts(self.user, decentro_accounts(1))
+        self.assertQuerySetEqual(
+            BankDetails.objects.filter(user_profile=self.user).values_list("vpa", flat=True), ["user0@bank"]
+        )
+
+    def test_updates_existing_accounts_in_place(self):
+        BankDetails.objects.sync_accounts(self.user, decentro_accounts(2))
+        accounts = decentro_accounts(2)
+        accounts[0]["name"] = "Renamed"
+        BankDetails.objects.sync_accounts(self.user, accounts)
+        account = BankDetails.objects.get(vpa="user0@bank")
+        self.assertEqual((account.name, account.tpap), ("Renamed", ["paytm", "gpay"]))
+
+    def test_another_users_vpa_is_left_alone(self):
+        other = User.objects.create(username="+919876543211")
+        BankDetails.objects.sync_accounts(other, decentro_accounts(1))
+        BankDetails.objects.sync_accounts(self.user, decentro_accounts(1))
+        self.assertEqual(
+            sorted(BankDetails.objects.filter(vpa="user0@bank").values_list("user_profile__username", flat=True)),
+            ["+919876543210", "+919876543211"],
+        )
+
+
+class VerificationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+        self.profile = UserProfile.objects.create(user=self.user)
+
+    def test_unverified_flag_is_not_cached(self):
+        self.assertFalse(is_user_verified(self.user))
+        # Verified elsewhere, without this process invalidating anything.
+        UserProfile.objects.filter(pk=self.profile.pk).update(is_verified=True)
+        self.assertTrue(is_user_verified(self.user))
+
+    def test_verified_flag_is_served_from_cache(self):
+        UserProfile.objects.filter(pk=self.profile.pk).update(is_verified=True)
+        self.assertTrue(is_user_verified(self.user))
+        UserProfile.objects.filter(pk=self.profile.pk).update(is_verified=False)
+        self.assertTrue(is_user_verified(self.user))
+
+
+def json_shape(body):
+    """`body` with hex digits zeroed, to compare responses carrying different tokens, ids and times."""
+    return re.sub(rb"[0-9a-f]", b"0", body)
+
+
+class AsyncParityTests(TransactionTestCase):
+    """
+    The async endpoints answer with the same bodies as their sync
+    counterparts. run_fetch_job closes the connection as a worker would, so
+    these cannot run inside TestCase's transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+
+    def auth(self):
+        return {"Authorization": f"Token {AuthToken.objects.create(user=self.user).key}"}
+
+    async def test_token_rotate(self):
+        sync_token = await AuthToken.objects.acreate(user=self.user)
+        async_token = await AuthToken.objects.acreate(user=self.user)
+        sync_response = await self.async_client.post("/token/rotate/", headers={"Authorization": f"Token {sync_token.key}"})
+        async_response = await self.async_client.post(
+            "/async/token/rotate/", headers={"Authorization": f"Token {async_token.key}"}
+        )
+        self.assertEqual((sync_response.status_code, async_response.status_code), (200, 200))
+        self.assertEqual(json_shape(sync_response.content), json_shape(async_response.content))
+
+    def test_fetch_bank_details_failure(self):
+        with DecentroStubServer(failure_rate=1, error_status=500) as server, \
+                override_settings(DECENTRO_BASE_URL=server.url, DECENTRO_MAX_RETRIES=0):
+            job = enqueue_fetch_job(self.user, "00000000-0000-0000-0000-000000000000")
+            run_fetch_job(job.pk, max_attempts=1)
+            sync_response = self.client.get(f"/fetch-bank-details/{job.reference_id}/", headers=self.auth())
+            async_response = self.client.get("/async/fetch-bank-details/", headers=self.auth())
+
+        self.assertEqual(sync_response.status_code, async_response.status_code)
+        sync_body, async_body = sync_response.json(), async_response.json()
+        self.assertEqual(async_body["status"], "failed")
+        self.assertTrue(async_body["error"].startswith("Failed to connect to Decentro API: 500 Server Error"))
+        self.assertNotEqual(async_body["reference_id"], sync_body.pop("reference_id"))
+        async_body.pop("reference_id")
+        self.assertEqual(sync_body, async_body)
+
+    def test_fetch_bank_details_success(self):
+        with DecentroStubServer() as server, override_settings(DECENTRO_BASE_URL=server.url):
+            job = enqueue_fetch_job(self.user, "00000000-0000-0000-0000-000000000000")
+            run_fetch_job(job.pk)
+            sync_response = self.client.get(f"/fetch-bank-details/{job.reference_id}/", headers=self.auth())
+            BankDetails.objects.all().delete()
+            async_response = self.client.get("/async/fetch-bank-details/", headers=self.auth())
+
+        self.assertEqual((sync_response.status_code, async_response.status_code), (200, 200))
+        self.assertEqual(json_shape(sync_response.content), json_shape(async_response.content))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ThrottlingTests(TestCase):
+    def login(self, url="/login/", data=None, **headers):
+        data = data if data is not None else {"phone_number": "+919876543210", "password": "wrong"}
+        return self.client.post(url, data, content_type="application/json", headers=headers)
+
+    @throttling(login={"ip": "3/min"})
+    def test_forwarded_for_does_not_reset_the_ip_budget(self):
+        codes = [
+            self.login(data={"phone_number": f"+91987654{i:04d}", "password": "wrong"}, x_forwarded_for=f"10.0.0.{i}").status_code
+            for i in range(5)
+        ]
+        self.assertEqual(codes, [401, 401, 401, 429, 429])
+
+    @throttling(login={"phone": "2/min"})
+    def test_phone_budget_is_shared_by_every_spelling(self):
+        codes = [
+            self.login(data={"phone_number": number, "password": "wrong"}).status_code
+            for number in ("9876543210", "+91 98765 43210", "09876543210")
+        ]
+        self.assertEqual(codes, [401, 401, 429])
+
+    @throttling(login={"ip": "30/min", "phone": "5/min"})
+    def test_body_that_is_not_an_object_is_rejected(self):
+        for url in ("/login/", "/async/login/"):
+            with self.subTest(url=url):
+                response = self.login(url, data=["+919876543210"])
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"non_field_errors": ["Invalid data. Expected a dictionary, but got list."]})
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, THROTTLING={**settings.THROTTLING, "RATES": {}})
+class DuplicateSubmissionTests(TransactionTestCase):
+    """Parallel duplicates are settled by the unique indexes: one wins, the rest get field errors."""
+
+    submissions = 8
+
+    def setUp(self):
+        cache.clear()
+
+    def submit_in_parallel(self, url, bodies, headers=None):
+        """POST every body to `url` at once, each from its own thread and connection."""
+        headers = headers or [{}] * len(bodies)
+        barrier = threading.Barrier(len(bodies))
+        responses = [None] * len(bodies)
+
+        def submit(i):
+            try:
+                client = Client()
+                barrier.wait()
+                responses[i] = client.post(url, bodies[i], content_type="application/json", headers=headers[i])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(bodies))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def assertOneCreated(self, responses, field, message):
+        codes = sorted(response.status_code for response in responses)
+        self.assertEqual(codes, [201] + [400] * (len(responses) - 1))
+        for response in responses:
+            if response.status_code == 400:
+                self.assertEqual(response.json(), {field: [message]})
+
+    def test_sign_up(self):
+        bodies = [
+            {"phone_number": "+919876543210", "name": "Asha", "email": f"asha{i}@example.com", "password": "s3cret-pass"}
+            for i in range(self.submissions)
+        ]
+        responses = self.submit_in_parallel("/sign-up/", bodies)
+        self.assertOneCreated(responses, "phone_number", "This phone number is already registered.")
+        self.assertEqual(User.objects.filter(username="+919876543210").count(), 1)
+
+    def test_kyc_pan(self):
+        tokens = [
+            AuthToken.objects.create(user=User.objects.create(username=f"+9198765{i:05d}"))
+            for i in range(self.submissions)
+        ]
+        responses = self.submit_in_parallel(
+            "/kyc-pan/",
+            [{"pan_number": "ABCDE1234F"}] * self.submissions,
+            [{"Authorization": f"Token {token.key}"} for token in tokens],
+        )
+        self.assertOneCreated(responses, "pan_number", PAN_IN_USE_MESSAGE)
+        self.assertEqual(KYC.objects.filter(pan_number="ABCDE1234F").count(), 1)
+
+
+class PanViolationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="+919876543210")
+        KYC.objects.create(user=self.user, pan_number="ABCDE1234F")
+
+    def integrity_error(self, **fields):
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            KYC.objects.create(**fields)
+        return raised.exception
+
+    def test_duplicate_pan_is_recognised(self):
+        other = User.objects.create(username="+919876543211")
+        self.assertTrue(is_pan_violation(self.integrity_error(user=other, pan_number="ABCDE1234F")))
+
+    def test_second_kyc_for_a_user_is_not_a_pan_violation(self):
+        self.assertFalse(is_pan_violation(self.integrity_error(user=self.user, pan_number="ABCDE1234G")))
+
+    def test_constraint_name_from_the_driver_is_trusted(self):
+        def error(constraint_name, message):
+            cause = Exception(message)
+            cause.diag = mock.Mock(constraint_name=constraint_name)
+            error = IntegrityError(message)
+            error.__cause__ = cause
+            return error
+
+        self.assertTrue(is_pan_violation(error("kyc_pan_number_uniq", "duplicate key value")))
+        # A message mentioning pan_number is not enough once the driver names the constraint.
+        self.assertFalse(is_pan_violation(error("Accounts_kyc_user_id_key", 'Key (user_id)=(1) pan_number')))
+
+
+class AddressPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="+919876543210")
+        self.headers = {"Authorization": f"Token {AuthToken.objects.create(user=self.user).key}"}
+        self.addresses = self.create_addresses(self.user, 25)
+        # Rows sharing a created_at are ordered, and split across pages, by id.
+        Address.objects.filter(pk__in=[address.pk for address in self.addresses[5:15]]).update(
+            created_at=self.addresses[5].created_at
+        )
+        self.create_addresses(User.objects.create(username="+919876543211"), 3)
+
+    def create_addresses(self, user, count):
+        return Address.objects.bulk_create([
+            Address(userprofile=user, house_flat_apartment=f"Flat {i}", road_street="MG Road", city="Guntur",
+                    pincode="522001", state="andhra pradesh")
+            for i in range(count)
+        ])
+
+    def page(self, **params):
+        response = self.client.get("/address/", params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_every_address_once_newest_first(self):
+        expected = list(self.user.addresses.order_by("-created_at", "-pk").values_list("house_flat_apartment", flat=True))
+        seen, sizes, cursor = [], [], None
+        while True:
+            page = self.page(limit=10, **({"cursor": cursor} if cursor else {}))
+            seen += [address["house_flat_apartment"] for address in page["results"]]
+            sizes.append(len(page["results"]))
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(sizes, [10, 10, 5])
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(len(self.page(limit=1000)["results"]), 25)
+        self.assertEqual(len(self.page(limit=0)["results"]), 1)
+        self.assertEqual(len(self.page(limit="many")["results"]), 20)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/address/", {"cursor": "not-a-cursor"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"cursor": ["Invalid cursor."]})
+
+
+PINCODE_DIRECTORY = """officename,Pincode,StateName,DistrictName
+Guntur H.O,522001,ANDHRA PRADESH,GUNTUR
+Guntur Bazar S.O,522001,Andhra Pradesh,guntur
+Old Guntur S.O,522001,Andhra Pradesh,Krishna
+Port Blair H.O,744101,Andaman & Nicobar Islands,South Andaman
+Cuttack H.O,753001,Orissa,Cuttack
+Nowhere B.O,99999,Karnataka,Nowhere
+Atlantis B.O,111111,Atlantis,Atlantis
+"""
+
+
+class PincodeIndexTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.source = os.path.join(temp_dir.name, "pincodes.csv")
+        with open(self.source, "w") as output:
+            output.write(PINCODE_DIRECTORY)
+        self.path = os.path.join(temp_dir.name, "pincodes.idx")
+        index_settings = override_settings(PINCODE_INDEX_PATH=self.path)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        self.user = User.objects.create(username="+919876543210")
+        self.headers = {"Authorization": f"Token {AuthToken.objects.create(user=self.user).key}"}
+
+    def build(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("build_pincode_index", self.source, stdout=stdout, stderr=stderr)
+        return stderr.getvalue()
+
+    def test_build_resolves_each_pincode_to_its_most_common_district(self):
+        stderr = self.build()
+        index = PincodeIndex(self.path)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.lookup("522001"), ("andhra pradesh", "Guntur"))
+        self.assertEqual(index.lookup("744101"), ("andaman and nicobar islands", "South Andaman"))
+        self.assertEqual(index.lookup("753001"), ("odisha", "Cuttack"))
+        self.assertIn("Unknown state 'Atlantis': 1 rows skipped", stderr)
+        self.assertIn("1 rows with a malformed pincode or district skipped", stderr)
+
+    def test_lookup_misses(self):
+        write_index(self.path, {110001: ("delhi", "New Delhi"), 560001: ("karnataka", "Bengaluru")})
+        index = PincodeIndex(self.path)
+        for pincode in ("000000", "110000", "110002", "999999", "abcdef", None):
+            with self.subTest(pincode=pincode):
+                self.assertIsNone(index.lookup(pincode))
+        self.assertEqual(index.lookup("560001"), ("karnataka", "Bengaluru"))
+
+    def test_other_files_are_refused(self):
+        # The CSV is longer than the header, so only the magic check fails.
+        with self.assertRaises(ValueError):
+            PincodeIndex(self.source)
+
+    def test_index_is_loaded_once_on_first_use(self):
+        self.build()
+        with mock.patch("Accounts.pincodes.PincodeIndex", wraps=PincodeIndex) as loader:
+            self.assertEqual(loader.call_count, 0)
+            for _ in range(3):
+                response = self.client.get("/pincode/522001/", headers=self.headers)
+                self.assertEqual(response.json(), {"pincode": "522001", "city": "Guntur", "state": "andhra pradesh"})
+        self.assertEqual(loader.call_count, 1)
+
+    def test_addresses_are_checked_and_filled_in_from_the_index(self):
+        self.build()
+        address = {field: value for field, value in ADDRESS.items() if field not in ("city", "state")}
+        response = self.client.post("/address/", address, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.user.addresses.values_list("city", "state").get(), ("Guntur", "andhra pradesh"))
+        response = self.client.post("/address/", {**ADDRESS, "pincode": "522002"}, content_type="application/json", headers=self.headers)
+        self.assertEqual((response.status_code, response.json()), (400, {"pincode": ["Unknown pincode."]}))
+
+    def test_missing_index_only_checks_the_format(self):
+        self.assertIsNone(get_pincode_index())
+        response = self.client.get("/pincode/522001/", headers=self.headers)
+        self.assertEqual(response.status_code, 503)
+        response = self.client.post("/address/", {**ADDRESS, "pincode": "522002"}, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+
+@override_settings(SMS={"BACKEND": "locmem"}, OTP={**settings.OTP, "MAX_ATTEMPTS": 3, "RESEND_INTERVAL": 30})
+class OtpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_sms_sender().clear()
+        self.user = User.objects.create(username="+919876543210")
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.headers = {"Authorization": f"Token {AuthToken.objects.create(user=self.user).key}"}
+
+    def request_otp(self, url="/otp/"):
+        return self.client.post(url, headers=self.headers)
+
+    def last_code(self):
+        phone_number, message = get_sms_sender().outbox[-1]
+        self.assertEqual(phone_number, "+919876543210")
+        return re.match(r"\d+", message).group()
+
+    def verify(self, code, url="/otp-verification/"):
+        return self.client.post(url, {"otp": code}, content_type="application/json", headers=self.headers)
+
+    def wrong(self, code):
+        return "0" * len(code) if code != "0" * len(code) else "1" * len(code)
+
+    def test_code_verifies_once(self):
+        self.assertEqual(self.request_otp().status_code, 200)
+        code = self.last_code()
+        self.assertEqual(self.verify(code).status_code, 201)
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.is_verified)
+        self.assertEqual(self.verify(code).json(), {"otp": [OTP_EXPIRED_MESSAGE]})
+
+    def test_code_issued_by_one_view_is_checked_by_the_other(self):
+        self.request_otp("/otp/")
+        self.assertEqual(self.verify(self.last_code(), "/async/otp-verification/").status_code, 201)
+
+    def test_wrong_codes_lock_the_pending_code(self):
+        for url in ("/otp-verification/", "/async/otp-verification/"):
+            with self.subTest(url=url):
+                cache.clear()
+                self.request_otp()
+                code = self.last_code()
+                responses = [self.verify(self.wrong(code), url).json() for _ in range(3)]
+                self.assertEqual(responses, [{"otp": [OTP_INVALID_MESSAGE]}] * 2 + [{"otp": [OTP_LOCKED_MESSAGE]}])
+                self.assertEqual(self.verify(code, url).json(), {"otp": [OTP_EXPIRED_MESSAGE]})
+
+    @override_settings(OTP={**settings.OTP, "TIMEOUT": 1})
+    def test_code_expires(self):
+        self.request_otp()
+        code = self.last_code()
+        time.sleep(1.1)
+        self.assertEqual(self.verify(code).json(), {"otp": [OTP_EXPIRED_MESSAGE]})
+
+    def test_resend_waits_for_the_interval_and_replaces_the_code(self):
+        self.request_otp()
+        first = self.last_code()
+        for url in ("/otp/", "/async/otp/"):
+            response = self.request_otp(url)
+            self.assertEqual((response.status_code, response["Retry-After"]), (429, "30"))
+        self.assertEqual(len(get_sms_sender().outbox), 1)
+
+        cache.delete(f"otp:resend:{self.user.pk}")
+        self.request_otp()
+        second = self.last_code()
+        if first != second:
+            self.assertEqual(self.verify(first).json(), {"otp": [OTP_INVALID_MESSAGE]})
+        self.assertEqual(self.verify(second).status_code, 201)
+
+
+@override_settings(OTP={**settings.OTP, "MAX_ATTEMPTS": 3})
+class OtpAttemptTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_wrong_guesses_share_the_attempt_budget(self):
+        store_otp(1, "123456")
+        barrier = threading.Barrier(20)
+        results = []
+
+        def guess(i):
+            barrier.wait()
+            results.append(verify_otp(1, f"{i:06d}"))
+
+        threads = [threading.Thread(target=guess, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(INVALID), 2)
+        self.assertGreaterEqual(results.count(LOCKED), 1)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "otp"}})
+    def test_cache_without_atomic_incr_is_refused(self):
+        self.assertEqual([error.id for error in check_otp_settings(None)], ["Accounts.E001"])
+
+    def test_sms_backend_must_be_set(self):
+        for backend, expected in (("", ["Accounts.E002"]), ("sms", ["Accounts.E002"]), ("http", [])):
+            with self.subTest(backend=backend), override_settings(SMS={"BACKEND": backend}):
+                self.assertEqual([error.id for error in check_otp_settings(None)], expected)
+
+
+ADDRESS = {"house_flat_apartment": "Flat 1", "road_street": "MG Road", "city": "Guntur", "pincode": "522001", "state": "andhra pradesh"}
+
+
+@override_settings(IDEMPOTENCY={**settings.IDEMPOTENCY, "WAIT": 0.1})
+class IdempotencyTests(TestCase):
+    urls = ("/address/", "/async/address/")
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+        self.token = AuthToken.objects.create(user=self.user)
+
+    def post(self, url, data=ADDRESS, key="key-1", token=None):
+        headers = {"Authorization": f"Token {(token or self.token).key}", "Idempotency-Key": key}
+        return self.client.post(url, data, content_type="application/json", headers=headers)
+
+    def test_retry_replays_the_first_response(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first, retry = self.post(url), self.post(url)
+                self.assertEqual((first.status_code, retry.status_code), (201, 201))
+                self.assertEqual(retry.content, first.content)
+                self.assertEqual(retry["Idempotent-Replayed"], "true")
+                self.assertFalse(first.has_header("Idempotent-Replayed"))
+        self.assertEqual(Address.objects.count(), 2)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.post(url)
+                response = self.post(url, {**ADDRESS, "house_flat_apartment": "Flat 2"})
+                self.assertEqual(response.status_code, 422)
+                self.assertEqual(response.json(), {"detail": KEY_REUSED_MESSAGE})
+        self.assertEqual(Address.objects.count(), 2)
+
+    def test_keys_are_scoped_to_the_user(self):
+        other = AuthToken.objects.create(user=User.objects.create(username="+919876543211"))
+        self.post("/address/")
+        response = self.post("/address/", token=other)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(Address.objects.filter(userprofile=other.user).count(), 1)
+
+    def test_anonymous_keys_ignore_forwarded_for_without_trusted_proxies(self):
+        def key_for(remote_addr, forwarded_for):
+            request = RequestFactory().post(
+                "/login/", REMOTE_ADDR=remote_addr, HTTP_X_FORWARDED_FOR=forwarded_for
+            )
+            return idempotency_cache_key(Request(request), "key-1")
+
+        self.assertEqual(key_for("10.0.0.1", "1.1.1.1"), key_for("10.0.0.1", "2.2.2.2"))
+        self.assertNotEqual(key_for("10.0.0.1", "1.1.1.1"), key_for("10.0.0.2", "1.1.1.1"))
+
+    def test_invalid_key_is_rejected(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.post(url, key="k" * 256)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"Idempotency-Key": [INVALID_KEY_MESSAGE]})
+        self.assertFalse(Address.objects.exists())
+
+    def hold_lock(self, url, key, data=ADDRESS):
+        """Take `key`'s lock as a first request that has not answered yet would."""
+        request = RequestFactory().post(url)
+        request.user = self.user
+        lock = lock_key(idempotency_cache_key(request, key))
+        idempotency_store().add(lock, fingerprint(json.dumps(data).encode()), 60)
+
+    def test_retry_while_the_first_request_runs(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.hold_lock(url, "key-1")
+                response = self.post(url)
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(response.json(), {"detail": IN_PROGRESS_MESSAGE})
+                response = self.post(url, {**ADDRESS, "house_flat_apartment": "Flat 2"})
+                self.assertEqual(response.status_code, 422)
+        self.assertFalse(Address.objects.exists())
+
+
+def jpeg_bytes():
+    output = io.BytesIO()
+    PIL.Image.new("RGB", (64, 48), "teal").save(output, format="JPEG")
+    return output.getvalue()
+
+
+class KYCImageUploadTests(TransactionTestCase):
+    """Chunked KYC image uploads through /kyc-img/uploads/<id>/."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        temp_settings = override_settings(MEDIA_ROOT=temp_dir.name, KYC_UPLOAD_TEMP_DIR=os.path.join(temp_dir.name, "parts"))
+        temp_settings.enable()
+        self.addCleanup(temp_settings.disable)
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+        self.token = AuthToken.objects.create(user=self.user)
+        self.data = jpeg_bytes()
+
+    def start(self, data):
+        KYC.objects.get_or_create(user=self.user, defaults={"pan_number": "ABCDE1234F"})
+        return KYCImageUpload.objects.create(user=self.user, total_size=len(data))
+
+    def patch(self, upload, offset, chunk, client=None):
+        return (client or self.client).patch(
+            f"/kyc-img/uploads/{upload.upload_id}/", chunk, content_type="application/offset+octet-stream",
+            headers={"Authorization": f"Token {self.token.key}", "Upload-Offset": str(offset)},
+            CONTENT_LENGTH=str(len(chunk)),
+        )
+
+    def test_chunks_are_assembled_into_the_kyc_image(self):
+        upload = self.start(self.data)
+        half = len(self.data) // 2
+        self.assertEqual(self.patch(upload, 0, self.data[:half]).json()["received"], half)
+        self.assertEqual(self.patch(upload, 0, self.data[:half]).status_code, 409)
+        self.assertEqual(self.patch(upload, half, self.data[half:]).status_code, 201)
+        self.assertTrue(KYC.objects.get(user=self.user).user_image)
+        self.assertFalse(os.path.exists(uploads.upload_temp_path(upload)))
+        self.assertEqual(self.patch(upload, len(self.data), b"").status_code, 409)
+
+    def test_upload_completes_once_the_kyc_profile_exists(self):
+        upload = self.start(self.data)
+        KYC.objects.all().delete()
+        self.assertEqual(self.patch(upload, 0, self.data).status_code, 400)
+        self.assertTrue(os.path.exists(uploads.upload_temp_path(upload)))
+
+        KYC.objects.create(user=self.user, pan_number="ABCDE1234F")
+        self.assertEqual(self.patch(upload, len(self.data), b"").status_code, 201)
+        upload.refresh_from_db()
+        self.assertTrue(upload.completed)
+
+    def test_rejected_image_restarts_the_upload(self):
+        garbage = b"not an image" * 10
+        upload = self.start(garbage)
+        self.assertEqual(self.patch(upload, 0, garbage).status_code, 400)
+        upload.refresh_from_db()
+        self.assertEqual((upload.received, upload.completed), (0, False))
+        self.assertFalse(os.path.exists(uploads.upload_temp_path(upload)))
+        response = self.patch(upload, 0, garbage)
+        self.assertEqual(response.status_code, 400)
+
+    def test_lost_part_file_restarts_the_upload(self):
+        upload = self.start(self.data)
+        KYC.objects.all().delete()
+        self.patch(upload, 0, self.data)
+        os.remove(uploads.upload_temp_path(upload))
+        KYC.objects.create(user=self.user, pan_number="ABCDE1234F")
+        response = self.patch(upload, len(self.data), b"")
+        self.assertEqual((response.status_code, response.json()["received"]), (409, 0))
+        self.assertEqual(self.patch(upload, 0, self.data).status_code, 201)
+
+    def test_concurrent_chunks_at_one_offset_are_not_interleaved(self):
+        upload = self.start(self.data)
+        append_chunk = uploads.append_chunk
+        barrier = threading.Barrier(2)
+        responses = [None, None]
+
+        def slow_append(*args):
+            # Both requests are in flight before either writes.
+            time.sleep(0.2)
+            return append_chunk(*args)
+
+        def send(i, chunk):
+            try:
+                barrier.wait()
+                responses[i] = self.patch(upload, 0, chunk, Client())
+            finally:
+                connections.close_all()
+
+        chunks = [b"a" * 100, b"b" * 100]
+        with mock.patch("Accounts.uploads.append_chunk", slow_append):
+            threads = [threading.Thread(target=send, args=(i, chunk)) for i, chunk in enumerate(chunks)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200, 409])
+        winner = chunks[[response.status_code for response in responses].index(200)]
+        with open(uploads.upload_temp_path(upload), "rb") as part:
+            self.assertEqual(part.read(), winner)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.media_root = temp_dir.name
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.storage = kyc_image_storage()
+        self.legacy_storage = storages["default"]
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, files in os.walk(self.media_root) for name in files
+        )
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save("user_images/a.JPG", ContentFile(b"same bytes"))
+        second = self.storage.save("user_images/b.jpg", ContentFile(b"same bytes"))
+        other = self.storage.save("user_images/c.jpg", ContentFile(b"other bytes"))
+        digest = hashlib.sha256(b"same bytes").hexdigest()
+        self.assertEqual(first, f"user_images/{digest[:2]}/{digest[2:4]}/{digest}.jpg")
+        self.assertEqual(second, first)
+        self.assertNotEqual(other, first)
+        self.assertEqual(self.stored_files(), sorted([first, other]))
+        self.assertTrue(self.storage.is_hashed_name(first))
+        self.assertFalse(self.storage.is_hashed_name("user_images/a.jpg"))
+
+    def kyc_with_legacy_images(self, i, image, thumbnail):
+        names = {}
+        for field, content in (("user_image", image), ("user_thumbnail", thumbnail)):
+            directory = KYC._meta.get_field(field).upload_to
+            names[field] = self.legacy_storage.save(f"{directory}kyc{i}.jpg", ContentFile(content))
+        user = User.objects.create(username=f"+91987654321{i}")
+        return KYC.objects.create(user=user, pan_number=f"ABCDE123{i}F", **names)
+
+    def migrate(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("migrate_kyc_images", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_migrate_kyc_images_moves_files_and_removes_duplicates(self):
+        kycs = [self.kyc_with_legacy_images(i, b"image", f"thumb {i}".encode()) for i in range(2)]
+        self.legacy_storage.save("user_images/orphan.jpg", ContentFile(b"orphan"))
+        self.migrate("--prune-orphans")
+
+        kycs = [KYC.objects.get(pk=kyc.pk) for kyc in kycs]
+        self.assertEqual(kycs[0].user_image.name, kycs[1].user_image.name)
+        self.assertNotEqual(kycs[0].user_thumbnail.name, kycs[1].user_thumbnail.name)
+        self.assertEqual(
+            self.stored_files(),
+            sorted([kycs[0].user_image.name, kycs[0].user_thumbnail.name, kycs[1].user_thumbnail.name]),
+        )
+        with kycs[1].user_image.open() as image:
+            self.assertEqual(image.read(), b"image")
+
+        stdout, _ = self.migrate()
+        self.assertIn("Migrated 0 KYC record(s)", stdout)
+
+    def test_dry_run_changes_nothing(self):
+        kyc = self.kyc_with_legacy_images(0, b"image", b"thumb")
+        files = self.stored_files()
+        stdout, _ = self.migrate("--dry-run")
+        self.assertIn(f"KYC {kyc.pk}: user_images/kyc0.jpg -> user_images/", stdout)
+        self.assertEqual(self.stored_files(), files)
+        self.assertEqual(KYC.objects.get(pk=kyc.pk).user_image.name, "user_images/kyc0.jpg")
+
+    def test_missing_files_are_skipped(self):
+        kyc = self.kyc_with_legacy_images(0, b"image", b"thumb")
+        self.legacy_storage.delete(kyc.user_image.name)
+        _, stderr = self.migrate()
+        self.assertIn(f"KYC {kyc.pk}: user_images/kyc0.jpg is missing, skipped", stderr)
+        kyc.refresh_from_db()
+        self.assertEqual(kyc.user_image.name, "user_images/kyc0.jpg")
+        self.assertTrue(self.storage.is_hashed_name(kyc.user_thumbnail.name))
+
+
+def metric_value(text, name, **labels):
+    """The value of one sample in Prometheus text output, or 0 if it is absent."""
+    label_text = ",".join(f'{label}="{value}"' for label, value in labels.items())
+    prefix = f"{name}{{{label_text}}} " if labels else f"{name} "
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="+919876543210")
+        self.headers = {"Authorization": f"Token {AuthToken.objects.create(user=self.user).key}"}
+
+    def metrics(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4")
+        return response.content.decode()
+
+    def test_requests_are_recorded_by_view(self):
+        before = self.metrics()
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # CaptureQueriesContext loses the log when request_started resets it.
+        with connections["default"].execute_wrapper(count_query):
+            response = self.client.get("/me/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        after = self.metrics()
+
+        def delta(name, **labels):
+            return metric_value(after, name, **labels) - metric_value(before, name, **labels)
+
+        self.assertEqual(delta("http_request_duration_seconds_count", view="me", method="GET", status="200"), 1)
+        self.assertEqual(delta("http_request_db_queries_sum", view="me"), len(queries))
+        self.assertEqual(delta("http_response_size_bytes_sum", view="me"), len(response.content))
+        self.assertEqual(delta("http_request_external_duration_seconds_sum", view="me"), 0)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", after)
+
+    def test_metrics_are_only_served_to_allowed_ips(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.7")
+        self.assertEqual(response.status_code, 403)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "Test.", ["view"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, view="me")
+        self.assertEqual(histogram.collect(), [
+            "# HELP test_seconds Test.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{view="me",le="0.1"} 1',
+            'test_seconds_bucket{view="me",le="1"} 2',
+            'test_seconds_bucket{view="me",le="+Inf"} 3',
+            'test_seconds_sum{view="me"} 5.55',
+            'test_seconds_count{view="me"} 3',
+        ])
+
+    def test_sampled_requests_are_profiled(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        with override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DUMP_DIR=temp_dir.name):
+            self.client.get("/me/", headers=self.headers)
+        self.assertEqual([name.split("-")[0] for name in os.listdir(temp_dir.name)], ["me"])
+
+
+class MeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210", first_name="Asha")
+        self.token = AuthToken.objects.create(user=self.user)
+
+    def me(self, **headers):
+        return self.client.get("/me/", headers={"Authorization": f"Token {self.token.key}", **headers})
+
+    def test_update_invalidates_on_commit(self):
+        first = self.me()
+        self.assertEqual(self.me(if_none_match=first["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Asha Rao"
+            self.user.save()
+
+        response = self.me(if_none_match=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user_profile"]["name"], "Asha Rao")
+
+    def test_rebuild_racing_an_update_is_not_served(self):
+        def build_then_update(user_id):
+            payload = build_me_payload(user_id)
+            # The update commits while this rebuild still holds old rows.
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.filter(pk=user_id).update(first_name="Asha Rao")
+                invalidate_me(user_id)
+            return payload
+
+        with mock.patch("Accounts.profile_cache.build_me_payload", build_then_update):
+            etag, body = get_me(self.user.pk)
+        self.assertIn(b'"Asha"', body)
+        self.assertIn(b'"Asha Rao"', get_me(self.user.pk)[1])
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+        self.token = AuthToken.objects.create(user=self.user)
+        self.headers = {"Authorization": f"Token {self.token.key}"}
+
+    def worker(self):
+        """Run as a separate worker process would, with a token cache of its own."""
+        return mock.patch("Accounts.authentication._token_cache", DjangoTokenCache())
+
+    def test_logout_is_seen_by_other_workers(self):
+        first, second = self.worker(), self.worker()
+        with first:
+            self.assertEqual(self.client.get("/me/", headers=self.headers).status_code, 200)
+        with second:
+            self.assertEqual(self.client.post("/logout/", headers=self.headers).status_code, 204)
+        with first:
+            self.assertEqual(self.client.get("/me/", headers=self.headers).status_code, 401)
+
+    def test_rotated_key_is_refused_by_other_workers(self):
+        first, second = self.worker(), self.worker()
+        with first:
+            self.assertEqual(self.client.get("/me/", headers=self.headers).status_code, 200)
+        with second:
+            new_key = self.client.post("/token/rotate/", headers=self.headers).json()["token"]
+        with first:
+            self.assertEqual(self.client.get("/me/", headers=self.headers).status_code, 401)
+            self.assertEqual(self.client.get("/me/", headers={"Authorization": f"Token {new_key}"}).status_code, 200)
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS, THROTTLING={**settings.THROTTLING, "RATES": {}}, AUTH_TOKEN_MAX_PER_USER=3
+)
+class TokenIssueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="+919876543210", password="s3cret-pass")
+        UserProfile.objects.create(user=self.user, is_verified=True)
+
+    def login(self, url):
+        response = self.client.post(
+            url, {"phone_number": "+919876543210", "password": "s3cret-pass"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["token"]
+
+    def test_logins_keep_only_the_newest_tokens(self):
+        for url in ("/login/", "/async/login/"):
+            with self.subTest(url=url):
+                keys = [self.login(url) for _ in range(5)]
+                self.assertEqual(set(AuthToken.objects.filter(user=self.user).values_list("key", flat=True)), set(keys[-3:]))
+                response = self.client.get("/me/", headers={"Authorization": f"Token {keys[0]}"})
+                self.assertEqual(response.status_code, 401)
+
+    def test_login_deletes_expired_tokens(self):
+        expired = AuthToken.objects.create(user=self.user, expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        key = self.login("/login/")
+        self.assertQuerySetEqual(AuthToken.objects.filter(user=self.user).values_list("key", flat=True), [key])
+        self.assertFalse(AuthToken.objects.filter(key=expired.key).exists())
+
+
+class TokenLifecycleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="+919876543210")
+
+    def me(self, key, url="/me/"):
+        return self.client.get(url, headers={"Authorization": f"Token {key}"})
+
+    def test_logout_revokes_the_token(self):
+        for url in ("/logout/", "/async/logout/"):
+            with self.subTest(url=url):
+                token = AuthToken.objects.create(user=self.user)
+                self.assertEqual(self.me(token.key).status_code, 200)
+                response = self.client.post(url, headers={"Authorization": f"Token {token.key}"})
+                self.assertEqual(response.status_code, 204)
+                self.assertFalse(AuthToken.objects.filter(key=token.key).exists())
+                self.assertEqual(self.me(token.key).status_code, 401)
+
+    def test_rotate_replaces_the_token_with_a_fresh_expiry(self):
+        for url in ("/token/rotate/", "/async/token/rotate/"):
+            with self.subTest(url=url):
+                token = AuthToken.objects.create(user=self.user, expires_at=timezone.now() + datetime.timedelta(minutes=1))
+                self.assertEqual(self.me(token.key).status_code, 200)
+                response = self.client.post(url, headers={"Authorization": f"Token {token.key}"})
+                self.assertEqual(response.status_code, 200)
+                new_token = AuthToken.objects.get(key=response.json()["token"])
+                self.assertGreater(new_token.expires_at, timezone.now() + datetime.timedelta(days=1))
+                self.assertEqual(self.me(token.key).status_code, 401)
+                self.assertEqual(self.me(new_token.key).status_code, 200)
+
+    def test_expired_token_is_refused_even_when_cached(self):
+        token = AuthToken.objects.create(user=self.user, expires_at=timezone.now() + datetime.timedelta(seconds=60))
+        self.assertEqual(self.me(token.key).status_code, 200)
+        with mock.patch("django.utils.timezone.now", return_value=token.expires_at):
+            response = self.me(token.key)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"detail": "Token has expired."})
+
+
+class DjangoTokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.token_cache = DjangoTokenCache()
+        self.user = User.objects.create(username="+919876543210")
+
+    def test_delete_user_evicts_every_token(self):
+        tokens = [AuthToken.objects.create(user=self.user) for _ in range(3)]
+        for token in tokens:
+            self.token_cache.set(token.key, token)
+        self.assertEqual(self.token_cache.get(tokens[0].key), tokens[0])
+
+        self.token_cache.delete_user(self.user.pk)
+        self.assertEqual([self.token_cache.get(token.key) for token in tokens], [None] * 3)
+
+    def test_delete_user_keeps_other_users_tokens(self):
+        other = AuthToken.objects.create(user=User.objects.create(username="+919876543211"))
+        self.token_cache.set(other.key, other)
+        self.token_cache.delete_user(self.user.pk)
+        self.assertEqual(self.token_cache.get(other.key), other)
+
+    def test_hit_is_one_cache_read(self):
+        token = AuthToken.objects.create(user=self.user)
+        self.token_cache.set(token.key, token)
+        with mock.patch.object(self.token_cache.cache, "get", wraps=self.token_cache.cache.get) as get:
+            self.assertEqual(self.token_cache.get(token.key), token)
+        self.assertEqual(get.call_count, 1)
+
+    def test_deactivated_user_is_refused_on_every_token(self):
+        tokens = [AuthToken.objects.create(user=self.user) for _ in range(2)]
+        for token in tokens:
+            self.assertEqual(self.client.get("/me/", headers={"Authorization": f"Token {token.key}"}).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        for token in tokens:
+            self.assertEqual(self.client.get("/me/", headers={"Authorization": f"Token {token.key}"}).status_code, 401)
+
+
+class DecentroClientTests(TestCase):
+    """The pooled, cached client behind the bank-details views."""
+
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("decentro-test")
+
+    def client_for(self, server, **kwargs):
+        return DecentroClient(base_url=server.url, max_retries=0, breaker=self.breaker, **kwargs)
+
+    def test_accounts_are_cached_per_phone_number(self):
+        with DecentroStubServer() as server:
+            client = self.client_for(server, cache_ttl=60)
+            first = client.fetch_accounts("+919876543210", "ref-1")
+            self.assertEqual(client.fetch_accounts("+919876543210", "ref-2"), first)
+            self.assertEqual(server.requests_received, 1)
+
+            client.fetch_accounts("+919876543211", "ref-3")
+            client.fetch_accounts("+919876543210", "ref-4", use_cache=False)
+            self.assertEqual(server.requests_received, 3)
+
+            client.invalidate("+919876543210")
+            client.fetch_accounts("+919876543210", "ref-5")
+            self.assertEqual(server.requests_received, 4)
+
+    def test_empty_results_are_not_cached(self):
+        with DecentroStubServer(accounts_for=lambda mobile: []) as server:
+            client = self.client_for(server, cache_ttl=60)
+            for _ in range(2):
+                self.assertEqual(client.fetch_accounts("+919876543210", "ref"), [])
+        self.assertEqual(server.requests_received, 2)
+
+    def test_calls_reuse_pooled_connections(self):
+        with DecentroStubServer() as server:
+            client = self.client_for(server, cache_ttl=0)
+            for i in range(5):
+                client.fetch_accounts("+919876543210", f"ref-{i}")
+            client.close()
+        self.assertEqual((server.requests_received, len(server.peers)), (5, 1))
+
+    async def test_async_calls_share_the_cache_and_connections(self):
+        with DecentroStubServer() as server:
+            client = self.client_for(server, cache_ttl=60)
+            accounts = await sync_to_async(client.fetch_accounts)("+919876543210", "ref-1")
+            self.assertEqual(await client.afetch_accounts("+919876543210", "ref-2"), accounts)
+            self.assertEqual(server.requests_received, 1)
+
+            for i in range(3):
+                await client.afetch_accounts("+919876543211", f"ref-{i}", use_cache=False)
+            await client.async_client().aclose()
+        self.assertEqual(server.requests_received, 4)
+        self.assertEqual(len(server.peers), 2)
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("decentro-test", failure_threshold=3, recovery_timeout=30)
+
+    def client_for(self, server, **kwargs):
+        return DecentroClient(
+            base_url=server.url, max_retries=2, retry_backoff=0, cache_ttl=0, breaker=self.breaker, **kwargs
+        )
+
+    def fetch(self, client):
+        return client.fetch_accounts("+919876543210", "ref")
+
+    def later(self, seconds):
+        """Run as if `seconds` had passed since the circuit opened."""
+        return mock.patch("Accounts.circuit.time.time", return_value=time.time() + seconds)
+
+    def test_server_errors_are_retried_and_open_the_circuit(self):
+        with DecentroStubServer(failure_rate=1, error_status=500) as server:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.fetch(self.client_for(server))
+            self.assertEqual(server.requests_received, 3)
+            self.assertEqual(self.breaker.state()[0], OPEN)
+
+            with self.assertRaises(CircuitOpenError):
+                self.fetch(self.client_for(server))
+            self.assertEqual(server.requests_received, 3)
+
+    def test_client_errors_are_not_retried_or_counted(self):
+        with DecentroStubServer(failure_rate=1, error_status=400) as server:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.fetch(self.client_for(server))
+        self.assertEqual(server.requests_received, 1)
+        self.assertIsNone(cache.get(self.breaker.failures_key))
+
+    def test_successful_probe_closes_the_circuit(self):
+        with DecentroStubServer(failure_rate=1, error_status=500) as server:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.fetch(self.client_for(server))
+            server.failure_rate = 0
+            with self.later(31):
+                self.assertEqual(len(self.fetch(self.client_for(server))), 1)
+        self.assertEqual(self.breaker.state()[0], CLOSED)
+
+    def test_failed_probe_opens_the_circuit_again(self):
+        with DecentroStubServer(failure_rate=1, error_status=500) as server:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.fetch(self.client_for(server))
+            received = server.requests_received
+            with self.later(31):
+                # Its retry finds the circuit open again, so only the probe is sent.
+                with self.assertRaises(requests.exceptions.RequestException):
+                    self.fetch(self.client_for(server))
+                self.assertEqual(server.requests_received, received + 1)
+                self.assertEqual(self.breaker.state()[0], OPEN)
+                self.assertLess(self.breaker.state()[1], 1)
+
+    def test_only_one_probe_is_let_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        with self.later(31):
+            self.breaker.before_call()
+            self.assertEqual(self.breaker.state()[0], HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.before_call()
+
+
+class HedgedCallTests(TestCase):
+    """A hedged call is one call to the circuit breaker, however many requests it sends."""
+
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("decentro-test", failure_threshold=2)
+
+    def client_for(self, server):
+        return DecentroClient(base_url=server.url, hedge_delay=0.02, max_retries=0, cache_ttl=0, breaker=self.breaker)
+
+    async def test_failed_hedge_is_one_failure(self):
+        with DecentroStubServer(delay=0.1, failure_rate=1, error_status=500) as server:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                await self.client_for(server).afetch_accounts("+919876543210", "ref")
+        self.assertEqual(server.requests_received, 2)
+        self.assertEqual(await cache.aget(self.breaker.failures_key), 1)
+        self.assertEqual((await sync_to_async(self.breaker.state)())[0], CLOSED)
+
+    async def test_cancelled_request_records_nothing(self):
+        with DecentroStubServer(delay=0.1) as server:
+            accounts = await self.client_for(server).afetch_accounts("+919876543210", "ref")
+        self.assertEqual(len(accounts), 1)
+        self.assertIsNone(await cache.aget(self.breaker.failures_key))
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_output_matches_drf_renderer(self):
+        data = {
+            "name": "Ašha \u2028 Rao\u2029",
+            "amount": Decimal("12.50"),
+            "ratio": 0.25,
+            "updated_at": datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            "kyc": None,
+            "tpap": ["paytm", "gpay"],
+            "nested": [{"id": 1, "ok": True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_numbers_are_written_as_null(self):
+        # DRF raises ValueError instead; see FastJSONRenderer.
+        self.assertEqual(FastJSONRenderer().render({"value": float("nan")}), b'{"value":null}')
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Routes against two SQLite databases; the replica has not seen the primary's row yet."""
+
+    # Lets the test's own SQLite connections open; the test database is not used.
+    databases = {"default"}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.connections = ConnectionHandler({
+            alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(tmp.name, f"{alias}.sqlite3")}
+            for alias in ("default", "replica")
+        })
+        self.addCleanup(self.connections.close_all)
+        for alias in ("default", "replica"):
+            with self.connections[alias].cursor() as cursor:
+                cursor.execute("CREATE TABLE profile (id integer)")
+        with self.connections["default"].cursor() as cursor:
+            cursor.execute("INSERT INTO profile VALUES (1)")
+        for target in ("bitfiat.routers.connections", "django.db.transaction.connections"):
+            patcher = mock.patch(target, self.connections)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        request_started.send(sender=None)
+        self.router = PrimaryReplicaRouter()
+
+    def read(self, model):
+        with self.connections[self.router.db_for_read(model)].cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM profile")
+            return cursor.fetchone()[0]
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.router.db_for_read(UserProfile), "replica")
+        self.assertEqual(self.read(UserProfile), 0)
+
+    def test_reads_after_a_write_stay_on_the_primary_until_the_next_request(self):
+        self.assertEqual(self.router.db_for_write(UserProfile), "default")
+        self.assertEqual(self.read(UserProfile), 1)
+        request_started.send(sender=None)
+        self.assertEqual(self.read(UserProfile), 0)
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        with transaction.atomic(using="default"):
+            self.assertEqual(self.read(UserProfile), 1)
+
+    def test_token_and_job_reads_use_the_primary(self):
+        for model in (AuthToken, BankDetailsFetchJob, KYCImageUpload):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self.read(model), 1)
+
+    def test_a_write_does_not_pin_other_threads(self):
+        self.router.db_for_write(UserProfile)
+        routed = []
+        thread = threading.Thread(target=lambda: routed.append(self.router.db_for_read(UserProfile)))
+        thread.start()
+        thread.join()
+        self.assertEqual(routed, ["replica"])
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from .validators import normalize_phone_number
+
+
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """Parse "<requests>/<period>" (e.g. "5/min") into (limit, seconds)."""
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class LocMemThrottleStore:
+    """
+    Per-process token buckets. Each key holds up to `limit` tokens refilled at
+    `limit / period` per second; the least recently used keys are dropped past
+    `max_entries`, which only ever forgives a client.
+    """
+
+    def __init__(self, max_entries=100000, **kwargs):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period):
+        """Take a token for `key`; return None if allowed, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * limit / period)
+            if tokens >= 1:
+                tokens -= 1
+                wait = None
+            else:
+                wait = (1 - tokens) * period / limit
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheThrottleStore:
+    """
+    Sliding-window counters in a Django cache alias, shared by every process
+    using the same cache server. The count for the trailing `period` is
+    estimated from the current and previous fixed windows.
+    """
+
+    prefix = "throttle:"
+
+    def __init__(self, cache_alias="default", **kwargs):
+        self.cache = caches[cache_alias]
+
+    def hit(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        current_key = f"{self.prefix}{key}:{window}"
+        previous_key = f"{self.prefix}{key}:{window - 1}"
+        counts = self.cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+
+        elapsed = now - window * period
+        if current >= limit:
+            return period - elapsed
+        if previous * (1 - elapsed / period) + current >= limit:
+            # Wait until enough of the previous window has slid out.
+            return max(0.0, period * (1 - (limit - current) / previous) - elapsed)
+
+        if not self.cache.add(current_key, 1, 2 * period):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                self.cache.set(current_key, 1, 2 * period)
+        return None
+
+    def clear(self):
+        pass
+
+
+THROTTLE_BACKENDS = {
+    "locmem": LocMemThrottleStore,
+    "django": CacheThrottleStore,
+}
+
+_throttle_store = None
+_throttle_store_lock = threading.Lock()
+
+def get_throttle_store():
+    global _throttle_store
+    if _throttle_store is None:
+        with _throttle_store_lock:
+            if _throttle_store is None:
+                options = {
+                    key.lower(): value for key, value in settings.THROTTLING.items() if key != "RATES"
+                }
+                backend = THROTTLE_BACKENDS[options.pop("backend", "locmem")]
+                _throttle_store = backend(**options)
+    return _throttle_store
+
+
+@receiver(setting_changed)
+def reset_throttle_store(setting, **kwargs):
+    global _throttle_store
+    if setting == "THROTTLING":
+        _throttle_store = None
+
+
+class ScopedBucketThrottle(BaseThrottle):
+    """
+    Throttle keyed by one attribute of the request, with the budget read from
+    THROTTLING["RATES"][view.throttle_scope][kind]. Only request headers and
+    the parsed body are looked at, so a rejected request costs no database
+    query or password hash.
+    """
+
+    kind = None
+
+    def get_ident_value(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        rate = settings.THROTTLING["RATES"].get(scope, {}).get(self.kind)
+        if not rate:
+            return True
+        value = self.get_ident_value(request)
+        if not value:
+            return True
+
+        limit, period = parse_rate(rate)
+        self._wait = get_throttle_store().hit(f"{scope}:{self.kind}:{value}", limit, period)
+        if self._wait is None:
+            return True
+        logger.warning("Request throttled", extra={"scope": scope, "throttle": self.kind})
+        return False
+
+    def wait(self):
+        return self._wait
+
+    def get_client_ip(self, request):
+        # Without NUM_PROXIES, DRF's get_ident() trusts whatever
+        # X-Forwarded-For the client sends, which would let it pick a fresh
+        # bucket per request.
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get("REMOTE_ADDR")
+        return self.get_ident(request)
+
+
+class IPRateThrottle(ScopedBucketThrottle):
+    kind = "ip"
+
+    def get_ident_value(self, request):
+        return self.get_client_ip(request)
+
+
+class PhoneNumberRateThrottle(ScopedBucketThrottle):
+    kind = "phone"
+
+    def get_ident_value(self, request):
+        if not isinstance(request.data, Mapping):
+            return self.get_client_ip(request)
+        # Every spelling of a number shares one budget.
+        return normalize_phone_number(request.data.get("phone_number"))
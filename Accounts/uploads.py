@@ -0,0 +1,130 @@
+import math
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from .models import KYCImageUpload
+
+
+
+class UploadOffsetMismatch(Exception):
+    pass
+
+
+class UploadDataLost(Exception):
+    """The part file no longer holds the bytes acknowledged so far."""
+
+
+def upload_temp_path(upload):
+    return os.path.join(settings.KYC_UPLOAD_TEMP_DIR, f"{upload.upload_id}.part")
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Stream `length` bytes from `stream` onto the end of the upload's part
+    file, reading at most KYC_UPLOAD_BUFFER_SIZE bytes at a time so memory use
+    does not depend on the chunk size. Returns the new offset.
+    """
+    if offset != upload.received:
+        raise UploadOffsetMismatch(upload.received)
+
+    length = min(length, upload.total_size - upload.received)
+    os.makedirs(settings.KYC_UPLOAD_TEMP_DIR, exist_ok=True)
+    path = upload_temp_path(upload)
+
+    written = 0
+    with open(path, "ab") as part:
+        if part.seek(0, os.SEEK_END) < upload.received:
+            raise UploadDataLost(upload.upload_id)
+        # A previous chunk may have been cut off mid-write; resume from the
+        # last acknowledged offset.
+        part.truncate(upload.received)
+        while written < length:
+            buffer = stream.read(min(settings.KYC_UPLOAD_BUFFER_SIZE, length - written))
+            if not buffer:
+                break
+            part.write(buffer)
+            written += len(buffer)
+
+    upload.received += written
+    return upload.received
+
+
+def receive_chunk(upload, stream, offset, length):
+    """
+    Append a chunk at `offset` with append_chunk and save the new offset.
+    The offset is claimed first with a conditional UPDATE, which locks the
+    row (the database, on SQLite) until the chunk is saved; a concurrent
+    request for the same offset then matches no row and gets
+    UploadOffsetMismatch instead of interleaving its bytes with this one's.
+    """
+    with transaction.atomic():
+        claimed = KYCImageUpload.objects.filter(pk=upload.pk, received=offset, completed=False).update(
+            updated_at=timezone.now()
+        )
+        if not claimed:
+            upload.refresh_from_db(fields=["received", "completed"])
+            raise UploadOffsetMismatch(upload.received)
+        upload.received = offset
+        append_chunk(upload, stream, offset, length)
+        upload.save(update_fields=["received", "updated_at"])
+    return upload.received
+
+
+def claim_completion(upload):
+    """Mark the upload completed unless another request already has; True when this one did."""
+    return bool(KYCImageUpload.objects.filter(pk=upload.pk, completed=False).update(completed=True, updated_at=timezone.now()))
+
+
+def restart_upload(upload):
+    """Discard the received bytes so the client uploads the file again from offset 0."""
+    try:
+        os.remove(upload_temp_path(upload))
+    except FileNotFoundError:
+        pass
+    KYCImageUpload.objects.filter(pk=upload.pk).update(received=0, completed=False, updated_at=timezone.now())
+    upload.received, upload.completed = 0, False
+
+
+def process_kyc_image(source):
+    """
+    Decode an uploaded KYC image, apply and strip its EXIF data, downscale it
+    to KYC_IMAGE_MAX_DIMENSION and re-encode it as JPEG. Returns the image and
+    a KYC_THUMBNAIL_SIZE thumbnail as in-memory files.
+    """
+    max_dimension = settings.KYC_IMAGE_MAX_DIMENSION
+    try:
+        with Image.open(source) as image:
+            # For JPEGs, let the decoder scale down by a power of two while
+            # decoding so the full-size bitmap is never held in memory.
+            scale = min(1, max_dimension / max(image.size))
+            image.draft("RGB", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGB")
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((settings.KYC_THUMBNAIL_SIZE, settings.KYC_THUMBNAIL_SIZE))
+
+            return encode_jpeg(image), encode_jpeg(thumbnail)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise serializers.ValidationError("Upload a valid image. The file you uploaded was either not an image or a corrupted image.")
+
+
+def encode_jpeg(image):
+    output = BytesIO()
+    # No exif= argument, so the re-encoded file carries no metadata.
+    image.save(output, format="JPEG", quality=settings.KYC_IMAGE_QUALITY, optimize=True)
+    return ContentFile(output.getvalue())
+
+
+def store_kyc_image(kyc, source):
+    image, thumbnail = process_kyc_image(source)
+    kyc.user_image.save(kyc.get_document_name(), image, save=False)
+    kyc.user_thumbnail.save(kyc.get_thumbnail_name(), thumbnail, save=False)
+    kyc.save()
+    return kyc
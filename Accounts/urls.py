@@ -1,15 +1,41 @@
 from django.urls import path
-from .views import UserProfileCreateAPIView, LoginAPIView, OtpVerificationAPIView, KYCPanAPIView, KYCImageAPIView, PhoneNumbrAPIView, PasswordAPIView, AddressAPIView, FetchBankDetailsAPIView
+from .async_views import AsyncUserProfileCreateAPIView, AsyncLoginAPIView, AsyncTokenRotateAPIView, AsyncLogoutAPIView, AsyncOtpRequestAPIView, AsyncOtpVerificationAPIView, AsyncKYCPanAPIView, AsyncKYCImageAPIView, AsyncPhoneNumbrAPIView, AsyncPasswordAPIView, AsyncAddressAPIView, AsyncFetchBankDetailsAPIView
+from .views import UserProfileCreateAPIView, MeAPIView, BulkUserImportAPIView, LoginAPIView, TokenRotateAPIView, LogoutAPIView, OtpRequestAPIView, OtpVerificationAPIView, KYCPanAPIView, KYCImageAPIView, KYCImageUploadAPIView, KYCImageUploadChunkAPIView, PhoneNumbrAPIView, PasswordAPIView, AddressAPIView, AddressBatchAPIView, PincodeAPIView, FetchBankDetailsAPIView, FetchBankDetailsStatusAPIView, metrics_view
 
 
 urlpatterns = [ 
     path('sign-up/', UserProfileCreateAPIView.as_view(), name="sign-up"),
+    path('users/import/', BulkUserImportAPIView.as_view(), name="users-import"),
+    path('me/', MeAPIView.as_view(), name="me"),
     path('login/', LoginAPIView.as_view(), name="login"),
+    path('token/rotate/', TokenRotateAPIView.as_view(), name="token-rotate"),
+    path('logout/', LogoutAPIView.as_view(), name="logout"),
+    path('otp/', OtpRequestAPIView.as_view(), name='otp'),
     path('otp-verification/', OtpVerificationAPIView.as_view(), name='otp-verification'),
     path('kyc-pan/', KYCPanAPIView.as_view(), name='kyc-pan'),
     path('kyc-img/', KYCImageAPIView.as_view(), name='kyc-img'),
+    path('kyc-img/uploads/', KYCImageUploadAPIView.as_view(), name='kyc-img-upload'),
+    path('kyc-img/uploads/<uuid:upload_id>/', KYCImageUploadChunkAPIView.as_view(), name='kyc-img-upload-chunk'),
     path('forgot-password/', PhoneNumbrAPIView.as_view(), name='forgot-password'),
     path('update-password/', PasswordAPIView.as_view(), name='update-password'),
     path('address/', AddressAPIView.as_view(), name='address'),
+    path('address/batch/', AddressBatchAPIView.as_view(), name='address-batch'),
+    path('pincode/<str:pincode>/', PincodeAPIView.as_view(), name='pincode'),
     path('fetch-bank-details/', FetchBankDetailsAPIView.as_view(), name='fetch-bank-details'),
+    path('fetch-bank-details/<str:reference_id>/', FetchBankDetailsStatusAPIView.as_view(), name='fetch-bank-details-status'),
+    path('metrics', metrics_view, name='metrics'),
+
+    # Async versions of the endpoints above, for ASGI deployments.
+    path('async/sign-up/', AsyncUserProfileCreateAPIView.as_view(), name="async-sign-up"),
+    path('async/login/', AsyncLoginAPIView.as_view(), name="async-login"),
+    path('async/token/rotate/', AsyncTokenRotateAPIView.as_view(), name="async-token-rotate"),
+    path('async/logout/', AsyncLogoutAPIView.as_view(), name="async-logout"),
+    path('async/otp/', AsyncOtpRequestAPIView.as_view(), name='async-otp'),
+    path('async/otp-verification/', AsyncOtpVerificationAPIView.as_view(), name='async-otp-verification'),
+    path('async/kyc-pan/', AsyncKYCPanAPIView.as_view(), name='async-kyc-pan'),
+    path('async/kyc-img/', AsyncKYCImageAPIView.as_view(), name='async-kyc-img'),
+    path('async/forgot-password/', AsyncPhoneNumbrAPIView.as_view(), name='async-forgot-password'),
+    path('async/update-password/', AsyncPasswordAPIView.as_view(), name='async-update-password'),
+    path('async/address/', AsyncAddressAPIView.as_view(), name='async-address'),
+    path('async/fetch-bank-details/', AsyncFetchBankDetailsAPIView.as_view(), name='async-fetch-bank-details'),
 ]
\ No newline at end of file
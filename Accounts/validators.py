@@ -0,0 +1,68 @@
+import re
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+
+
+PHONE_REGEX = re.compile(r'^\+?\d{10,15}$')
+EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PAN_REGEX = re.compile(r'^[A-Z]{5}[0-9]{4}[A-Z]{1}$')
+PINCODE_REGEX = re.compile(r'^\d{6}$')
+# Spaces, dashes, dots and brackets people type inside phone numbers.
+PHONE_SEPARATORS = re.compile(r'[\s\-.()]')
+
+PHONE_NUMBER_MESSAGE = "Invalid phone number format. It should be 10-15 digits."
+EMAIL_MESSAGE = "Invalid email format."
+PAN_MESSAGE = "Invalid PAN number format. It should be in the format: ABCDE1234F"
+PINCODE_MESSAGE = "Pincode must be exactly 6 digits."
+
+
+def normalize_phone_number(value, country_code=None):
+    """
+    Return `value` in E.164 form (+<country code><number>), or None if it is
+    not a phone number. A ten-digit national number, optionally with a
+    leading trunk 0, gets PHONE_DEFAULT_COUNTRY_CODE; longer numbers without
+    a + are taken to include their country code already.
+    """
+    if not isinstance(value, str):
+        return None
+    country_code = country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+    number = PHONE_SEPARATORS.sub('', value)
+    if number.startswith('00'):
+        number = '+' + number[2:]
+    if not PHONE_REGEX.match(number):
+        return None
+    if number.startswith('+'):
+        return number
+    if len(number) == 11 and number.startswith('0'):
+        number = number[1:]
+    if len(number) == 10:
+        return f"+{country_code}{number}"
+    return f"+{number}"
+
+
+def validate_phone_number(value):
+    """Validate a phone number and return its E.164 form."""
+    number = normalize_phone_number(value)
+    if number is None:
+        raise ValidationError(PHONE_NUMBER_MESSAGE)
+    return number
+
+
+def validate_email(value):
+    """Validate an email address and return it lower-cased."""
+    if not isinstance(value, str) or not EMAIL_REGEX.match(value):
+        raise ValidationError(EMAIL_MESSAGE)
+    return value.lower()
+
+
+def validate_pan_number(value):
+    if not isinstance(value, str) or not PAN_REGEX.match(value):
+        raise ValidationError(PAN_MESSAGE)
+    return value
+
+
+def validate_pincode(value):
+    if not isinstance(value, str) or not PINCODE_REGEX.match(value):
+        raise ValidationError(PINCODE_MESSAGE)
+    return value
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import UserProfile
+
+
+
+def verification_cache_key(user_id):
+    return f"verified:{user_id}"
+
+
+def is_user_verified(user):
+    """
+    Return the user's `is_verified` flag, reading UserProfile only on a cache
+    miss. Only a verified flag is cached: verification is one-way, so that
+    entry cannot go stale, while a cached False would keep a user out after
+    they verify on another worker. Users without a profile are treated as
+    unverified.
+    """
+    key = verification_cache_key(user.pk)
+    if cache.get(key):
+        return True
+    is_verified = UserProfile.objects.filter(user_id=user.pk).values_list('is_verified', flat=True).first()
+    if is_verified:
+        cache.set(key, True, settings.VERIFICATION_CACHE_TIMEOUT)
+    return bool(is_verified)
+
+
+def invalidate_verification(user_id):
+    cache.delete(verification_cache_key(user_id))
+
+
+async def ais_user_verified(user):
+    key = verification_cache_key(user.pk)
+    if await cache.aget(key):
+        return True
+    is_verified = await UserProfile.objects.filter(user_id=user.pk).values_list('is_verified', flat=True).afirst()
+    if is_verified:
+        await cache.aset(key, True, settings.VERIFICATION_CACHE_TIMEOUT)
+    return bool(is_verified)
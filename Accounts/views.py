@@ -1,39 +1,91 @@
-import re
+import logging
+import os
 import uuid
-import requests
+from collections.abc import Mapping
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django.shortcuts import render
 from django.core.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
-from .models import UserProfile, KYC, BankDetails
-from .serializers import UserProfileSerializer, OtpVerificationSerializer, KYCPanSerializer, KYCImageSerializer, PhoneNumberSerializer, PasswordSerializer, AddressSerializer, BankDetailsSerializer
-
-
-
-class UserProfileCreateAPIView(APIView):
+from .models import UserProfile, KYC, KYCImageUpload, BankDetails, BankDetailsFetchJob
+from .uploads import (
+    UploadDataLost, UploadOffsetMismatch, claim_completion, receive_chunk, restart_upload, store_kyc_image, upload_temp_path
+)
+from .jobs import enqueue_fetch_job, fetched_at, is_fresh, stored_bank_details
+from .decentro import get_client
+from .idempotency import IdempotentAPIMixin
+from .imports import count_lines, file_format, import_users
+from .authentication import CachedTokenAuthentication, invalidate_user, issue_token, revoke_token, rotate_token
+from .throttling import IPRateThrottle, PhoneNumberRateThrottle
+from .verification import is_user_verified
+from .otp import issue_otp
+from .sms import SMSError
+from .metrics import render_metrics
+from .pagination import KeysetPagination
+from .validators import validate_phone_number
+from .pincodes import get_pincode_index
+from .profile_cache import get_me
+from .serializers import UserProfileSerializer, OtpVerificationSerializer, KYCPanSerializer, KYCImageSerializer, KYCImageUploadSerializer, PhoneNumberSerializer, PasswordSerializer, AddressSerializer, BankDetailsSerializer
+from .serializers import invalid_data_errors, user_profile_data, verification_data, kyc_pan_data, kyc_image_data, kyc_image_upload_data, address_data
+
+
+
+logger = logging.getLogger(__name__)
+
+
+def send_otp(user):
+    """Text a verification code to a new user; they can ask for another at /otp/."""
+    try:
+        issue_otp(user.pk, user.username)
+    except SMSError:
+        logger.exception("OTP not sent", extra={"user_id": user.pk})
+
+
+class UserProfileCreateAPIView(IdempotentAPIMixin, APIView):
     def post(self, request):
-        print("data_1:", request.data)
+        logger.debug("Sign-up request", extra={"fields": sorted(request.data.keys())})
         serializer = UserProfileSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()  
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
+            send_otp(user)
 
             response_data = {
-                "user_profile": UserProfileSerializer(user).data,
+                "user_profile": user_profile_data(user),
                 "token": token.key
             }
             return Response(response_data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]  
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'sign-up'
+
+    # Sign-up is open and throttled; only profile updates require a token.
+    # POST skips authentication so a throttled request never reaches the
+    # token lookup.
+    def get_authenticators(self):
+        if self.request.method == 'POST':
+            return []
+        return super().get_authenticators()
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [AllowAny()]
+        return super().get_permissions()
+
+    def get_throttles(self):
+        if self.request.method == 'POST':
+            return super().get_throttles()
+        return []
 
     def put(self, request):
         user = request.user  
@@ -45,7 +97,7 @@ class UserProfileCreateAPIView(APIView):
             user_profile = updated_user.userprofile
             response_data = {
                 "message": "Profile updated successfully",
-                "user_profile": serializer.data,
+                "user_profile": user_profile_data(updated_user),
                 "is_verified": user_profile.is_verified  # Add is_verified field
             }
 
@@ -54,14 +106,50 @@ class UserProfileCreateAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkUserImportAPIView(APIView):
+    """
+    Staff-only import of partner user lists. The `file` upload is a CSV with
+    a phone_number,name,email[,password] header or a .jsonl file with one
+    object per line; it is streamed from the temporary upload file in batches.
+    Files over USER_IMPORT_MAX_REQUEST_ROWS lines are refused, since their
+    passwords would be hashed inside the request; they go through
+    `manage.py import_users`, which hashes in a process pool.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({"file": ["A CSV or JSONL file is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        if count_lines(uploaded_file) > settings.USER_IMPORT_MAX_REQUEST_ROWS:
+            return Response({"file": [
+                f"Files over {settings.USER_IMPORT_MAX_REQUEST_ROWS} lines must be imported with `manage.py import_users`."
+            ]}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        result = import_users(
+            uploaded_file,
+            format=file_format(uploaded_file.name),
+            batch_size=settings.USER_IMPORT_BATCH_SIZE,
+            workers=settings.USER_IMPORT_HASH_WORKERS,
+            verified=request.data.get('verified') in ('true', 'True', '1'),
+        )
+        logger.info("Users imported", extra={"users_created": result.created, "duplicates": result.duplicates, "invalid": result.invalid})
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
 class LoginAPIView(APIView):
+    authentication_classes = []
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'login'
+
     def validate_phone_number(self, value):
-        phone_regex = r'^\+?\d{10,15}$'  
-        if not re.match(phone_regex, value):
-            raise ValidationError("Invalid phone number format. It should be 10-15 digits.")
-        return value
+        return validate_phone_number(value)
     
     def post(self, request):
+        if not isinstance(request.data, Mapping):
+            return Response(invalid_data_errors(request.data), status=status.HTTP_400_BAD_REQUEST)
         phone_number = request.data.get('phone_number')
         password = request.data.get('password')
 
@@ -69,40 +157,105 @@ class LoginAPIView(APIView):
             return Response({"detail" : "Phone number and password are required."}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            self.validate_phone_number(phone_number)
+            phone_number = self.validate_phone_number(phone_number)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        user = authenticate(username=phone_number, password=password)
-        
-        if user is not None:
-            user_profile = UserProfile.objects.get(user=user)
-            if user_profile.is_verified:
-                token, created = Token.objects.get_or_create(user=user)
-
-                return Response({
-                    'token':token.key},
-                    status =status.HTTP_200_OK) 
-            else:
-                return Response({
-                 "detail": "Phone number is not verified."},
+        user = User.objects.filter(username=phone_number).first()
+
+        if user is None or not user.is_active:
+            # Hash anyway so unknown numbers take as long as wrong passwords.
+            User().set_password(password)
+            return Response({
+                 "detail": "Invalid credentials."},
                 status=status.HTTP_401_UNAUTHORIZED)
 
-        else:
+        # check_password() rehashes with the preferred PASSWORD_HASHERS entry
+        # when the stored hash uses an older algorithm or cost.
+        if not user.check_password(password):
             return Response({
                  "detail": "Invalid credentials."},
                 status=status.HTTP_401_UNAUTHORIZED)
+
+        if not is_user_verified(user):
+            return Response({
+                 "detail": "Phone number is not verified."},
+                status=status.HTTP_401_UNAUTHORIZED)
+
+        token = issue_token(user)
+
+        return Response({
+            'token':token.key},
+            status =status.HTTP_200_OK) 
         
 
+class TokenRotateAPIView(APIView):
+    """
+    Swap the presented token for a new one with a fresh expiry. The old key
+    stops working immediately.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        token = rotate_token(request.auth)
+        return Response({'token': token.key, 'expires_at': token.expires_at}, status=status.HTTP_200_OK)
+
+
+class LogoutAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MeAPIView(APIView):
+    """
+    Profile, verification flag, KYC, addresses and bank details in one
+    response, served from a per-user cache entry. Clients send the ETag back
+    in If-None-Match and get a 304 while nothing has changed.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        etag, body = get_me(request.user.pk)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            return HttpResponseNotModified(headers=headers)
+        return HttpResponse(body, content_type='application/json', headers=headers)
+
+
+class OtpRequestAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            wait = issue_otp(request.user.pk, request.user.username)
+        except SMSError:
+            logger.exception("OTP not sent", extra={"user_id": request.user.pk})
+            return Response({"detail": "Could not send the OTP. Try again later."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if wait is not None:
+            raise Throttled(wait)
+
+        return Response({"message": "OTP sent.", "expires_in": settings.OTP["TIMEOUT"]}, status=status.HTTP_200_OK)
+
+
 class OtpVerificationAPIView(APIView):
-    authentication_classes = [TokenAuthentication]  
+    authentication_classes = [CachedTokenAuthentication]  
     permission_classes = [IsAuthenticated] 
     def post(self, request):
         serializer = OtpVerificationSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             userprofile = serializer.save()
             response_data = {
-                "userprofile": OtpVerificationSerializer(userprofile).data
+                "userprofile": verification_data(userprofile)
             }
 
             return Response(response_data, status=status.HTTP_201_CREATED)
@@ -110,8 +263,8 @@ class OtpVerificationAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class KYCPanAPIView(APIView):
-    authentication_classes = [TokenAuthentication]  
+class KYCPanAPIView(IdempotentAPIMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]  
     permission_classes = [IsAuthenticated] 
 
     def post(self, request):
@@ -119,7 +272,7 @@ class KYCPanAPIView(APIView):
         if serializer.is_valid():
             kyc_pan = serializer.save()
             response_data = {
-                "kyc_pan" :  KYCPanSerializer(kyc_pan).data
+                "kyc_pan" :  kyc_pan_data(kyc_pan)
             }
 
             return Response(response_data, status=status.HTTP_201_CREATED)
@@ -127,7 +280,7 @@ class KYCPanAPIView(APIView):
 
 
 class KYCImageAPIView(APIView):
-    authentication_classes = [TokenAuthentication]  
+    authentication_classes = [CachedTokenAuthentication]  
     permission_classes = [IsAuthenticated] 
 
     def post(self, request):
@@ -135,21 +288,123 @@ class KYCImageAPIView(APIView):
         if serializer.is_valid():
             kyc_img = serializer.save()
             response_data = {
-                'kyc_img' : KYCImageSerializer(kyc_img).data
+                'kyc_img' : kyc_image_data(kyc_img)
             }
 
             return Response(response_data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+class KYCImageUploadAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = KYCImageUploadSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            upload = serializer.save()
+            response_data = kyc_image_upload_data(upload)
+            response_data['chunk_size'] = settings.KYC_UPLOAD_CHUNK_SIZE
+
+            return Response(response_data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+UPLOAD_LOST_MESSAGE = "The uploaded bytes were lost; upload the file again from offset 0."
+
+
+class KYCImageUploadChunkAPIView(APIView):
+    """
+    Resumable upload of a KYC image. Each PATCH carries the raw bytes of one
+    chunk and an `Upload-Offset` header matching the bytes received so far; a
+    client that lost its connection asks for the offset with GET and resumes.
+    The body is streamed to disk and never parsed into request.data.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, request, upload_id):
+        return KYCImageUpload.objects.filter(upload_id=upload_id, user=request.user).first()
+
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({"detail": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(kyc_image_upload_data(upload), status=status.HTTP_200_OK)
+
+    def patch(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({"detail": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        if upload.completed:
+            return Response({"detail": "Upload already completed."}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({"detail": "Upload-Offset and Content-Length headers are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            receive_chunk(upload, request.stream, offset, length)
+        except UploadOffsetMismatch:
+            if upload.completed:
+                return Response({"detail": "Upload already completed."}, status=status.HTTP_409_CONFLICT)
+            return Response({
+                "detail": "Upload-Offset does not match the bytes received.",
+                "received": upload.received
+            }, status=status.HTTP_409_CONFLICT)
+        except UploadDataLost:
+            restart_upload(upload)
+            return Response({"detail": UPLOAD_LOST_MESSAGE, "received": 0}, status=status.HTTP_409_CONFLICT)
+
+        if upload.received < upload.total_size:
+            return Response(kyc_image_upload_data(upload), status=status.HTTP_200_OK)
+
+        # The part file is kept until the image is stored, so once the KYC
+        # profile exists an empty PATCH at the final offset completes it.
+        kyc = KYC.objects.filter(user=request.user).first()
+        if kyc is None:
+            return Response({"detail": "KYC profile not found for this user."}, status=status.HTTP_400_BAD_REQUEST)
+        if not claim_completion(upload):
+            return Response({"detail": "Upload already completed."}, status=status.HTTP_409_CONFLICT)
+
+        path = upload_temp_path(upload)
+        try:
+            with open(path, 'rb') as source:
+                kyc = store_kyc_image(kyc, source)
+        except FileNotFoundError:
+            restart_upload(upload)
+            return Response({"detail": UPLOAD_LOST_MESSAGE, "received": 0}, status=status.HTTP_409_CONFLICT)
+        except serializers.ValidationError:
+            # Not an image: resending the same bytes cannot succeed.
+            restart_upload(upload)
+            raise
+        except Exception:
+            KYCImageUpload.objects.filter(pk=upload.pk).update(completed=False)
+            raise
+        os.remove(path)
+
+        response_data = {
+            'kyc_img' : kyc_image_data(kyc)
+        }
+
+        return Response(response_data, status=status.HTTP_201_CREATED)
+    
+
 class PhoneNumbrAPIView(APIView):
+    authentication_classes = []
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'forgot-password'
+
     def post(self, request):
         serializer = PhoneNumberSerializer(data=request.data)
         if serializer.is_valid():
             phone_number = serializer.validated_data['phone_number']
             user = User.objects.get(username = phone_number)
 
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
 
             response_data = {
                 'token': token.key
@@ -159,7 +414,7 @@ class PhoneNumbrAPIView(APIView):
     
 
 class PasswordAPIView(APIView):
-    authentication_classes = [TokenAuthentication]  
+    authentication_classes = [CachedTokenAuthentication]  
     permission_classes = [IsAuthenticated] 
     
     def post(self, request):
@@ -168,24 +423,31 @@ class PasswordAPIView(APIView):
             password = serializer.validated_data['password']
 
             user = request.user
-            print("user:", user)
+            logger.info("Password updated", extra={"user_id": user.pk})
             user.set_password(password)
             user.save()
+            invalidate_user(user)
             return Response({"message": "Password has been updated successfully."}, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AddressAPIView(APIView):
-    authentication_classes = [TokenAuthentication]  
+class AddressAPIView(IdempotentAPIMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]  
     permission_classes = [IsAuthenticated] 
+
+    def get(self, request):
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(request.user.addresses.all(), request, view=self)
+        return paginator.get_paginated_response([address_data(address) for address in page])
+
     def post(self, request):
         serializer = AddressSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             address = serializer.save()
 
             response_data = {
-                "address": AddressSerializer(address).data
+                "address": address_data(address)
             }
             
             return Response(response_data, status=status.HTTP_201_CREATED)
@@ -193,85 +455,159 @@ class AddressAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-DECENTRO_BASE_URL = "https://in.staging.decentro.tech/v2/financial_services/mobile_to_vpa/advance"
-CLIENT_ID = "Kaiztren_0_sop"
-CLIENT_SECRET = "e67052de696541a28bb545f185a02af5"
-MODULE_SECRET = "HmNIAyKZOq3cH82Z24rIZ6QxI9uk2KTX" 
+class AddressBatchAPIView(IdempotentAPIMixin, APIView):
+    """Validate a list of addresses and insert them with one bulk_create."""
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = AddressSerializer(
+            data=request.data, many=True, max_length=settings.ADDRESS_BATCH_MAX_SIZE, allow_empty=False,
+            context={'request': request}
+        )
+        if serializer.is_valid():
+            addresses = serializer.save()
+
+            response_data = {
+                "addresses": [address_data(address) for address in addresses]
+            }
+
+            return Response(response_data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PincodeAPIView(APIView):
+    """City and state for a pincode, so clients can prefill address forms."""
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pincode):
+        index = get_pincode_index()
+        if index is None:
+            return Response({"detail": "Pincode lookup is not available."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        match = index.lookup(pincode)
+        if match is None:
+            return Response({"detail": "Unknown pincode."}, status=status.HTTP_404_NOT_FOUND)
+
+        state, city = match
+        return Response({"pincode": pincode, "city": city, "state": state}, status=status.HTTP_200_OK)
+
 
 def generate_reference_id():
     return str(uuid.uuid4())
 
-class FetchBankDetailsAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+DECENTRO_UNAVAILABLE_MESSAGE = "Bank details cannot be fetched right now. Try again later."
+MAX_AGE_MESSAGE = "max_age must be a non-negative whole number of seconds."
+
+
+def parse_max_age(value):
+    """
+    The `max_age` query parameter in seconds, or BANK_DETAILS_MAX_AGE when it
+    is absent. Raises ValueError for anything else.
+    """
+    if value is None:
+        return settings.BANK_DETAILS_MAX_AGE
+    max_age = int(value)
+    if max_age < 0:
+        raise ValueError(value)
+    return max_age
+
+
+def stored_bank_details_body(rows, stale, message):
+    return {
+        "message": message,
+        "stale": stale,
+        "fetched_at": fetched_at(rows),
+        "bank_details": rows
+    }
+
+
+def stale_bank_details(rows):
+    """
+    (body, status) answering a fetch while the Decentro circuit is open: the
+    stored rows marked stale, or a 503 when there are none.
+    """
+    if not rows:
+        return {"detail": DECENTRO_UNAVAILABLE_MESSAGE}, status.HTTP_503_SERVICE_UNAVAILABLE
+    return stored_bank_details_body(rows, True, "Showing the last fetched bank details."), status.HTTP_200_OK
+
+
+def fetch_result(reference_id, job_status, bank_details=None, error=""):
+    """(body, status) reporting a fetch in `job_status`, as the status endpoint does."""
+    if job_status == BankDetailsFetchJob.STATUS_SUCCEEDED:
+        return {
+            "message": "Bank details fetched successfully",
+            "reference_id": reference_id,
+            "status": job_status,
+            "bank_details": bank_details
+        }, status.HTTP_200_OK
+    if job_status == BankDetailsFetchJob.STATUS_FAILED:
+        return {
+            "reference_id": reference_id,
+            "status": job_status,
+            "error": error
+        }, status.HTTP_200_OK
+    return {
+        "reference_id": reference_id,
+        "status": job_status
+    }, status.HTTP_202_ACCEPTED
+
+
+class FetchBankDetailsAPIView(IdempotentAPIMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    # GET queues a Decentro call, so retries are deduplicated too.
+    idempotent_methods = ("GET",)
 
     def get(self, request):
-        reference_id = generate_reference_id()
-        user = request.user
-        phone_number = user.username
-
-        headers = {
-            "client_id": CLIENT_ID,
-            "client_secret": CLIENT_SECRET,
-            "module_secret": MODULE_SECRET,
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "reference_id": reference_id,
-            "consent": True,
-            "purpose": "Fetch user VPA from mobile number",
-            "mobile": phone_number
-        }
-
         try:
-            response = requests.post(DECENTRO_BASE_URL, json=payload, headers=headers, timeout=10)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            return Response({
-                "reference_id": reference_id,
-                "error": f"Failed to connect to Decentro API: {str(e)}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            max_age = parse_max_age(request.query_params.get("max_age"))
+        except ValueError:
+            return Response({"max_age": [MAX_AGE_MESSAGE]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Stored rows younger than max_age answer the request on their own.
+        rows = list(stored_bank_details(request.user.pk))
+        if is_fresh(rows, max_age):
+            return Response(stored_bank_details_body(rows, False, "Showing the stored bank details."))
+
+        breaker = get_client().breaker
+        if breaker.is_open():
+            body, code = stale_bank_details(rows)
+            return Response(body, status=code, headers={"Retry-After": str(breaker.recovery_timeout)})
+
+        job = enqueue_fetch_job(request.user, generate_reference_id())
+        if rows:
+            # Serve what is stored while the queued job refreshes it.
+            body = stored_bank_details_body(rows, True, "Showing the last fetched bank details; a refresh has been queued.")
+            body.update(reference_id=job.reference_id, status=job.status)
+            return Response(body, status=status.HTTP_200_OK)
 
-        data = response.json()
-        print("Decentro API Response:", data)
-        accounts = data.get("data", {}).get("results", [])
+        return Response({
+            "message": "Bank details fetch has been queued",
+            "reference_id": job.reference_id,
+            "status": job.status
+        }, status=status.HTTP_202_ACCEPTED)
 
-        if not accounts:
-            return Response({
-                "reference_id": reference_id,
-                "error": "No bank details found for this phone number."
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        all_bank_details = []
-
-        for account_info in accounts:
-            name = account_info.get("name", "")
-            vpa = account_info.get("vpa", "")
-            merchant_ifsc = account_info.get("merchantIfsc", "")
-            tpap = account_info.get("tpap", [])
-
-            bank_details, created = BankDetails.objects.update_or_create(
-                user_profile=user,
-                vpa=vpa,  
-                defaults={
-                    "name": name,
-                    "merchant_ifsc": merchant_ifsc,
-                    "tpap": ", ".join(tpap) if tpap else None
-                }
-            )
-
-            all_bank_details.append({
-                "reference_id": reference_id,
-                "name": name,
-                "vpa": vpa,
-                "merchant_ifsc": merchant_ifsc,
-                "tpap": tpap
-            })
 
-        return Response({
-            "message": "Bank details fetched successfully",
-            "bank_details": all_bank_details
-        }, status=status.HTTP_200_OK)
-    
+class FetchBankDetailsStatusAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, reference_id):
+        try:
+            job = BankDetailsFetchJob.objects.get(reference_id=reference_id, user=request.user)
+        except BankDetailsFetchJob.DoesNotExist:
+            return Response({"detail": "Fetch job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        body, code = fetch_result(reference_id, job.status, job.result, job.error)
+        return Response(body, status=code)
 
 
+def metrics_view(request):
+    """Prometheus text exposition of this process's request metrics."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4')
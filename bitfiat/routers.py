@@ -0,0 +1,54 @@
+from contextvars import ContextVar
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+
+# Set once a request writes to the primary, so its later reads see the write
+# instead of a replica that may not have caught up yet.
+_pinned = ContextVar("pinned_to_primary", default=False)
+
+
+@receiver(request_started)
+def unpin_primary(**kwargs):
+    # Sync worker threads serve one request after another in the same context.
+    _pinned.set(False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the "replica" database alias and everything else to
+    "default". Reads stay on the primary inside a transaction on it, for the
+    rest of a request once it has written, and for models whose rows are
+    read back right after another request creates them.
+    """
+
+    primary = "default"
+    replica = "replica"
+    # Tokens are used by the next request after login, and job status is
+    # polled as soon as the job is queued.
+    primary_models = {"Accounts.AuthToken", "Accounts.BankDetailsFetchJob", "Accounts.KYCImageUpload"}
+
+    def db_for_read(self, model, **hints):
+        # DatabaseCache reads must see the writes made a moment ago.
+        if model._meta.app_label == "django_cache":
+            return self.primary
+        if model._meta.label in self.primary_models or _pinned.get():
+            return self.primary
+        if connections[self.primary].in_atomic_block:
+            return self.primary
+        return self.replica
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {self.primary, self.replica}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.primary
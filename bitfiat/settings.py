@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "Accounts.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -76,13 +78,100 @@ WSGI_APPLICATION = "bitfiat.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+#
+# Configured from the environment. SQLite stays the default for development.
+# SQLITE_WAL=1 switches it to WAL mode so readers do not block behind the
+# single writer; that is a persistent change to the database file, so it is
+# left off for the db.sqlite3 checked into the repository. Any other engine
+# (e.g. django.db.backends.postgresql) gets persistent connections and, with
+# DB_POOL=1, a psycopg connection pool.
+
+DB_ENGINE = os.environ.get("DB_ENGINE", "django.db.backends.sqlite3")
+
+SQLITE_OPTIONS = {
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+    "init_command": (
+        "PRAGMA cache_size=-20000;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA mmap_size=134217728;"
+    ),
+}
+if os.environ.get("SQLITE_WAL") == "1":
+    # synchronous=NORMAL is only crash-safe in WAL mode.
+    SQLITE_OPTIONS["init_command"] = "PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;" + SQLITE_OPTIONS["init_command"]
+
+
+def database_config(prefix, default_name):
+    if DB_ENGINE == "django.db.backends.sqlite3":
+        return {
+            "ENGINE": DB_ENGINE,
+            "NAME": os.environ.get(f"{prefix}NAME", default_name),
+            "OPTIONS": SQLITE_OPTIONS,
+            # A file rather than the shared in-memory database, whose table
+            # locks fail concurrent writers at once instead of waiting for
+            # "timeout"; the concurrency tests depend on it.
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+
+    config = {
+        "ENGINE": DB_ENGINE,
+        "NAME": os.environ.get(f"{prefix}NAME", default_name),
+        "USER": os.environ.get(f"{prefix}USER", os.environ.get("DB_USER", "")),
+        "PASSWORD": os.environ.get(f"{prefix}PASSWORD", os.environ.get("DB_PASSWORD", "")),
+        "HOST": os.environ.get(f"{prefix}HOST", os.environ.get("DB_HOST", "")),
+        "PORT": os.environ.get(f"{prefix}PORT", os.environ.get("DB_PORT", "")),
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
+    if os.environ.get("DB_POOL") == "1":
+        # Pooled connections are returned to the pool instead of being kept
+        # open per thread, so Django requires CONN_MAX_AGE to be 0.
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+        }
+    return config
+
+
+DATABASES = {
+    "default": database_config("DB_", BASE_DIR / "db.sqlite3"),
 }
 
+# Read-only lookups are routed to a replica when DB_REPLICA_NAME (SQLite) or
+# DB_REPLICA_HOST (other engines) is set.
+if os.environ.get("DB_REPLICA_NAME") or os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = database_config("DB_REPLICA_", DATABASES["default"]["NAME"])
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    DATABASE_ROUTERS = ["bitfiat.routers.PrimaryReplicaRouter"]
+
+
+# Cache
+#
+# OTP codes, revoked tokens, idempotency records, throttles, the Decentro
+# circuit breaker and the cached /me/ and verification entries live here and
+# never touch the primary database. Set REDIS_URL (requires the redis package)
+# to share them between worker processes. Without it each process keeps its own
+# in-memory cache, which is only correct with a single worker; `manage.py check`
+# warns about the settings that need a shared cache.
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 100_000))},
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -102,6 +191,33 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing tiers. The first hasher of the selected tier hashes new
+# passwords; the rest stay available so existing hashes keep verifying and are
+# upgraded to the preferred hasher on the next login. The argon2 tier needs
+# argon2-cffi and defaults to the OWASP-recommended Argon2id parameters.
+
+PASSWORD_HASHER_TIERS = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "Accounts.hashers.TunedArgon2PasswordHasher",
+}
+PASSWORD_HASHER_TIER = os.environ.get("PASSWORD_HASHER_TIER", "pbkdf2")
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_TIERS[PASSWORD_HASHER_TIER]] + [
+    hasher
+    for hasher in [
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+        "Accounts.hashers.TunedArgon2PasswordHasher",
+        "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+        "django.contrib.auth.hashers.ScryptPasswordHasher",
+    ]
+    if hasher != PASSWORD_HASHER_TIERS[PASSWORD_HASHER_TIER]
+]
+
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 19456))
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 1))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -120,7 +236,279 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+
+# File storage
+# https://docs.djangoproject.com/en/5.1/ref/settings/#storages
+#
+# KYC images are stored by content hash so identical uploads share one file.
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "kyc_images": {
+        "BACKEND": "Accounts.storage.ContentAddressedStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Decentro mobile_to_vpa API
+
+DECENTRO_BASE_URL = os.environ.get(
+    "DECENTRO_BASE_URL",
+    "https://in.staging.decentro.tech/v2/financial_services/mobile_to_vpa/advance",
+)
+DECENTRO_CLIENT_ID = os.environ.get("DECENTRO_CLIENT_ID", "Kaiztren_0_sop")
+DECENTRO_CLIENT_SECRET = os.environ.get("DECENTRO_CLIENT_SECRET", "e67052de696541a28bb545f185a02af5")
+DECENTRO_MODULE_SECRET = os.environ.get("DECENTRO_MODULE_SECRET", "HmNIAyKZOq3cH82Z24rIZ6QxI9uk2KTX")
+DECENTRO_TIMEOUT = float(os.environ.get("DECENTRO_TIMEOUT", 10))
+DECENTRO_POOL_SIZE = int(os.environ.get("DECENTRO_POOL_SIZE", 20))
+DECENTRO_CACHE_TTL = int(os.environ.get("DECENTRO_CACHE_TTL", 300))
+
+# Failed calls (connection errors, timeouts, 5xx) are retried up to
+# DECENTRO_MAX_RETRIES times after a jittered exponential backoff starting at
+# DECENTRO_RETRY_BACKOFF seconds, but only while a retry can start within
+# DECENTRO_RETRY_DEADLINE seconds of the first attempt. With
+# DECENTRO_HEDGE_DELAY set, the async views send a second request when the
+# first has not answered after that many seconds; 0 disables hedging.
+DECENTRO_MAX_RETRIES = int(os.environ.get("DECENTRO_MAX_RETRIES", 2))
+DECENTRO_RETRY_BACKOFF = float(os.environ.get("DECENTRO_RETRY_BACKOFF", 0.2))
+DECENTRO_RETRY_BACKOFF_MAX = float(os.environ.get("DECENTRO_RETRY_BACKOFF_MAX", 2))
+DECENTRO_RETRY_DEADLINE = float(os.environ.get("DECENTRO_RETRY_DEADLINE", DECENTRO_TIMEOUT))
+DECENTRO_HEDGE_DELAY = float(os.environ.get("DECENTRO_HEDGE_DELAY", 0))
+
+# FAILURE_THRESHOLD failed calls within FAILURE_WINDOW seconds open the circuit;
+# calls then fail fast, and stored bank details are served, for
+# RECOVERY_TIMEOUT seconds before a single probe call is let through. State is
+# kept in the CACHE_ALIAS cache, so processes sharing it trip together.
+DECENTRO_CIRCUIT_BREAKER = {
+    "FAILURE_THRESHOLD": int(os.environ.get("DECENTRO_BREAKER_FAILURE_THRESHOLD", 5)),
+    "FAILURE_WINDOW": int(os.environ.get("DECENTRO_BREAKER_FAILURE_WINDOW", 60)),
+    "RECOVERY_TIMEOUT": int(os.environ.get("DECENTRO_BREAKER_RECOVERY_TIMEOUT", 30)),
+    "CACHE_ALIAS": "default",
+}
+
+# Stored bank details younger than this many seconds are served without calling
+# Decentro. Older ones are served marked stale while a refresh runs in the
+# background. Clients can ask for fresher data with ?max_age=<seconds>, and
+# ?max_age=0 always triggers a refresh.
+BANK_DETAILS_MAX_AGE = int(os.environ.get("BANK_DETAILS_MAX_AGE", 3600))
+
+
+# Django REST framework
+#
+# JSON is rendered and parsed with orjson when it is installed, falling back to
+# the stdlib json module otherwise.
+
+REST_FRAMEWORK = {
+    # Reverse proxies in front of the app. Left unset, X-Forwarded-For is
+    # ignored and throttles key on the connecting address.
+    "NUM_PROXIES": int(os.environ["NUM_PROXIES"]) if os.environ.get("NUM_PROXIES") else None,
+    "DEFAULT_RENDERER_CLASSES": [
+        "Accounts.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "Accounts.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+
+# Seconds an API token stays valid after it is issued or rotated. Expired
+# tokens are deleted by `manage.py prune_tokens`, which should run on a schedule.
+# Issuing a token also deletes the user's expired ones and, past
+# AUTH_TOKEN_MAX_PER_USER live tokens, their oldest.
+
+AUTH_TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", 30 * 86400))
+AUTH_TOKEN_MAX_PER_USER = int(os.environ.get("AUTH_TOKEN_MAX_PER_USER", 10))
+
+
+# Idempotency-Key handling for sign-up, KYC PAN, address and bank-detail
+# requests. A response is replayed for TIMEOUT seconds; a duplicate arriving
+# while the first request runs waits up to WAIT seconds for it. The lock taken
+# by a running request lapses after LOCK_TIMEOUT seconds if its worker dies.
+
+IDEMPOTENCY = {
+    "TIMEOUT": int(os.environ.get("IDEMPOTENCY_TIMEOUT", 86400)),
+    "WAIT": float(os.environ.get("IDEMPOTENCY_WAIT", 10)),
+    "LOCK_TIMEOUT": int(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", 60)),
+    "CACHE_ALIAS": "default",
+}
+
+
+# Token authentication cache
+#
+# "django" uses the CACHE_ALIAS cache, so a revoked, rotated or deleted token
+# is refused by every process sharing that cache at once. "locmem" keeps a
+# per-process LRU: another process goes on accepting a revoked token until its
+# entry expires, so it is only safe with a single worker. Without REDIS_URL
+# the default cache is process-local anyway, so "locmem" is the default and
+# skips pickling every hit through the cache API.
+
+TOKEN_AUTH_CACHE = {
+    "BACKEND": os.environ.get("TOKEN_AUTH_CACHE_BACKEND", "django" if os.environ.get("REDIS_URL") else "locmem"),
+    "TIMEOUT": int(os.environ.get("TOKEN_AUTH_CACHE_TIMEOUT", 300)),
+    "MAX_ENTRIES": int(os.environ.get("TOKEN_AUTH_CACHE_MAX_ENTRIES", 10000)),
+    "CACHE_ALIAS": "default",
+}
+
+
+# Throttling for the unauthenticated auth endpoints
+#
+# Budgets are "<requests>/<s|min|hour|day>" per client IP and per phone number,
+# keyed by the view's throttle_scope. "locmem" refills a token bucket per key in
+# each process; "django" keeps sliding-window counters in the CACHE_ALIAS cache,
+# so the budget is shared by every process using that cache. THROTTLE_DISABLED=1
+# drops every budget; the benchmark commands set it on the servers they start.
+
+THROTTLING = {
+    "BACKEND": os.environ.get("THROTTLE_BACKEND", "locmem"),
+    "MAX_ENTRIES": int(os.environ.get("THROTTLE_MAX_ENTRIES", 100000)),
+    "CACHE_ALIAS": "default",
+    "RATES": {} if os.environ.get("THROTTLE_DISABLED") else {
+        "sign-up": {"ip": "20/hour", "phone": "5/hour"},
+        "login": {"ip": "30/min", "phone": "5/min"},
+        "forgot-password": {"ip": "10/min", "phone": "3/hour"},
+    },
+}
+
+
+# Bulk user import (/users/import/ and the import_users command). Passwords are
+# hashed in USER_IMPORT_HASH_WORKERS processes; 0 hashes in the request thread.
+# Uploads over USER_IMPORT_MAX_REQUEST_ROWS lines are refused by the endpoint
+# and have to go through `manage.py import_users`.
+
+USER_IMPORT_BATCH_SIZE = int(os.environ.get("USER_IMPORT_BATCH_SIZE", 1000))
+USER_IMPORT_HASH_WORKERS = int(os.environ.get("USER_IMPORT_HASH_WORKERS", 0))
+USER_IMPORT_MAX_REQUEST_ROWS = int(os.environ.get("USER_IMPORT_MAX_REQUEST_ROWS", 500))
+
+
+# Pincode index built by `manage.py build_pincode_index` from the India Post
+# pincode directory. Addresses are checked against it and their city/state
+# filled in from it; without the file only the pincode format is validated.
+
+PINCODE_INDEX_PATH = os.environ.get("PINCODE_INDEX_PATH", str(BASE_DIR / "data" / "pincodes.idx"))
+
+
+# Seconds a PAN found to be in use is remembered, so repeat KYC submissions of
+# it are rejected without a query. Deleting the KYC record forgets it.
+
+KYC_PAN_CACHE_TIMEOUT = int(os.environ.get("KYC_PAN_CACHE_TIMEOUT", 86400))
+
+
+# Country code given to ten-digit national phone numbers when they are
+# normalized to E.164.
+
+PHONE_DEFAULT_COUNTRY_CODE = os.environ.get("PHONE_DEFAULT_COUNTRY_CODE", "91")
+
+
+# Seconds a user's /me/ aggregate is cached for. Entries are invalidated when
+# the underlying rows change; the timeout bounds how long a missed
+# invalidation (e.g. a bulk update that sends no signals) can be served.
+
+ME_CACHE_TIMEOUT = int(os.environ.get("ME_CACHE_TIMEOUT", 300))
+
+
+# Largest number of addresses accepted by one /address/batch/ request.
+
+ADDRESS_BATCH_MAX_SIZE = int(os.environ.get("ADDRESS_BATCH_MAX_SIZE", 100))
+
+
+# One-time passwords for phone verification
+#
+# Codes are kept hashed in the CACHE_ALIAS cache, which must be shared by every
+# process so a code issued by one can be checked by another, and expire after
+# TIMEOUT seconds along with their attempt counter. A code is discarded after
+# MAX_ATTEMPTS wrong guesses, and a new one can be requested every
+# RESEND_INTERVAL seconds.
+
+OTP = {
+    "LENGTH": 6,
+    "TIMEOUT": int(os.environ.get("OTP_TIMEOUT", 300)),
+    "MAX_ATTEMPTS": int(os.environ.get("OTP_MAX_ATTEMPTS", 5)),
+    "RESEND_INTERVAL": int(os.environ.get("OTP_RESEND_INTERVAL", 30)),
+    "CACHE_ALIAS": "default",
+}
+
+# Where OTP messages go: "console" logs them, "locmem" keeps them in memory for
+# local runs and benchmarks, "http" posts them to the gateway at URL. Logging
+# plaintext codes is only the default with DEBUG on; otherwise SMS_BACKEND must
+# be set, or the system check fails.
+
+SMS = {
+    "BACKEND": os.environ.get("SMS_BACKEND", "console" if DEBUG else ""),
+    "URL": os.environ.get("SMS_URL", ""),
+    "API_KEY": os.environ.get("SMS_API_KEY", ""),
+    "TIMEOUT": float(os.environ.get("SMS_TIMEOUT", 5)),
+}
+
+
+# Seconds a verified user's is_verified flag is cached for the login path.
+# Unverified users are always read from the database.
+
+VERIFICATION_CACHE_TIMEOUT = int(os.environ.get("VERIFICATION_CACHE_TIMEOUT", 3600))
+
+
+# KYC image uploads
+#
+# Multipart uploads always go to a temporary file rather than memory, and the
+# chunked /kyc-img/uploads/ endpoint streams straight into KYC_UPLOAD_TEMP_DIR.
+# Stored images are re-encoded JPEGs no larger than KYC_IMAGE_MAX_DIMENSION.
+
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+
+KYC_UPLOAD_TEMP_DIR = os.environ.get("KYC_UPLOAD_TEMP_DIR", BASE_DIR / "tmp" / "kyc_uploads")
+KYC_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+KYC_UPLOAD_CHUNK_SIZE = 1024 * 1024
+KYC_UPLOAD_BUFFER_SIZE = 64 * 1024
+KYC_IMAGE_MAX_DIMENSION = 1600
+KYC_IMAGE_QUALITY = 85
+KYC_THUMBNAIL_SIZE = 256
+
+
+# Observability
+#
+# RequestMetricsMiddleware serves per-view histograms on /metrics to
+# METRICS_ALLOWED_IPS. Set PROFILING_SAMPLE_RATE (0-1) to dump cProfile stats
+# for that fraction of requests into PROFILING_DUMP_DIR.
+
+METRICS_ALLOWED_IPS = os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DUMP_DIR = os.environ.get("PROFILING_DUMP_DIR", BASE_DIR / "profiles")
+
+# Structured JSON logs, written to stderr from a background thread.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "Accounts.log.JsonFormatter"},
+    },
+    "handlers": {
+        "console": {
+            "class": "Accounts.log.QueueStreamHandler",
+            "formatter": "json",
+        },
+    },
+    "root": {
+        "handlers": ["console"],
+        "level": os.environ.get("LOG_LEVEL", "INFO"),
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}